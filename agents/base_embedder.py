@@ -2,7 +2,13 @@
 
 from abc import ABC, abstractmethod
 import networkx as nx
-from typing import Tuple
+import numpy as np
+from typing import Callable, Dict, List, Optional, Tuple
+
+from utils.evaluator import apply_embedding, vnr_revenue
+from utils.link_mapping import Route
+from utils.profiler import PROFILER
+from utils.substrate_state import SubstrateState
 
 
 class BaseEmbedder(ABC):
@@ -10,21 +16,81 @@ class BaseEmbedder(ABC):
     Abstract base class for virtual network embedding algorithms.
     """
 
+    # 仮想リンクの帯域を複数経路に分割しうるか（事前判定の条件が変わる）
+    split = False
+    # 乱数を使う手法用のストリーム（環境が set_rng で渡す）
+    rng: np.random.Generator = None
+
+    def set_rng(self, rng: np.random.Generator) -> None:
+        """
+        Give the embedder its own random stream (called by the envs on
+        reset, so runs do not depend on global RNG state).
+        """
+        self.rng = rng
+
     @abstractmethod
     def embed(
         self,
-        substrate: nx.Graph,
+        substrate: SubstrateState,
         vnr: nx.Graph,
-    ) -> Tuple[bool, dict]:
+    ) -> Tuple[bool, Dict[int, int], Dict[Tuple[int, int], Route]]:
         """
         Attempt to embed the VNR onto the substrate network.
 
+        Only reads the residuals; the caller applies a successful
+        embedding (see ``utils.evaluator.apply_embedding``).
+
         Args:
-            substrate: The substrate network (with node/edge attributes)
+            substrate: The substrate state (residual CPU / bandwidth)
             vnr: The virtual network request
 
         Returns:
             success (bool): Whether embedding succeeded
-            mapping (dict): Node mapping (vnode -> snode), empty if failed
+            node_mapping (dict): vnode -> snode, empty if failed
+            link_paths (dict): (u, v) -> substrate node path, or a list
+                of ``(path, bandwidth)`` flows for a split link; empty
+                if failed
         """
         pass
+
+    def embed_batch(
+        self,
+        substrate: SubstrateState,
+        vnrs: List[nx.Graph],
+        prefilter: Optional[Callable[[nx.Graph], bool]] = None,
+    ) -> List[Tuple[bool, Dict[int, int], Dict[Tuple[int, int], Route]]]:
+        """
+        Admit a batch of VNRs that arrived together.
+
+        VNRs are tried one by one with :meth:`embed`, highest revenue
+        first, and every successful embedding is applied to the substrate
+        straight away so the rest of the batch sees the reduced
+        residuals. Caches kept on the substrate (CPU index, path cache,
+        k-path tables) are shared across the batch. Embedders can
+        override this to plan the batch jointly.
+
+        Args:
+            substrate: The substrate state (modified in place)
+            vnrs: The virtual network requests of the batch
+            prefilter: Optional check run right before each ``embed``
+                (e.g. ``FeasibilityFilter.check``); VNRs it returns
+                False for are rejected without calling ``embed``
+
+        Returns:
+            ``(success, node_mapping, link_paths)`` per VNR, in the order
+            of ``vnrs``
+        """
+        order = sorted(
+            range(len(vnrs)), key=lambda i: -vnr_revenue(vnrs[i])
+        )
+        results = [None] * len(vnrs)
+        for i in order:
+            if prefilter is not None and not prefilter(vnrs[i]):
+                results[i] = (False, {}, {})
+                continue
+            success, node_map, link_paths = self.embed(substrate, vnrs[i])
+            if success:
+                with PROFILER.phase("apply_embedding"):
+                    apply_embedding(substrate, vnrs[i], node_map, link_paths)
+            results[i] = (success, node_map, link_paths)
+        return results
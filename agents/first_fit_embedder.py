@@ -2,8 +2,12 @@
 
 from typing import Dict, Tuple, List
 import networkx as nx
+import numpy as np
 
 from agents.base_embedder import BaseEmbedder
+from utils.link_mapping import map_links
+from utils.profiler import PROFILER
+from utils.substrate_state import SubstrateState
 
 
 class FirstFitEmbedder(BaseEmbedder):
@@ -14,48 +18,35 @@ class FirstFitEmbedder(BaseEmbedder):
 
     def embed(
         self,
-        substrate: nx.Graph,
+        substrate: SubstrateState,
         vnr: nx.Graph,
     ) -> Tuple[bool, Dict[int, int], Dict[Tuple[int, int], List[int]]]:
-        node_mapping = {}
-        used_snodes = set()
-
-        # --- ノード埋め込み ---
-        for vnode in vnr.nodes:
-            cpu_demand = vnr.nodes[vnode]["cpu"]
-
-            for snode in substrate.nodes:
-                if (
-                    snode not in used_snodes
-                    and substrate.nodes[snode]["cpu"] >= cpu_demand
-                ):
-                    node_mapping[vnode] = snode
-                    used_snodes.add(snode)
-                    break
-            else:
+        with PROFILER.phase("node_mapping"):
+            # CPU上位ノードと要求を比較し、明らかに不可能なVNRは即座に棄却
+            if not substrate.cpu_index.feasible(
+                [cpu for _, cpu in vnr.nodes(data="cpu")]
+            ):
                 return False, {}, {}
 
-        # --- リンク埋め込み ---
-        link_paths = {}
-
-        for u, v in vnr.edges:
-            sn_u = node_mapping[u]
-            sn_v = node_mapping[v]
-            bw_demand = vnr.edges[u, v]["bandwidth"]
+            node_mapping = {}
+            free = np.ones(substrate.num_nodes, dtype=bool)
 
-            # 帯域を満たすエッジのみで経路探索
-            G_sub = nx.Graph()
-            for x, y, data in substrate.edges(data=True):
-                if data["bandwidth"] >= bw_demand:
-                    G_sub.add_edge(x, y)
+            # --- ノード埋め込み ---
+            for vnode in vnr.nodes:
+                cpu_demand = vnr.nodes[vnode]["cpu"]
 
-            try:
-                if sn_u not in G_sub or sn_v not in G_sub:
+                candidates = np.flatnonzero(free & (substrate.cpu >= cpu_demand))
+                if len(candidates) == 0:
                     return False, {}, {}
 
-                path = nx.shortest_path(G_sub, source=sn_u, target=sn_v)
-                link_paths[(u, v)] = path
-            except nx.NetworkXNoPath:
-                return False, {}, {}
+                snode = int(candidates[0])
+                node_mapping[vnode] = snode
+                free[snode] = False
+
+        # --- リンク埋め込み ---
+        with PROFILER.phase("link_mapping"):
+            link_paths = map_links(substrate, vnr, node_mapping)
+        if link_paths is None:
+            return False, {}, {}
 
         return True, node_mapping, link_paths
@@ -4,6 +4,9 @@ from typing import Dict, Tuple, List
 import networkx as nx
 
 from agents.base_embedder import BaseEmbedder
+from utils.link_mapping import map_links
+from utils.profiler import PROFILER
+from utils.substrate_state import SubstrateState
 
 
 class GreedyEmbedder(BaseEmbedder):
@@ -15,55 +18,24 @@ class GreedyEmbedder(BaseEmbedder):
 
     def embed(
         self,
-        substrate: nx.Graph,
+        substrate: SubstrateState,
         vnr: nx.Graph,
     ) -> Tuple[bool, Dict[int, int], Dict[Tuple[int, int], List[int]]]:
-        node_mapping = {}
-        used_snodes = set()
-
         # --- ノード埋め込み（Greedy: CPUが多い順） ---
-        for vnode in vnr.nodes:
-            cpu_demand = vnr.nodes[vnode]["cpu"]
-
-            candidates = [
-                snode
-                for snode in substrate.nodes
-                if snode not in used_snodes
-                and substrate.nodes[snode]["cpu"] >= cpu_demand
-            ]
-
-            # 利用可能な中でCPUの多い順にソート
-            candidates.sort(
-                key=lambda sn: substrate.nodes[sn]["cpu"], reverse=True
+        # 最大CPUインデックスから未使用の最大ノードを順に取る（同値ならID最小）
+        with PROFILER.phase("node_mapping"):
+            vnodes = list(vnr.nodes)
+            snodes = substrate.cpu_index.select_greedy(
+                [vnr.nodes[vnode]["cpu"] for vnode in vnodes]
             )
-
-            if not candidates:
-                return False, {}, {}
-
-            snode = candidates[0]
-            node_mapping[vnode] = snode
-            used_snodes.add(snode)
+        if snodes is None:
+            return False, {}, {}
+        node_mapping = dict(zip(vnodes, snodes))
 
         # --- リンク埋め込み（First-Fitと同じ） ---
-        link_paths = {}
-
-        for u, v in vnr.edges:
-            sn_u = node_mapping[u]
-            sn_v = node_mapping[v]
-            bw_demand = vnr.edges[u, v]["bandwidth"]
-
-            G_sub = nx.Graph()
-            for x, y, data in substrate.edges(data=True):
-                if data["bandwidth"] >= bw_demand:
-                    G_sub.add_edge(x, y)
-
-            try:
-                if sn_u not in G_sub or sn_v not in G_sub:
-                    return False, {}, {}
-
-                path = nx.shortest_path(G_sub, source=sn_u, target=sn_v)
-                link_paths[(u, v)] = path
-            except nx.NetworkXNoPath:
-                return False, {}, {}
+        with PROFILER.phase("link_mapping"):
+            link_paths = map_links(substrate, vnr, node_mapping)
+        if link_paths is None:
+            return False, {}, {}
 
         return True, node_mapping, link_paths
@@ -0,0 +1,65 @@
+# agents/k_path_embedder.py
+
+from typing import Dict, Tuple
+import networkx as nx
+
+from agents.base_embedder import BaseEmbedder
+from utils.k_paths import map_links_k_paths
+from utils.link_mapping import Route
+from utils.profiler import PROFILER
+from utils.substrate_state import SubstrateState
+
+
+class KPathEmbedder(BaseEmbedder):
+    """
+    K-Path Embedder:
+    Maps nodes greedily (most CPU first) and each virtual link onto one
+    of the k shortest substrate paths between its endpoints, looked up
+    in a per-substrate table instead of searched for.
+
+    With ``split=True`` a virtual link that fits on no single candidate
+    may have its bandwidth split over several of them; such links are
+    returned as ``[(path, bandwidth), ...]`` flows.
+
+    Args:
+        k: Candidate paths per node pair
+        split: Allow splitting a link's bandwidth over several paths
+    """
+
+    def __init__(self, k: int = 4, split: bool = False):
+        self.k = k
+        self.split = split
+
+    def embed(
+        self,
+        substrate: SubstrateState,
+        vnr: nx.Graph,
+    ) -> Tuple[bool, Dict[int, int], Dict[Tuple[int, int], Route]]:
+        # --- ノード埋め込み（Greedyと同じ） ---
+        with PROFILER.phase("node_mapping"):
+            vnodes = list(vnr.nodes)
+            snodes = substrate.cpu_index.select_greedy(
+                [vnr.nodes[vnode]["cpu"] for vnode in vnodes]
+            )
+        if snodes is None:
+            return False, {}, {}
+        node_mapping = dict(zip(vnodes, snodes))
+
+        # --- リンク埋め込み（k 本の候補経路から選択） ---
+        with PROFILER.phase("link_mapping"):
+            link_paths = map_links_k_paths(
+                substrate, vnr, node_mapping, self.k, self.split
+            )
+        if link_paths is None:
+            return False, {}, {}
+
+        return True, node_mapping, link_paths
+
+
+class SplittingKPathEmbedder(KPathEmbedder):
+    """
+    KPathEmbedder with bandwidth splitting enabled by default.
+    """
+
+    def __init__(self, k: int = 4, split: bool = True):
+        super().__init__(k=k, split=split)
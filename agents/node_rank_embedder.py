@@ -0,0 +1,105 @@
+# agents/node_rank_embedder.py
+
+import weakref
+from typing import Dict, List, Optional, Tuple
+import networkx as nx
+import numpy as np
+
+from agents.base_embedder import BaseEmbedder
+from utils.link_mapping import map_links
+from utils.node_rank import NodeRank
+from utils.profiler import PROFILER
+from utils.substrate_state import SubstrateState
+
+
+class NodeRankEmbedder(BaseEmbedder):
+    """
+    NodeRank Embedder:
+    Ranks substrate nodes by a GRC-style score (CPU x adjacent residual
+    bandwidth, spread over the topology; see utils.node_rank.NodeRank)
+    and maps virtual nodes onto the highest-ranked unused node with
+    enough CPU. Virtual nodes are taken in decreasing order of the same
+    kind of weight: CPU demand x total bandwidth demand of their virtual
+    links (ties keep node order). Links are routed as in First-Fit.
+
+    The rank is cached per substrate and only recomputed after the
+    residuals have drifted past ``drift_threshold``.
+
+    Args:
+        damping: Damping factor of the rank iteration
+        drift_threshold: Relative residual drift that triggers a refresh
+    """
+
+    def __init__(self, damping: float = 0.85, drift_threshold: float = 0.05):
+        self.damping = damping
+        self.drift_threshold = drift_threshold
+        # 基盤ごとの NodeRank（ベクトル環境では複数の基盤を扱う）
+        self._ranks: "weakref.WeakKeyDictionary[SubstrateState, NodeRank]"
+        self._ranks = weakref.WeakKeyDictionary()
+
+    def node_rank(self, substrate: SubstrateState) -> NodeRank:
+        ranker = self._ranks.get(substrate)
+        if ranker is None:
+            ranker = NodeRank(substrate, self.damping, self.drift_threshold)
+            self._ranks[substrate] = ranker
+        return ranker
+
+    def get_state(self, substrate: SubstrateState) -> Optional[tuple]:
+        """
+        Cached rank of ``substrate`` (for env snapshots), or None.
+        """
+        ranker = self._ranks.get(substrate)
+        return None if ranker is None else ranker.get_state()
+
+    def set_state(
+        self, substrate: SubstrateState, state: Optional[tuple]
+    ) -> None:
+        if state is None:
+            self._ranks.pop(substrate, None)
+        else:
+            self.node_rank(substrate).set_state(state)
+
+    def embed(
+        self,
+        substrate: SubstrateState,
+        vnr: nx.Graph,
+    ) -> Tuple[bool, Dict[int, int], Dict[Tuple[int, int], List[int]]]:
+        with PROFILER.phase("node_mapping"):
+            # CPU上位ノードと要求を比較し、明らかに不可能なVNRは即座に棄却
+            if not substrate.cpu_index.feasible(
+                [cpu for _, cpu in vnr.nodes(data="cpu")]
+            ):
+                return False, {}, {}
+
+            order = self.node_rank(substrate).order
+            free = np.ones(substrate.num_nodes, dtype=bool)
+            node_mapping = {}
+
+            # --- ノード埋め込み（要求の大きい仮想ノードから順に） ---
+            for vnode in _by_demand(vnr):
+                cpu_demand = vnr.nodes[vnode]["cpu"]
+                ok = free[order] & (substrate.cpu[order] >= cpu_demand)
+                candidates = np.flatnonzero(ok)
+                if len(candidates) == 0:
+                    return False, {}, {}
+
+                snode = int(order[candidates[0]])
+                node_mapping[vnode] = snode
+                free[snode] = False
+
+        # --- リンク埋め込み ---
+        with PROFILER.phase("link_mapping"):
+            link_paths = map_links(substrate, vnr, node_mapping)
+        if link_paths is None:
+            return False, {}, {}
+
+        return True, node_mapping, link_paths
+
+
+def _by_demand(vnr: nx.Graph) -> List[int]:
+    # 仮想ノードの重み: CPU 要求 × 隣接リンクの帯域要求の合計
+    weight = {
+        vnode: cpu * sum(bw for _, _, bw in vnr.edges(vnode, data="bandwidth"))
+        for vnode, cpu in vnr.nodes(data="cpu")
+    }
+    return sorted(vnr.nodes, key=lambda vnode: -weight[vnode])
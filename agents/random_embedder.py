@@ -1,73 +1,62 @@
 # agents/random_embedder.py
 
-import random
 from typing import Tuple, Dict, List
 import networkx as nx
+import numpy as np
 
 from agents.base_embedder import BaseEmbedder
+from utils.link_mapping import map_links
+from utils.profiler import PROFILER
+from utils.substrate_state import SubstrateState
 
 
 class RandomEmbedder(BaseEmbedder):
     """
     Random Node & Link Mapping Embedder with pre-check.
+
+    Draws from ``self.rng``, which the env sets via ``set_rng`` on
+    reset; embedding without one raises RuntimeError rather than
+    falling back to an unseeded stream.
     """
 
     def embed(
         self,
-        substrate: nx.Graph,
+        substrate: SubstrateState,
         vnr: nx.Graph,
     ) -> Tuple[bool, Dict[int, int], Dict[Tuple[int, int], List[int]]]:
-        node_mapping = {}
-        used_snodes = set()
-
-        # --- ノード埋め込み ---
-        for vnode in vnr.nodes:
-            cpu_demand = vnr.nodes[vnode]["cpu"]
-
-            candidates = [
-                snode
-                for snode in substrate.nodes
-                if snode not in used_snodes
-                and substrate.nodes[snode]["cpu"] >= cpu_demand
-            ]
-
-            if not candidates:
+        with PROFILER.phase("node_mapping"):
+            # CPU上位ノードと要求を比較し、明らかに不可能なVNRは即座に棄却
+            if not substrate.cpu_index.feasible(
+                [cpu for _, cpu in vnr.nodes(data="cpu")]
+            ):
                 return False, {}, {}
 
-            chosen = random.choice(candidates)
-            node_mapping[vnode] = chosen
-            used_snodes.add(chosen)
+            if self.rng is None:
+                raise RuntimeError(
+                    "RandomEmbedder has no random stream; call set_rng"
+                )
+            node_mapping = {}
+            free = np.ones(substrate.num_nodes, dtype=bool)
 
-        # --- リンク埋め込み ---
-        link_paths = {}
+            # --- ノード埋め込み ---
+            for vnode in vnr.nodes:
+                cpu_demand = vnr.nodes[vnode]["cpu"]
 
-        for u, v in vnr.edges:
-            sn_u = node_mapping[u]
-            sn_v = node_mapping[v]
-            bw_demand = vnr.edges[u, v]["bandwidth"]
+                candidates = np.flatnonzero(
+                    free & (substrate.cpu >= cpu_demand)
+                )
 
-            # 帯域条件を満たすエッジのみのサブグラフで経路探索
-            G_sub = nx.Graph()
-            for x, y, data in substrate.edges(data=True):
-                if data["bandwidth"] >= bw_demand:
-                    G_sub.add_edge(x, y)
+                if not len(candidates):
+                    return False, {}, {}
 
-        try:
-            # 追加チェック：sn_u / sn_v が G_sub に存在するか
-            if sn_u not in G_sub or sn_v not in G_sub:
-                return False, {}, {}
+                chosen = int(candidates[self.rng.integers(len(candidates))])
+                node_mapping[vnode] = chosen
+                free[chosen] = False
 
-            path = nx.shortest_path(G_sub, source=sn_u, target=sn_v)
-            link_paths[(u, v)] = path
-        except nx.NetworkXNoPath:
+        # --- リンク埋め込み ---
+        with PROFILER.phase("link_mapping"):
+            link_paths = map_links(substrate, vnr, node_mapping)
+        if link_paths is None:
             return False, {}, {}
 
-        # --- 追加：リンク資源のチェック（事前検証） ---
-        for (u, v), path in link_paths.items():
-            bw_demand = vnr.edges[u, v]["bandwidth"]
-            for i in range(len(path) - 1):
-                u_, v_ = path[i], path[i + 1]
-                if substrate.edges[u_, v_]["bandwidth"] < bw_demand:
-                    return False, {}, {}
-
         return True, node_mapping, link_paths
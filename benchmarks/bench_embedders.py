@@ -0,0 +1,266 @@
+# benchmarks/bench_embedders.py
+
+import argparse
+import copy
+import itertools
+import json
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+from envs.poisson_vne_env import PoissonVNEEnv
+from utils.config_loader import load_config
+from utils.embedder_factory import available_embedders
+
+# ベンチマーク点を識別するキー（比較モードで突き合わせに使う）
+POINT_KEYS = ("embedder", "nodes", "avg_degree", "vnr_nodes", "arrival_rate")
+
+
+class _TimedEmbedder:
+    """
+    Wraps an embedder and records the latency of every ``embed`` call.
+    """
+
+    def __init__(self, embedder):
+        self.embedder = embedder
+        self.latencies: List[float] = []
+
+    def embed(self, substrate, vnr):
+        start = time.perf_counter()
+        result = self.embedder.embed(substrate, vnr)
+        self.latencies.append(time.perf_counter() - start)
+        return result
+
+
+def run_point(
+    base_config: Dict[str, Any],
+    point: Dict[str, Any],
+    num_vnrs: int,
+    seed: int,
+) -> Dict[str, Any]:
+    """
+    Feed ``num_vnrs`` arrivals through one embedder on one substrate.
+
+    The env is fast-forwarded through its event heap, so arrivals and
+    departures happen at their Poisson timestamps and only the
+    ``embed`` calls themselves are timed. The feasibility prefilter is
+    off, so every arrival reaches ``embed`` and the acceptance rate is
+    accepted / arrivals.
+    """
+    config = copy.deepcopy(base_config)
+    config["substrate"]["num_nodes"] = point["nodes"]
+    config["vnr"]["num_nodes"] = point["vnr_nodes"]
+    config["experiment"]["embedder"] = point["embedder"]
+    config["experiment"]["arrival_rate"] = point["arrival_rate"]
+    config["substrate"]["topology"] = "erdos_renyi"
+    config["substrate"]["avg_degree"] = point["avg_degree"]
+    config["vnr"].pop("trace", None)
+    # 事前棄却が有効だと棄却される VNR が embed に届かず、計測が偏る
+    config["experiment"]["prefilter"] = False
+
+    random.seed(seed)
+    np.random.seed(seed)
+    env = PoissonVNEEnv(config)
+    env.reset(seed=seed)
+
+    timed = _TimedEmbedder(env.embedder)
+    env.embedder = timed
+
+    arrivals = accepted = 0
+    start = time.perf_counter()
+    while arrivals < num_vnrs and env.event_queue:
+        stats = env.run_events(1)
+        arrivals += stats["arrivals"]
+        accepted += stats["accepted"]
+    wall = time.perf_counter() - start
+
+    latencies = np.array(timed.latencies)
+    embed_time = latencies.sum()
+    return {
+        **point,
+        "edges": int(env.substrate.num_edges),
+        "num_vnrs": arrivals,
+        "embeds_per_s": len(latencies) / embed_time if embed_time else 0.0,
+        "vnrs_per_s": arrivals / wall if wall else 0.0,
+        "p50_ms": float(np.percentile(latencies, 50) * 1e3),
+        "p99_ms": float(np.percentile(latencies, 99) * 1e3),
+        "peak_rss_mb": _peak_rss_mb(),
+        "acceptance_rate": accepted / max(arrivals, 1),
+    }
+
+
+def _peak_rss_mb() -> float:
+    # Linux の ru_maxrss は KiB、macOS はバイト
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024**2 if sys.platform == "darwin" else 1024)
+
+
+def sweep_points(args) -> List[Dict[str, Any]]:
+    embedders = args.embedders or available_embedders()
+    return [
+        dict(zip(POINT_KEYS, values))
+        for values in itertools.product(
+            embedders,
+            args.nodes,
+            args.avg_degree,
+            args.vnr_nodes,
+            args.arrival_rate,
+        )
+    ]
+
+
+def run_sweep(args) -> Dict[str, Any]:
+    base_config = load_config(args.config)
+    points = sweep_points(args)
+    results = []
+
+    # ピーク RSS を点ごとに測るため、各点を新しいプロセスで実行する
+    ctx = multiprocessing.get_context("spawn")
+    for k, point in enumerate(points, start=1):
+        if args.in_process:
+            result = run_point(base_config, point, args.vnrs, args.seed)
+        else:
+            with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as pool:
+                result = pool.submit(
+                    run_point, base_config, point, args.vnrs, args.seed
+                ).result()
+        results.append(result)
+        print(
+            f"[{k}/{len(points)}] {point['embedder']:>10} "
+            f"n={point['nodes']:<6} deg={point['avg_degree']:<4} "
+            f"v={point['vnr_nodes']:<3} rate={point['arrival_rate']:<5} "
+            f"{result['embeds_per_s']:>10.1f} embeds/s  "
+            f"p50 {result['p50_ms']:.3f} ms  p99 {result['p99_ms']:.3f} ms  "
+            f"rss {result['peak_rss_mb']:.0f} MB  "
+            f"acc {result['acceptance_rate']:.3f}"
+        )
+
+    return {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "config": args.config,
+            "vnrs_per_point": args.vnrs,
+            "seed": args.seed,
+        },
+        "results": results,
+    }
+
+
+def compare(
+    baseline: Dict[str, Any], current: Dict[str, Any], threshold: float
+) -> List[Tuple[str, str]]:
+    """
+    Flag points that got slower, hungrier or changed behaviour.
+
+    Throughput and latency are compared relative to the baseline with
+    ``threshold`` tolerance; the acceptance rate must match exactly
+    (within 1e-9) since the workload is seeded.
+
+    Returns:
+        (point label, message) for every regression found
+    """
+    def key(r):
+        return tuple(r[k] for k in POINT_KEYS)
+
+    base = {key(r): r for r in baseline["results"]}
+    regressions = []
+    for r in current["results"]:
+        b = base.get(key(r))
+        if b is None:
+            continue
+        label = " ".join(f"{k}={r[k]}" for k in POINT_KEYS)
+        lower, upper = 1 - threshold, 1 + threshold
+        checks = [
+            ("embeds_per_s", r["embeds_per_s"] < b["embeds_per_s"] * lower),
+            ("p50_ms", r["p50_ms"] > b["p50_ms"] * upper),
+            ("p99_ms", r["p99_ms"] > b["p99_ms"] * upper),
+            ("peak_rss_mb", r["peak_rss_mb"] > b["peak_rss_mb"] * upper),
+            (
+                "acceptance_rate",
+                abs(r["acceptance_rate"] - b["acceptance_rate"]) > 1e-9,
+            ),
+        ]
+        for metric, failed in checks:
+            if failed:
+                regressions.append(
+                    (label, f"{metric}: {b[metric]:.4g} -> {r[metric]:.4g}")
+                )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Embedder scaling benchmark")
+    parser.add_argument("--config", type=str, default="configs/default.yaml")
+    parser.add_argument("--embedders", type=str, nargs="+", default=None)
+    parser.add_argument(
+        "--nodes", type=int, nargs="+", default=[8, 100, 1000, 10000]
+    )
+    parser.add_argument("--avg-degree", type=float, nargs="+", default=[4.0])
+    parser.add_argument("--vnr-nodes", type=int, nargs="+", default=[4, 10])
+    parser.add_argument(
+        "--arrival-rate", type=float, nargs="+", default=[1.8]
+    )
+    parser.add_argument("--vnrs", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", type=str, default=None)
+    parser.add_argument(
+        "--compare",
+        type=str,
+        default=None,
+        help="Baseline JSON to check the results against",
+    )
+    parser.add_argument(
+        "--current",
+        type=str,
+        default=None,
+        help="Compare this results JSON instead of running the sweep",
+    )
+    parser.add_argument("--threshold", type=float, default=0.1)
+    parser.add_argument(
+        "--in-process",
+        action="store_true",
+        help="Run all points in this process (peak RSS becomes cumulative)",
+    )
+    args = parser.parse_args()
+
+    if args.current:
+        with open(args.current) as f:
+            report = json.load(f)
+    else:
+        report = run_sweep(args)
+        out = args.out or (
+            f"benchmarks/results/embedders_"
+            f"{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+        )
+        os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+        with open(out, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n📁 Results saved to: {out}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, report, args.threshold)
+        if not regressions:
+            print(f"\n✅ No regressions against {args.compare}")
+            return
+        print(f"\n⚠️  {len(regressions)} regression(s) against {args.compare}:")
+        for label, message in regressions:
+            print(f"  {label}: {message}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+# benchmarks/bench_link_mapping.py
+
+import argparse
+import time
+from typing import List, Optional
+
+import networkx as nx
+import numpy as np
+
+from utils.link_mapping import find_path
+from utils.substrate_state import SubstrateState
+
+
+def build_substrate(
+    num_nodes: int, avg_degree: float, rng: np.random.Generator
+) -> SubstrateState:
+    p = avg_degree / max(num_nodes - 1, 1)
+    G = nx.fast_gnp_random_graph(num_nodes, p, seed=int(rng.integers(2**31)))
+    edges = np.array(list(G.edges), dtype=np.int64).reshape(-1, 2)
+    cpu = rng.integers(40, 80, size=num_nodes)
+    bandwidth = rng.integers(30, 60, size=len(edges))
+    return SubstrateState(num_nodes, edges[:, 0], edges[:, 1], cpu, bandwidth)
+
+
+def legacy_find_path(
+    substrate: SubstrateState, source: int, target: int, demand: float
+) -> Optional[List[int]]:
+    # 旧実装：仮想リンクごとにフィルタ済みグラフを作り直す
+    G_sub = nx.Graph()
+    for eid in range(substrate.num_edges):
+        if substrate.bandwidth[eid] >= demand:
+            G_sub.add_edge(
+                int(substrate.edge_src[eid]), int(substrate.edge_dst[eid])
+            )
+    if source not in G_sub or target not in G_sub:
+        return None
+    try:
+        return nx.shortest_path(G_sub, source=source, target=target)
+    except nx.NetworkXNoPath:
+        return None
+
+
+def bench(fn, substrate, queries) -> float:
+    start = time.perf_counter()
+    for source, target, demand in queries:
+        fn(substrate, source, target, demand)
+    return len(queries) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Link mapping throughput")
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[1000, 10000]
+    )
+    parser.add_argument("--avg-degree", type=float, default=6.0)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    print(f"{'nodes':>8} {'edges':>8} {'legacy links/s':>16} "
+          f"{'bfs links/s':>14} {'speedup':>8}")
+
+    for n in args.sizes:
+        substrate = build_substrate(n, args.avg_degree, rng)
+        pairs = rng.choice(n, size=(args.queries, 2))
+        demands = rng.integers(20, 40, size=args.queries)
+        queries = [
+            (int(s), int(t), float(d))
+            for (s, t), d in zip(pairs, demands)
+            if s != t
+        ]
+
+        legacy = bench(legacy_find_path, substrate, queries)
+        bfs = bench(find_path, substrate, queries)
+        print(f"{n:>8} {substrate.num_edges:>8} {legacy:>16.1f} "
+              f"{bfs:>14.1f} {bfs / legacy:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+# benchmarks/bench_vnr_generator.py
+
+import argparse
+import time
+
+import networkx as nx
+import numpy as np
+
+from utils.vnr_generator import (
+    generate_virtual_network_request,
+    generate_virtual_network_requests,
+    VNRStream,
+)
+
+
+def legacy_generate(config: dict, rng: np.random.RandomState) -> nx.Graph:
+    # 旧実装：連結になるまで erdos_renyi_graph を引き直す
+    while True:
+        G = nx.erdos_renyi_graph(
+            n=config["num_nodes"], p=config["edge_prob"], seed=rng
+        )
+        if nx.is_connected(G):
+            break
+    for node in G.nodes:
+        G.nodes[node]["cpu"] = rng.randint(*config["cpu_range"])
+    for u, v in G.edges:
+        G.edges[u, v]["bandwidth"] = rng.randint(*config["bandwidth_range"])
+    return G
+
+
+def rate(fn, count: int) -> float:
+    start = time.perf_counter()
+    fn()
+    return count / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="VNR generation throughput")
+    parser.add_argument("--count", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    cases = [(4, 0.6), (4, 0.25), (10, 0.3), (10, 0.1), (20, 0.15)]
+    print(f"{'nodes':>6} {'p':>5} {'legacy/s':>10} {'single/s':>10} "
+          f"{'stream/s':>10} {'batch graphs/s':>15} {'batch arrays/s':>15}")
+
+    for n, p in cases:
+        config = {
+            "num_nodes": n,
+            "edge_prob": p,
+            "cpu_range": [25, 40],
+            "bandwidth_range": [20, 40],
+        }
+        legacy_rng = np.random.RandomState(args.seed)
+        rng = np.random.default_rng(args.seed)
+        count = args.count
+
+        legacy = rate(
+            lambda: [legacy_generate(config, legacy_rng) for _ in range(count)],
+            count,
+        )
+        single = rate(
+            lambda: [
+                generate_virtual_network_request(config, rng)
+                for _ in range(count)
+            ],
+            count,
+        )
+        stream = VNRStream(config, rng)
+        streamed = rate(
+            lambda: [next(stream) for _ in range(count)],
+            count,
+        )
+        graphs = rate(
+            lambda: generate_virtual_network_requests(config, count, rng),
+            count,
+        )
+        arrays = rate(
+            lambda: generate_virtual_network_requests(
+                config, count, rng, as_arrays=True
+            ),
+            count,
+        )
+        print(f"{n:>6} {p:>5} {legacy:>10.0f} {single:>10.0f} "
+              f"{streamed:>10.0f} {graphs:>15.0f} {arrays:>15.0f}")
+
+
+if __name__ == "__main__":
+    main()
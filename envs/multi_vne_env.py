@@ -5,9 +5,11 @@ import gymnasium as gym
 import numpy as np
 from gymnasium import spaces
 
-from utils.substrate_generator import generate_substrate_network
-from utils.vnr_generator import generate_virtual_network_request
+from utils.topology import generate_substrate_state
+from utils.vnr_generator import generate_virtual_network_requests
 from utils.evaluator import apply_embedding
+from utils.observation import ObservationBuilder, observation_space
+from utils.rng import spawn_streams
 from agents.random_embedder import RandomEmbedder
 
 
@@ -24,28 +26,38 @@ class MultiVNEEnv(gym.Env):
         self.current_vnr = None
         self.current_step = 0
         self.embedder = RandomEmbedder()
+        self._seed_seq: np.random.SeedSequence = None
 
-        self.observation_space = spaces.Box(
-            low=0, high=1, shape=(10,), dtype=np.float32
-        )
+        self.observation_space = observation_space(config)
         self.action_space = spaces.Discrete(5)
+        self.obs_builder = ObservationBuilder(config)
 
     def reset(self, seed: int = None, options: Dict[str, Any] = None):
         super().reset(seed=seed)
+        if seed is not None or self._seed_seq is None:
+            # シード無しの初回はグローバルの np.random から1回だけ決める
+            if seed is None:
+                seed = np.random.randint(2**31)
+            self._seed_seq = np.random.SeedSequence(seed)
+        streams = spawn_streams(self._seed_seq)
 
         sn_config = self.config["substrate"]
         vnr_config = self.config["vnr"]
         episodes = self.config["experiment"]["episodes"]
 
-        self.substrate = generate_substrate_network(sn_config)
-        self.vnr_queue = [
-            generate_virtual_network_request(vnr_config)
-            for _ in range(episodes)
-        ]
+        self.substrate = generate_substrate_state(
+            sn_config, streams["substrate"]
+        )
+        self.vnr_queue = generate_virtual_network_requests(
+            vnr_config, episodes, streams["vnrs"]
+        )
+        self.embedder.set_rng(streams["embedder"])
         self.current_vnr = self.vnr_queue.pop(0)
         self.current_step = 0
 
-        self.state = np.random.rand(10).astype(np.float32)
+        self.obs_builder.attach(self.substrate)
+        self.obs_builder.set_vnr(self.current_vnr)
+        self.state = self.obs_builder.observation
         info = {"reset_info": "MultiVNEEnv initialized"}
         return self.state, info
 
@@ -70,7 +82,8 @@ class MultiVNEEnv(gym.Env):
             self.current_vnr = self.vnr_queue.pop(0)
 
         self.current_step += 1
-        self.state = np.random.rand(10).astype(np.float32)
+        self.obs_builder.set_vnr(None if done else self.current_vnr)
+        self.state = self.obs_builder.observation
 
         info = {
             "step": self.current_step,
@@ -2,22 +2,114 @@
 
 import heapq
 import itertools
-from typing import Any, Dict, List, Tuple
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
 
 import gymnasium as gym
 import networkx as nx
 import numpy as np
 from gymnasium import spaces
 
-from utils.evaluator import apply_embedding
-from utils.substrate_generator import generate_substrate_network
-from utils.vnr_generator import generate_virtual_network_request
+from utils.checkpoint import substrate_digest
+from utils.evaluator import embedding_arrays
+from utils.feasibility import FeasibilityFilter
+from utils.online_metrics import OnlineMetrics
+from utils.observation import ObservationBuilder, observation_space
+from utils.path_cache import CacheMark, PathCache
+from utils.profiler import PROFILER
+from utils.rng import (
+    BlockSampler,
+    duration_sampler,
+    interarrival_sampler,
+    spawn_streams,
+)
+from utils.substrate_state import SubstrateState
+from utils.topology import generate_substrate_state
+from utils.vnr_generator import VNRStream
+from utils.vnr_ledger import LedgerEntry, VNRLedger
+from utils.vnr_trace import VNRTrace
 from utils.embedder_factory import get_embedder
 
 
+ARRIVAL = "arrival"
+DEPARTURE = "departure"
+ADMISSION = "admission"
+
+
+class EnvSnapshot(NamedTuple):
+    """
+    Saved PoissonVNEEnv state returned by ``snapshot()``.
+    """
+
+    substrate: SubstrateState
+    cpu: np.ndarray
+    bandwidth: np.ndarray
+    event_queue: List[Tuple[float, int, str, int]]
+    active_vnrs: Dict[int, LedgerEntry]
+    current_time: float
+    next_vnr_id: int
+    next_event_seq: int
+    trace_pos: int
+    rng_state: tuple
+    stream_state: tuple
+    observation_state: tuple
+    path_cache_state: Optional[CacheMark]
+    embedder_state: Optional[tuple]
+    metrics_state: Optional[tuple]
+    batch: List[Tuple[int, nx.Graph, float]]
+
+
 class PoissonVNEEnv(gym.Env):
     """
     VNE environment with Poisson arrival and duration-based departure.
+
+    Arrivals and departures share one event heap of
+    ``(time, seq, kind, vnr_id)`` entries, so expiring a VNR costs
+    O(log n) instead of a scan over every active VNR.
+
+    ``step`` advances the clock by one tick and handles every arrival
+    due by then, anchored on the tick. Generated arrivals are drawn from
+    the tick, so at most one falls in a tick; a replayed trace can have
+    several, which are then reported as a list under ``info["batch"]``
+    (as with ``batch_window``). ``run_until`` / ``run_events``
+    fast-forward through the heap instead, processing arrivals and
+    departures back to back at their own timestamps (a true Poisson
+    arrival process) with no per-tick overhead.
+
+    With ``experiment.batch_window`` > 0, arrivals are not embedded one
+    at a time: every arrival (at its own Poisson timestamp, in ``step``
+    too) joins the open batch, and ``batch_window`` after the first of
+    them an admission event hands the whole batch to the embedder's
+    ``embed_batch``. Lifetimes start at admission. ``step`` then reports
+    the admitted VNRs as a list under ``info["batch"]``.
+
+    Every episode draws from its own streams spawned from the env's
+    ``SeedSequence`` (see :mod:`utils.rng`): substrate, VNR topology,
+    interarrival times, lifetimes and the embedder each get one, so
+    envs in one process never share random state. Interarrival times
+    and lifetimes are pre-drawn in blocks of ``experiment.rng_block_size``.
+
+    If ``vnr.trace`` points at a trace written by
+    ``scripts/generate_trace.py``, arrival times, lifetimes and VNRs are
+    replayed from it instead of being generated, so every embedder sees
+    exactly the same workload.
+
+    Observations come from an ObservationBuilder attached to the
+    substrate (utilization per node / link, the pending VNR's demands
+    and aggregates) and are a read-only view that is updated in place.
+
+    Admitted VNRs are kept in a VNRLedger (``active_vnrs``) as the flat
+    arrays they allocated, so the VNR graphs are dropped on admission
+    and a departure is one vectorized release.
+
+    Unless ``metrics.enabled`` is false, an OnlineMetrics
+    (``self.metrics``) accounts for every arrival and follows the
+    substrate utilization, configured by the ``metrics`` section.
+
+    ``snapshot()`` / ``restore(token)`` save and roll back the whole
+    simulation state (residuals, event heap, active VNRs, RNGs) for
+    lookahead and rollouts without copying any graph. ``get_state()`` /
+    ``set_state(state)`` turn the same state into a picklable dict for
+    checkpoint files (see :mod:`utils.checkpoint`).
     """
 
     def __init__(self, config: Dict[str, Any]):
@@ -25,117 +117,504 @@ class PoissonVNEEnv(gym.Env):
         self.config = config
 
         embedder_name = config["experiment"].get("embedder", "random")
-        self.embedder = get_embedder(embedder_name)
+        self.embedder = get_embedder(
+            embedder_name, config["experiment"].get("embedder_params")
+        )
 
-        self.substrate: nx.Graph = None
-        self.active_vnrs = []
-        self.event_queue = []
+        self.substrate: SubstrateState = None
+        self.active_vnrs: VNRLedger = None
+        self.event_queue: List[Tuple[float, int, str, int]] = []
         self.current_time = 0
         self.vnr_id_counter = itertools.count()
+        self._event_seq = itertools.count()
 
         self.arrival_rate = config["experiment"].get("arrival_rate", 1.0)
         self.duration_range = config["vnr"].get("duration_range", [5, 10])
-
-        self.observation_space = spaces.Box(
-            low=0, high=1, shape=(10,), dtype=np.float32
+        self.batch_window = config["experiment"].get("batch_window", 0)
+        self.use_prefilter = config["experiment"].get("prefilter", True)
+        self.prefilter: FeasibilityFilter = None
+        # 受付待ちの VNR: (vnr_id, vnr, 寿命)
+        self._batch: List[Tuple[int, nx.Graph, float]] = []
+        self.path_cache_size = config["experiment"].get(
+            "path_cache_size", 4096
         )
+        self.path_cache: PathCache = None
+        metrics_config = dict(config.get("metrics") or {})
+        self.use_metrics = metrics_config.pop("enabled", True)
+        self.metrics_params = metrics_config
+        self.metrics: OnlineMetrics = None
+
+        trace_path = config["vnr"].get("trace")
+        self.trace = VNRTrace(trace_path) if trace_path else None
+        self._trace_pos = 0
+        self.vnr_stream: VNRStream = None
+        self.rng_block_size = config["experiment"].get("rng_block_size", 4096)
+        self._seed_seq: np.random.SeedSequence = None
+        self._interarrivals: BlockSampler = None
+        self._durations: BlockSampler = None
+
+        self.observation_space = observation_space(config)
         self.action_space = spaces.Discrete(5)
+        self.obs_builder = ObservationBuilder(config)
 
     def reset(self, seed: int = None, options: Dict[str, Any] = None):
         super().reset(seed=seed)
+        if seed is not None or self._seed_seq is None:
+            # シード無しの初回はグローバルの np.random から1回だけ決める
+            if seed is None:
+                seed = np.random.randint(2**31)
+            self._seed_seq = np.random.SeedSequence(seed)
+        # リセットのたびに新しい子ストリームを払い出す
+        streams = spawn_streams(self._seed_seq)
 
-        self.substrate = generate_substrate_network(self.config["substrate"])
-        self.active_vnrs.clear()
+        self.substrate = generate_substrate_state(
+            self.config["substrate"], streams["substrate"]
+        )
+        self.vnr_stream = VNRStream(self.config["vnr"], streams["vnrs"])
+        self._interarrivals = interarrival_sampler(
+            streams["arrivals"], self.arrival_rate, self.rng_block_size
+        )
+        self._durations = duration_sampler(
+            streams["durations"], self.duration_range, self.rng_block_size
+        )
+        self.embedder.set_rng(streams["embedder"])
+        if self.path_cache_size > 0:
+            self.path_cache = PathCache(self.substrate, self.path_cache_size)
+        if self.use_prefilter:
+            self.prefilter = FeasibilityFilter(
+                self.substrate, split=self.embedder.split
+            )
+        if self.use_metrics:
+            self.metrics = OnlineMetrics(
+                self.substrate, **self.metrics_params
+            )
+        self.obs_builder.attach(self.substrate)
+        self.active_vnrs = VNRLedger(self.substrate)
         self.event_queue.clear()
+        self._batch.clear()
         self.current_time = 0
+        self._trace_pos = 0
 
-        arrival = np.random.exponential(1.0 / self.arrival_rate)
-        heapq.heappush(self.event_queue, (arrival, "arrival"))
+        self._schedule_arrival(self.current_time)
 
-        self.state = np.random.rand(10).astype(np.float32)
+        self.state = self.obs_builder.observation
         return self.state, {"reset_info": "PoissonVNEEnv initialized"}
 
     def step(
             self, action: int
     ) -> Tuple[np.ndarray, float, bool, bool, Dict[str, Any]]:
         self.current_time += 1
+        if self.batch_window > 0:
+            return self._step_batched()
+
         reward = 0.0
         info = {}
 
-        self._expire_vnrs()
-
+        # 退去を先に処理し、到着は現在時刻で扱う
+        arrived = False
+        departed = []
         while self.event_queue and self.event_queue[0][0] <= self.current_time:
-            _, event_type = heapq.heappop(self.event_queue)
-            if event_type == "arrival":
-                vnr = generate_virtual_network_request(self.config["vnr"])
-                vnr_id = next(self.vnr_id_counter)
-                duration = np.random.randint(*self.duration_range)
-                expire_at = self.current_time + duration
-
-                success, node_map, link_paths = self.embedder.embed(
-                    self.substrate, vnr
-                )
+            _, _, kind, vnr_id = heapq.heappop(self.event_queue)
+            if kind == DEPARTURE:
+                departed.append(vnr_id)
+            else:
+                arrived = True
+        # この時刻に退去する VNR はまとめて1回で解放する
+        if departed:
+            with PROFILER.phase("release"):
+                self.active_vnrs.release_many(departed)
 
-                if success:
-                    apply_embedding(
-                        self.substrate, vnr, node_map, link_paths
-                    )
-                    self.active_vnrs.append(
-                        (vnr_id, vnr, node_map, link_paths, expire_at)
-                    )
-                    reward = 1.0
-                    info.update(
-                        {
-                            "success": True,
-                            "vnr_id": vnr_id,
-                            "node_mapping": node_map,
-                            "link_paths": link_paths,
-                            "expires_at": expire_at,
-                        }
-                    )
-                else:
-                    reward = -1.0
-                    info.update({"success": False})
+        # トレースでは1ティックに複数の到着が来うるので全て処理する
+        infos = []
+        while arrived:
+            arrival_reward, arrival_info = self._arrive(self.current_time)
+            reward += arrival_reward
+            infos.append(arrival_info)
+            self._schedule_arrival(self.current_time)
+            arrived = self._arrival_due()
 
-                next_arrival = (
-                    self.current_time
-                    + np.random.exponential(1.0 / self.arrival_rate)
-                )
-                heapq.heappush(self.event_queue, (next_arrival, "arrival"))
-                break
+        if len(infos) == 1:
+            info = infos[0]
+        elif infos:
+            info["batch"] = infos
+            info["accepted"] = sum(i["success"] for i in infos)
 
-        self.state = np.random.rand(10).astype(np.float32)
+        if self.path_cache is not None:
+            info["path_cache"] = self.path_cache.stats()
+
+        self.state = self.obs_builder.observation
         done = False
         truncated = False
         return self.state, reward, done, truncated, info
 
-    def _expire_vnrs(self) -> None:
-        remaining = []
-        for vnr_id, vnr, node_map, link_paths, expire_at in self.active_vnrs:
-            if expire_at <= self.current_time:
-                self._release_resources(vnr, node_map, link_paths)
+    def _arrival_due(self) -> bool:
+        """
+        Pop the next event if it is an arrival due by the current tick.
+        """
+        if not self.event_queue:
+            return False
+        time, _, kind, _ = self.event_queue[0]
+        if kind != ARRIVAL or time > self.current_time:
+            return False
+        heapq.heappop(self.event_queue)
+        return True
+
+    def _step_batched(
+        self,
+    ) -> Tuple[np.ndarray, float, bool, bool, Dict[str, Any]]:
+        reward = 0.0
+        admitted = []
+        while self.event_queue and self.event_queue[0][0] <= self.current_time:
+            time, _, kind, vnr_id = heapq.heappop(self.event_queue)
+            if kind == DEPARTURE:
+                self._depart(vnr_id)
+            elif kind == ARRIVAL:
+                self._collect(time)
             else:
-                remaining.append(
-                    (vnr_id, vnr, node_map, link_paths, expire_at)
+                batch_reward, infos = self._admit_batch(time)
+                reward += batch_reward
+                admitted.extend(infos)
+
+        info: Dict[str, Any] = {}
+        if admitted:
+            info["batch"] = admitted
+            info["accepted"] = sum(i["success"] for i in admitted)
+        if self.path_cache is not None:
+            info["path_cache"] = self.path_cache.stats()
+
+        self.state = self.obs_builder.observation
+        return self.state, reward, False, False, info
+
+    def run_until(self, end_time: float) -> Dict[str, float]:
+        """
+        Process every event with timestamp <= ``end_time``.
+
+        Returns:
+            Counts of arrivals / accepted / departures and summed reward
+        """
+        stats = self._new_run_stats()
+        while self.event_queue and self.event_queue[0][0] <= end_time:
+            self._process_next_event(stats)
+        self.current_time = max(self.current_time, end_time)
+        return stats
+
+    def run_events(self, num_events: int) -> Dict[str, float]:
+        """
+        Process the next ``num_events`` events regardless of their time.
+
+        Returns:
+            Counts of arrivals / accepted / departures and summed reward
+        """
+        stats = self._new_run_stats()
+        for _ in range(num_events):
+            if not self.event_queue:
+                break
+            self._process_next_event(stats)
+        return stats
+
+    @staticmethod
+    def _new_run_stats() -> Dict[str, float]:
+        return {"arrivals": 0, "accepted": 0, "departures": 0, "reward": 0.0}
+
+    def _process_next_event(self, stats: Dict[str, float]) -> None:
+        time, _, kind, vnr_id = heapq.heappop(self.event_queue)
+        self.current_time = time
+        if kind == DEPARTURE:
+            self._depart(vnr_id)
+            stats["departures"] += 1
+        elif kind == ADMISSION:
+            reward, infos = self._admit_batch(time)
+            stats["accepted"] += sum(i["success"] for i in infos)
+            stats["reward"] += reward
+        elif self.batch_window > 0:
+            self._collect(time)
+            stats["arrivals"] += 1
+        else:
+            reward, info = self._arrive(time)
+            self._schedule_arrival(time)
+            stats["arrivals"] += 1
+            stats["accepted"] += int(info["success"])
+            stats["reward"] += reward
+
+    def _schedule_arrival(self, now: float) -> None:
+        if self.trace is not None:
+            if self._trace_pos < len(self.trace):
+                arrival = self.trace.arrival_time(self._trace_pos)
+                heapq.heappush(
+                    self.event_queue,
+                    (arrival, next(self._event_seq), ARRIVAL, -1),
                 )
-        self.active_vnrs = remaining
+        else:
+            arrival = now + next(self._interarrivals)
+            heapq.heappush(
+                self.event_queue,
+                (arrival, next(self._event_seq), ARRIVAL, -1),
+            )
+        # 観測には次に到着する VNR の要求を載せる
+        self.obs_builder.set_vnr(self._pending_vnr())
+
+    def _pending_vnr(self) -> Optional[nx.Graph]:
+        if self.trace is None:
+            return self.vnr_stream.peek()
+        if self._trace_pos < len(self.trace):
+            return self.trace.vnr(self._trace_pos)
+        return None
+
+    def _next_vnr(self) -> Tuple[nx.Graph, float]:
+        with PROFILER.phase("vnr_generation"):
+            if self.trace is not None:
+                vnr = self.trace.vnr(self._trace_pos)
+                duration = self.trace.lifetime(self._trace_pos)
+                self._trace_pos += 1
+            else:
+                vnr = next(self.vnr_stream)
+                duration = next(self._durations)
+        return vnr, duration
+
+    def _arrive(self, now: float) -> Tuple[float, Dict[str, Any]]:
+        vnr, duration = self._next_vnr()
+        vnr_id = next(self.vnr_id_counter)
+
+        # 集計値だけで不可能と分かる VNR は埋め込みを試さない
+        if self.prefilter is not None and not self.prefilter.check(vnr):
+            self._record(vnr, duration)
+            return -1.0, {"success": False}
 
-    def _release_resources(
+        success, node_map, link_paths = self.embedder.embed(
+            self.substrate, vnr
+        )
+
+        if not success:
+            self._record(vnr, duration)
+            return -1.0, {"success": False}
+
+        with PROFILER.phase("apply_embedding"):
+            arrays = embedding_arrays(
+                self.substrate, vnr, node_map, link_paths
+            )
+            self.substrate.allocate(*arrays)
+        self._record(vnr, duration, arrays)
+        return 1.0, self._admitted(
+            vnr_id, arrays, node_map, link_paths, now + duration
+        )
+
+    def _admitted(
         self,
-        vnr: nx.Graph,
+        vnr_id: int,
+        arrays: Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray],
         node_map: Dict[int, int],
         link_paths: Dict[Tuple[int, int], List[int]],
+        expire_at: float,
+    ) -> Dict[str, Any]:
+        # 資源は確保済み。台帳と退去イベントに登録する（VNR は保持しない）
+        self.active_vnrs.add(vnr_id, *arrays, expire_at)
+        heapq.heappush(
+            self.event_queue,
+            (expire_at, next(self._event_seq), DEPARTURE, vnr_id),
+        )
+        return {
+            "success": True,
+            "vnr_id": vnr_id,
+            "node_mapping": node_map,
+            "link_paths": link_paths,
+            "expires_at": expire_at,
+        }
+
+    def _collect(self, now: float) -> None:
+        """
+        Add an arrival to the open batch (opening one if needed) and
+        schedule the next arrival.
+        """
+        vnr, duration = self._next_vnr()
+        if not self._batch:
+            admit_at = now + self.batch_window
+            heapq.heappush(
+                self.event_queue,
+                (admit_at, next(self._event_seq), ADMISSION, -1),
+            )
+        self._batch.append((next(self.vnr_id_counter), vnr, duration))
+        self._schedule_arrival(now)
+
+    def _admit_batch(
+        self, now: float
+    ) -> Tuple[float, List[Dict[str, Any]]]:
+        batch, self._batch = self._batch, []
+        results = self.embedder.embed_batch(
+            self.substrate,
+            [vnr for _, vnr, _ in batch],
+            self.prefilter.check if self.prefilter is not None else None,
+        )
+
+        reward = 0.0
+        infos = []
+        for (vnr_id, vnr, duration), (success, node_map, link_paths) in zip(
+            batch, results
+        ):
+            if success:
+                reward += 1.0
+                # embed_batch が確保した量を台帳用に平坦化する
+                arrays = embedding_arrays(
+                    self.substrate, vnr, node_map, link_paths
+                )
+                self._record(vnr, duration, arrays)
+                infos.append(
+                    self._admitted(
+                        vnr_id, arrays, node_map, link_paths, now + duration
+                    )
+                )
+            else:
+                reward -= 1.0
+                self._record(vnr, duration)
+                infos.append({"success": False, "vnr_id": vnr_id})
+        return reward, infos
+
+    def _record(
+        self,
+        vnr: nx.Graph,
+        duration: float,
+        arrays: Optional[Tuple[np.ndarray, ...]] = None,
     ) -> None:
-        for vnode, snode in node_map.items():
-            cpu = vnr.nodes[vnode]["cpu"]
-            self.substrate.nodes[snode]["cpu"] += cpu
-
-        for (u, v), path in link_paths.items():
-            bw = vnr.edges[u, v]["bandwidth"]
-            for i in range(len(path) - 1):
-                u_, v_ = path[i], path[i + 1]
-                if self.substrate.has_edge(u_, v_):
-                    self.substrate.edges[u_, v_]["bandwidth"] += bw
+        if self.metrics is not None:
+            self.metrics.record(vnr, duration, arrays)
+
+    def _depart(self, vnr_id: int) -> None:
+        with PROFILER.phase("release"):
+            self.active_vnrs.release(vnr_id)
+
+    def snapshot(self) -> EnvSnapshot:
+        """
+        Save the simulation state so it can be rolled back with restore.
+
+        Copies the residual CPU / bandwidth arrays (one memcpy each), the
+        event heap and the active-VNR ledger (shallow; its entries are
+        never mutated), the counters, a mark in the path cache's change
+        log (no copy), the state of every RNG stream (interarrival and
+        lifetime samplers, the VNR stream and the embedder's Generator),
+        the per-substrate cache of embedders that have ``get_state`` /
+        ``set_state`` (e.g. NodeRankEmbedder), and the metric
+        accumulators. No graph is copied.
+        """
+        return EnvSnapshot(
+            substrate=self.substrate,
+            cpu=self.substrate.cpu.copy(),
+            bandwidth=self.substrate.bandwidth.copy(),
+            event_queue=list(self.event_queue),
+            active_vnrs=self.active_vnrs.get_state(),
+            current_time=self.current_time,
+            next_vnr_id=self._peek_counter("vnr_id_counter"),
+            next_event_seq=self._peek_counter("_event_seq"),
+            trace_pos=self._trace_pos,
+            rng_state=(
+                self._interarrivals.get_state(),
+                self._durations.get_state(),
+                self.embedder.rng.bit_generator.state,
+            ),
+            stream_state=self.vnr_stream.get_state(),
+            observation_state=self.obs_builder.get_state(),
+            path_cache_state=(
+                self.path_cache.mark()
+                if self.path_cache is not None
+                else None
+            ),
+            embedder_state=(
+                self.embedder.get_state(self.substrate)
+                if hasattr(self.embedder, "get_state")
+                else None
+            ),
+            metrics_state=(
+                self.metrics.get_state() if self.metrics is not None else None
+            ),
+            batch=list(self._batch),
+        )
+
+    def restore(self, token: EnvSnapshot) -> None:
+        """
+        Roll the env back to a snapshot taken in the current episode.
+
+        Residuals are written back through ``SubstrateState.assign``, so
+        only nodes / edges that changed since the snapshot are touched
+        and reported to the path cache, CPU index and observation; the
+        path cache then undoes its own changes since the mark. A token
+        can be restored any number of times, until an older token is
+        restored.
+        """
+        if token.substrate is not self.substrate:
+            raise ValueError("Snapshot was taken in a different episode")
+
+        self.substrate.assign(token.cpu, token.bandwidth)
+        self.event_queue[:] = token.event_queue
+        self.active_vnrs.set_state(token.active_vnrs)
+        self._batch = list(token.batch)
+        self.current_time = token.current_time
+        self.vnr_id_counter = itertools.count(token.next_vnr_id)
+        self._event_seq = itertools.count(token.next_event_seq)
+        self._trace_pos = token.trace_pos
+        interarrivals, durations, embedder_rng = token.rng_state
+        self._interarrivals.set_state(interarrivals)
+        self._durations.set_state(durations)
+        self.embedder.rng.bit_generator.state = embedder_rng
+        self.vnr_stream.set_state(token.stream_state)
+        # キャッシュの中身で経路の選び方（同長経路の選択）が変わるため戻す
+        if token.path_cache_state is not None:
+            self.path_cache.rollback(token.path_cache_state)
+        self.obs_builder.set_state(token.observation_state)
+        # 埋め込み手法が基盤ごとに持つキャッシュ（NodeRank の順位など）
+        if hasattr(self.embedder, "set_state"):
+            self.embedder.set_state(self.substrate, token.embedder_state)
+        # 利用率のヒストグラムは assign 経由で追従済み。累積値だけ戻す
+        if self.metrics is not None:
+            self.metrics.set_state(token.metrics_state)
+
+    def get_state(self) -> Dict[str, Any]:
+        """
+        Picklable simulation state, for checkpoints.
+
+        Holds everything :meth:`snapshot` saves, with the active-VNR
+        ledger and the path cache packed into flat arrays, plus the
+        prefilter counters and a digest of the substrate. Load it with
+        :meth:`set_state` after ``reset`` has rebuilt the same substrate
+        (same seed); the run then continues exactly as it would have.
+        """
+        state = self.snapshot()._asdict()
+        del state["substrate"]
+        state["active_vnrs"] = self.active_vnrs.pack()
+        if self.path_cache is not None:
+            state["path_cache_state"] = self.path_cache.pack()
+        state["substrate_digest"] = substrate_digest(self.substrate)
+        if self.prefilter is not None:
+            state["prefilter"] = (
+                self.prefilter.checked,
+                self.prefilter.skipped,
+                dict(self.prefilter.reasons),
+            )
+        return state
+
+    def set_state(self, state: Dict[str, Any]) -> None:
+        if state["substrate_digest"] != substrate_digest(self.substrate):
+            raise ValueError("State was saved on a different substrate")
+        fields = {
+            name: state[name]
+            for name in EnvSnapshot._fields
+            if name != "substrate"
+        }
+        fields["active_vnrs"] = VNRLedger.unpack(state["active_vnrs"])
+        fields["path_cache_state"] = None
+        self.restore(EnvSnapshot(substrate=self.substrate, **fields))
+        if self.path_cache is not None:
+            self.path_cache.set_state(
+                PathCache.unpack(state["path_cache_state"])
+            )
+        if self.prefilter is not None and "prefilter" in state:
+            checked, skipped, reasons = state["prefilter"]
+            self.prefilter.checked = checked
+            self.prefilter.skipped = skipped
+            self.prefilter.reasons = dict(reasons)
+
+    def _peek_counter(self, name: str) -> int:
+        # itertools.count は値を読めないので、1つ進めて同じ値から作り直す
+        value = next(getattr(self, name))
+        setattr(self, name, itertools.count(value))
+        return value
 
     def render(self) -> None:
         print(
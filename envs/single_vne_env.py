@@ -6,8 +6,10 @@ import gymnasium as gym
 import numpy as np
 from gymnasium import spaces
 
-from utils.substrate_generator import generate_substrate_network
+from utils.topology import generate_substrate_state
 from utils.vnr_generator import generate_virtual_network_request
+from utils.observation import ObservationBuilder, observation_space
+from utils.rng import spawn_streams
 # 追加インポート
 from agents.random_embedder import RandomEmbedder
 
@@ -22,15 +24,15 @@ class SingleVNEEnv(gym.Env):
 
         self.config = config or {}
 
-        self.observation_space = spaces.Box(
-            low=0, high=1, shape=(10,), dtype=np.float32
-        )
+        self.observation_space = observation_space(self.config)
         self.action_space = spaces.Discrete(5)
+        self.obs_builder = ObservationBuilder(self.config)
 
         self.state = None
         self.substrate = None  # ← SNを保持
         self.vnr = None  # ← VNRを保持する属性を追加
         self.embedder = RandomEmbedder()  # ← 埋め込み器を環境に組み込む
+        self._seed_seq: np.random.SeedSequence = None
 
     def reset(
         self,
@@ -38,15 +40,28 @@ class SingleVNEEnv(gym.Env):
         options: Dict[str, Any] = None,
     ) -> Tuple[np.ndarray, Dict[str, Any]]:
         super().reset(seed=seed)
+        if seed is not None or self._seed_seq is None:
+            # シード無しの初回はグローバルの np.random から1回だけ決める
+            if seed is None:
+                seed = np.random.randint(2**31)
+            self._seed_seq = np.random.SeedSequence(seed)
+        streams = spawn_streams(self._seed_seq)
 
         # YAMLから取得したパラメータで生成
         sn_config = self.config["substrate"]
         vnr_config = self.config["vnr"]
 
-        self.substrate = generate_substrate_network(sn_config)
-        self.vnr = generate_virtual_network_request(vnr_config)
+        self.substrate = generate_substrate_state(
+            sn_config, streams["substrate"]
+        )
+        self.vnr = generate_virtual_network_request(
+            vnr_config, streams["vnrs"]
+        )
+        self.embedder.set_rng(streams["embedder"])
 
-        self.state = np.random.rand(10).astype(np.float32)
+        self.obs_builder.attach(self.substrate)
+        self.obs_builder.set_vnr(self.vnr)
+        self.state = self.obs_builder.observation
 
         info = {"reset_info": "Substrate and VNR generated"}
         return self.state, info
@@ -65,8 +80,8 @@ class SingleVNEEnv(gym.Env):
         terminated = False
         truncated = False
 
-        # 状態更新（とりあえずランダム継続）
-        self.state = np.random.rand(10).astype(np.float32)
+        # 状態は SN と VNR から組み立てた観測（SN 側は更新時に反映済み）
+        self.state = self.obs_builder.observation
 
         info = {
             "success": success,
@@ -78,12 +93,12 @@ class SingleVNEEnv(gym.Env):
 
     def render(self) -> None:
         print("Substrate network overview:")
-        print(f"- Nodes: {self.substrate.number_of_nodes()}")
-        print(f"- Edges: {self.substrate.number_of_edges()}")
+        print(f"- Nodes: {self.substrate.num_nodes}")
+        print(f"- Edges: {self.substrate.num_edges}")
 
         print("Node CPU capacities:")
-        for node, data in self.substrate.nodes(data=True):
-            print(f"  Node {node}: CPU={data['cpu']}")
+        for node, cpu in enumerate(self.substrate.cpu.tolist()):
+            print(f"  Node {node}: CPU={cpu}")
 
         print("\nVNR overview:")
         print(f"- Nodes: {self.vnr.number_of_nodes()}")
@@ -0,0 +1,313 @@
+# envs/vector_poisson_vne_env.py
+
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+from gymnasium import spaces
+from gymnasium.vector import AutoresetMode, VectorEnv
+from gymnasium.vector.utils import batch_space
+
+from utils.embedder_factory import get_embedder
+from utils.evaluator import embedding_arrays
+from utils.observation import ObservationBuilder, observation_space
+from utils.path_cache import PathCache
+from utils.rng import (
+    BlockSampler,
+    duration_sampler,
+    interarrival_sampler,
+    spawn_streams,
+)
+from utils.substrate_state import SubstrateState
+from utils.topology import generate_substrate_state, topology_num_nodes
+from utils.vnr_generator import VNRStream
+from utils.vnr_ledger import VNRLedger
+
+
+class VectorPoissonVNEEnv(VectorEnv):
+    """
+    Batched PoissonVNEEnv stepping ``num_envs`` independent substrates.
+
+    Residual CPU / bandwidth of all substrates live in stacked
+    ``(num_envs, max_nodes)`` / ``(num_envs, max_edges)`` arrays; each
+    sub-env's SubstrateState holds views into its row, so the embedders
+    still see a plain SubstrateState. Clocks, next-arrival and
+    next-expiry times are ``(num_envs,)`` arrays and are advanced and
+    compared for all sub-envs at once, and arriving VNRs go through a
+    batched node/link feasibility check before any embedder is called.
+
+    Sub-env ``i`` reset with seed ``s`` spawns its streams from its own
+    ``SeedSequence(s)`` exactly like ``PoissonVNEEnv.reset(seed=s)``
+    (including a separate embedder stream, handed to the shared
+    embedder before each of its calls), so it reproduces that env step
+    for step. Randomized embedders stay in step only while both envs
+    call them for the same VNRs, which the two differing pre-checks do
+    not guarantee.
+
+    Episodes are truncated after ``experiment.max_steps`` steps and
+    auto-reset on the following step (gymnasium's NEXT_STEP mode).
+
+    Observations are rows of one ``(num_envs, D)`` array, each kept up
+    to date by the sub-env's ObservationBuilder; ``reset`` / ``step``
+    return a read-only view of it rather than a copy.
+    """
+
+    metadata = {"autoreset_mode": AutoresetMode.NEXT_STEP}
+
+    def __init__(self, config: Dict[str, Any], num_envs: int):
+        super().__init__()
+        self.config = config
+        self.num_envs = num_envs
+
+        embedder_name = config["experiment"].get("embedder", "random")
+        self.embedder = get_embedder(
+            embedder_name, config["experiment"].get("embedder_params")
+        )
+
+        self.arrival_rate = config["experiment"].get("arrival_rate", 1.0)
+        self.duration_range = config["vnr"].get("duration_range", [5, 10])
+        self.max_steps = config["experiment"].get("max_steps", 30)
+        self.path_cache_size = config["experiment"].get(
+            "path_cache_size", 4096
+        )
+
+        self.single_observation_space = observation_space(config)
+        self.single_action_space = spaces.Discrete(5)
+        self.observation_space = batch_space(
+            self.single_observation_space, num_envs
+        )
+        self.action_space = batch_space(self.single_action_space, num_envs)
+
+        # 全サブ環境の残余資源をまとめて保持（行ごとのビューを各 SN に渡す）
+        max_nodes = topology_num_nodes(config["substrate"])
+        self.cpu = np.zeros((num_envs, max_nodes), dtype=np.float64)
+        self.bandwidth = np.zeros((num_envs, 0), dtype=np.float64)
+
+        self.substrates: List[SubstrateState] = [None] * num_envs
+        self.active_vnrs: List[VNRLedger] = [None] * num_envs
+        self.vnr_id_counters = np.zeros(num_envs, dtype=np.int64)
+        self.current_time = np.zeros(num_envs, dtype=np.float64)
+        self.next_arrival = np.zeros(num_envs, dtype=np.float64)
+        self.next_expiry = np.full(num_envs, np.inf)
+        self.episode_steps = np.zeros(num_envs, dtype=np.int64)
+        self._autoreset = np.zeros(num_envs, dtype=bool)
+        self.rng_block_size = config["experiment"].get("rng_block_size", 4096)
+        self._seed_seqs: List[np.random.SeedSequence] = [None] * num_envs
+        self._interarrivals: List[BlockSampler] = [None] * num_envs
+        self._durations: List[BlockSampler] = [None] * num_envs
+        self._embedder_rngs: List[np.random.Generator] = [None] * num_envs
+        self.vnr_streams: List[VNRStream] = [None] * num_envs
+
+        # 観測は (num_envs, D) の配列で、各行を ObservationBuilder が更新
+        self.state = np.zeros(
+            (num_envs,) + self.single_observation_space.shape,
+            dtype=self.single_observation_space.dtype,
+        )
+        self.obs_builders = [
+            ObservationBuilder(config, out=self.state[i])
+            for i in range(num_envs)
+        ]
+        self._obs_view = self.state.view()
+        self._obs_view.flags.writeable = False
+
+    # ------------------------------------------------------------------
+    # Gymnasium VectorEnv API
+    # ------------------------------------------------------------------
+    def reset(
+        self,
+        *,
+        seed: Optional[Union[int, Sequence[int]]] = None,
+        options: Optional[Dict[str, Any]] = None,
+    ) -> Tuple[np.ndarray, Dict[str, Any]]:
+        if seed is None:
+            seeds = [None] * self.num_envs
+        elif isinstance(seed, int):
+            seeds = [seed + i for i in range(self.num_envs)]
+        else:
+            seeds = list(seed)
+            assert len(seeds) == self.num_envs
+
+        for i, s in enumerate(seeds):
+            self._reset_env(i, s)
+        self._autoreset[:] = False
+
+        return self._obs_view, {}
+
+    def step(
+        self, actions: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, Dict[str, Any]]:
+        rewards = np.zeros(self.num_envs, dtype=np.float64)
+        terminations = np.zeros(self.num_envs, dtype=bool)
+        truncations = np.zeros(self.num_envs, dtype=bool)
+        success = np.zeros(self.num_envs, dtype=bool)
+
+        # 前ステップで終了したサブ環境はこのステップでリセット
+        for i in np.flatnonzero(self._autoreset).tolist():
+            self._reset_env(i, None)
+
+        stepping = ~self._autoreset
+        self.current_time[stepping] += 1
+        self.episode_steps[stepping] += 1
+
+        # --- 退去処理（期限の来た環境のみ走査） ---
+        expiring = stepping & (self.next_expiry <= self.current_time)
+        for i in np.flatnonzero(expiring).tolist():
+            self._expire_vnrs(i)
+
+        # --- 到着処理 ---
+        arriving = np.flatnonzero(
+            stepping & (self.next_arrival <= self.current_time)
+        ).tolist()
+        vnrs = []
+        for i in arriving:
+            vnr = next(self.vnr_streams[i])
+            duration = next(self._durations[i])
+            vnrs.append((vnr, duration))
+
+        feasible = self._batch_feasible(arriving, [v for v, _ in vnrs])
+
+        for k, i in enumerate(arriving):
+            vnr, duration = vnrs[k]
+            vnr_id = int(self.vnr_id_counters[i])
+            self.vnr_id_counters[i] += 1
+            expire_at = self.current_time[i] + duration
+
+            ok = False
+            if feasible[k]:
+                self.embedder.set_rng(self._embedder_rngs[i])
+                ok, node_map, link_paths = self.embedder.embed(
+                    self.substrates[i], vnr
+                )
+            if ok:
+                arrays = embedding_arrays(
+                    self.substrates[i], vnr, node_map, link_paths
+                )
+                self.substrates[i].allocate(*arrays)
+                self.active_vnrs[i].add(vnr_id, *arrays, expire_at)
+                self.next_expiry[i] = min(self.next_expiry[i], expire_at)
+                rewards[i] = 1.0
+                success[i] = True
+            else:
+                rewards[i] = -1.0
+
+            self.next_arrival[i] = self.current_time[i] + next(
+                self._interarrivals[i]
+            )
+            self.obs_builders[i].set_vnr(self.vnr_streams[i].peek())
+
+        truncations[stepping] = self.episode_steps[stepping] >= self.max_steps
+        self._autoreset = terminations | truncations
+
+        arrived = np.zeros(self.num_envs, dtype=bool)
+        arrived[arriving] = True
+        infos = {
+            "success": success,
+            "_success": arrived,
+            "num_active": np.array([len(a) for a in self.active_vnrs]),
+            "_num_active": np.ones(self.num_envs, dtype=bool),
+        }
+        return self._obs_view, rewards, terminations, truncations, infos
+
+    def render(self) -> None:
+        for i in range(self.num_envs):
+            print(
+                f"[{i}] Time: {self.current_time[i]}, "
+                f"Active VNRs: {len(self.active_vnrs[i])}"
+            )
+
+    def close_extras(self, **kwargs: Any) -> None:
+        pass
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+    def _reset_env(self, i: int, seed: Optional[int]) -> None:
+        if seed is not None or self._seed_seqs[i] is None:
+            if seed is None:
+                seed = np.random.randint(2**31)
+            self._seed_seqs[i] = np.random.SeedSequence(seed)
+        streams = spawn_streams(self._seed_seqs[i])
+
+        substrate = generate_substrate_state(
+            self.config["substrate"], streams["substrate"]
+        )
+        self._bind(i, substrate)
+        self.vnr_streams[i] = VNRStream(self.config["vnr"], streams["vnrs"])
+        self._interarrivals[i] = interarrival_sampler(
+            streams["arrivals"], self.arrival_rate, self.rng_block_size
+        )
+        self._durations[i] = duration_sampler(
+            streams["durations"], self.duration_range, self.rng_block_size
+        )
+        self._embedder_rngs[i] = streams["embedder"]
+        if self.path_cache_size > 0:
+            PathCache(substrate, self.path_cache_size)
+
+        self.substrates[i] = substrate
+        self.obs_builders[i].attach(substrate)
+        self.active_vnrs[i] = VNRLedger(substrate)
+        self.vnr_id_counters[i] = 0
+        self.current_time[i] = 0
+        self.episode_steps[i] = 0
+        self.next_expiry[i] = np.inf
+        self.next_arrival[i] = next(self._interarrivals[i])
+        self.obs_builders[i].set_vnr(self.vnr_streams[i].peek())
+
+    def _bind(self, i: int, substrate: SubstrateState) -> None:
+        """
+        Move a sub-env's residual arrays into row ``i`` of the stacks.
+        """
+        n, m = substrate.num_nodes, substrate.num_edges
+        if m > self.bandwidth.shape[1]:
+            grown = np.zeros((self.num_envs, m), dtype=np.float64)
+            grown[:, :self.bandwidth.shape[1]] = self.bandwidth
+            self.bandwidth = grown
+            for j, other in enumerate(self.substrates):
+                if other is not None and j != i:
+                    other.bandwidth = self.bandwidth[j, :other.num_edges]
+
+        self.cpu[i] = 0.0
+        self.bandwidth[i] = 0.0
+        self.cpu[i, :n] = substrate.cpu
+        self.bandwidth[i, :m] = substrate.bandwidth
+        substrate.cpu = self.cpu[i, :n]
+        substrate.bandwidth = self.bandwidth[i, :m]
+
+    def _expire_vnrs(self, i: int) -> None:
+        self.next_expiry[i] = self.active_vnrs[i].release_expired(
+            self.current_time[i]
+        )
+
+    def _batch_feasible(self, envs: List[int], vnrs: list) -> np.ndarray:
+        """
+        Necessary-condition check for all arriving VNRs at once.
+
+        A VNR is rejected without calling the embedder when its sorted
+        CPU demands cannot be matched against the sub-env's largest
+        residual CPUs, or when its largest link demand exceeds every
+        residual link bandwidth (unless the embedder splits links).
+        Every embedder maps virtual nodes to distinct substrate nodes and,
+        without splitting, needs one substrate edge per virtual link that
+        carries its whole demand, so this never rejects an embeddable VNR.
+        """
+        if not envs:
+            return np.zeros(0, dtype=bool)
+
+        max_v = max(vnr.number_of_nodes() for vnr in vnrs)
+        demands = np.zeros((len(envs), max_v))
+        max_bw = np.zeros(len(envs))
+        for k, vnr in enumerate(vnrs):
+            cpu = sorted((d for _, d in vnr.nodes(data="cpu")), reverse=True)
+            demands[k, :len(cpu)] = cpu
+            max_bw[k] = max(
+                (bw for _, _, bw in vnr.edges(data="bandwidth")), default=0
+            )
+
+        # 各環境の CPU 上位 max_v ノードと需要を降順同士で比較
+        top_cpu = -np.sort(-self.cpu[envs], axis=1)[:, :max_v]
+        if top_cpu.shape[1] < max_v:
+            return np.zeros(len(envs), dtype=bool)
+        node_ok = (top_cpu >= demands).all(axis=1)
+        if self.embedder.split:
+            return node_ok
+        link_ok = self.bandwidth[envs].max(axis=1, initial=0.0) >= max_bw
+        return node_ok & link_ok
@@ -1,83 +1,382 @@
 # run_experiment.py
 
 import argparse
+import cProfile
 import os
 import copy
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from datetime import datetime
+from typing import Iterator, List, Optional, Sequence
 import pandas as pd
 
 from envs.poisson_vne_env import PoissonVNEEnv
+from utils.checkpoint import CheckpointWriter, load_checkpoint
 from utils.config_loader import load_config
 from utils.seed import set_seed
 from utils.embedder_factory import get_embedder
+from utils.profiler import PROFILER
+from utils.run_logger import RunLogger
+from utils.sweep import (
+    cell_dir,
+    config_hash,
+    expand_grid,
+    load_cell_runs,
+    prepare_cell,
+    resolve_cell,
+    save_cell_run,
+)
 
 
-def run_single_experiment(config: dict, run_id: int = 0) -> dict:
+def run_single_experiment(
+    config: dict, run_id: int = 0, resume: bool = False
+) -> dict:
+    """
+    Run one experiment for ``max_steps`` steps and summarize it.
+
+    With ``experiment.checkpoint_interval`` > 0 the run state (env
+    state, step, running totals) is saved every that many steps to
+    ``<checkpoint_dir>/run_<id>_<config hash>.ckpt`` in the background,
+    and removed once the run completes. With ``resume=True`` a run whose
+    checkpoint exists continues from it and produces the same result as
+    an uninterrupted run; its step log and metric snapshots continue the
+    files of the interrupted run, cut back to the checkpoint. Parquet
+    step logs are then written as part files closed at every
+    checkpoint (see ``RunLogger``), so a killed run keeps its rows.
+    """
+    profile_config = config.get("profiling", {})
+    PROFILER.reset(enabled=profile_config.get("phases", False))
+    profiler = cProfile.Profile() if profile_config.get("cprofile") else None
+    start = time.perf_counter()
+    if profiler is not None:
+        profiler.enable()
+
+    checkpoint_interval = config["experiment"].get("checkpoint_interval", 0)
+    checkpoint_dir = config["experiment"].get("checkpoint_dir", "checkpoints")
+    # 設定が変わったら別のチェックポイントになるよう、変更前の設定で名前を決める
+    checkpoint_path = os.path.join(
+        checkpoint_dir, f"run_{run_id}_{config_hash(config)}.ckpt"
+    )
+
     seed = config["experiment"].get("seed", 42) + run_id
     set_seed(seed)
     config["experiment"]["seed"] = seed
 
     embedder_name = config["experiment"].get("embedder", "first_fit")
-    embedder = get_embedder(embedder_name)
+    embedder = get_embedder(
+        embedder_name, config["experiment"].get("embedder_params")
+    )
     config["embedder"] = embedder  # PoissonVNEEnv に渡す
 
     env = PoissonVNEEnv(copy.deepcopy(config))
-    obs, info = env.reset()
+    obs, info = env.reset(seed=seed)
 
     total_reward = 0.0
     success_count = 0
+    batch_arrivals = 0
     steps = config["experiment"].get("max_steps", 30)
-    log_records = []
-
-    for step in range(1, steps + 1):
-        obs, reward, done, truncated, info = env.step(action=0)
-        total_reward += reward
-        if info.get("success"):
-            success_count += 1
-
-        log_records.append(
-            {
-                "step": step,
-                "reward": reward,
-                "success": info.get("success"),
-                "node_mapping": str(info.get("node_mapping", "")),
-                "link_paths": str(info.get("link_paths", "")),
-                "expires_at": info.get("expires_at", ""),
-            }
-        )
+    first_step = 1
+    log_state = None
+
+    # reset で同じ基盤を作り直してから、保存した状態を上書きする
+    if resume and os.path.exists(checkpoint_path):
+        checkpoint = load_checkpoint(checkpoint_path)
+        env.set_state(checkpoint["env"])
+        total_reward = checkpoint["total_reward"]
+        success_count = checkpoint["success_count"]
+        batch_arrivals = checkpoint["batch_arrivals"]
+        first_step = checkpoint["step"] + 1
+        log_state = checkpoint["log"]
+        print(f"↩️  Run {run_id}: resumed after step {checkpoint['step']}")
 
+    writer = None
+    if checkpoint_interval > 0:
+        os.makedirs(checkpoint_dir, exist_ok=True)
+        writer = CheckpointWriter(checkpoint_path)
+
+    log_config = config.get("logging", {})
     os.makedirs("logs/poisson", exist_ok=True)
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    log_path = f"logs/poisson/run_{run_id}_{timestamp}.csv"
-    pd.DataFrame(log_records).to_csv(log_path, index=False)
+    if log_state is None:
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        log_path = f"logs/poisson/run_{run_id}_{timestamp}"
+    else:
+        # 中断した run のログを、チェックポイント時点まで切り詰めて続ける
+        log_path = log_state["path"]
+    logger = RunLogger(
+        log_path,
+        level=log_config.get("level", "steps"),
+        chunk_size=log_config.get("chunk_size", 1024),
+        fmt=log_config.get("format", "auto"),
+        parts=checkpoint_interval > 0,
+        resume_from=log_state,
+    )
+
+    with logger:
+        for step in range(first_step, steps + 1):
+            obs, reward, done, truncated, info = env.step(action=0)
+            total_reward += reward
+            metrics = env.metrics
+            if metrics is not None and metrics.due(env.current_time):
+                logger.log_metrics(metrics.snapshot(env.current_time))
+            # バッチ受付時は受け付けた VNR ごとに 1 行ずつ記録
+            records = info.get("batch")
+            if records is None:
+                records = [dict(info, reward=reward)]
+                batch_arrivals += int("success" in info)
+            else:
+                batch_arrivals += len(records)
+                records = [
+                    dict(r, reward=1.0 if r["success"] else -1.0)
+                    for r in records
+                ]
+
+            for record in records:
+                if record.get("success"):
+                    success_count += 1
+                with PROFILER.phase("logging"):
+                    logger.log_step(
+                        step,
+                        record["reward"],
+                        record.get("success"),
+                        record.get("node_mapping"),
+                        record.get("link_paths"),
+                        record.get("expires_at"),
+                    )
 
-    return {
+            if writer is not None and step % checkpoint_interval == 0:
+                log_state = {"path": log_path, **logger.checkpoint()}
+                writer.save(
+                    {
+                        "step": step,
+                        "total_reward": total_reward,
+                        "success_count": success_count,
+                        "batch_arrivals": batch_arrivals,
+                        "log": log_state,
+                        "env": env.get_state(),
+                    }
+                )
+
+    if writer is not None:
+        writer.remove()
+
+    elapsed = time.perf_counter() - start
+    result = {
         "run_id": run_id,
         "seed": seed,
         "total_reward": total_reward,
         "success_count": success_count,
         "acceptance_rate": success_count / steps,
     }
+    if env.metrics is not None:
+        result.update(env.metrics.summary())
+    if env.prefilter is not None:
+        result["prefilter_skipped"] = env.prefilter.skipped
+    # バッチ受付やトレース再生では、1 ステップの到着数が 1 とは限らない
+    if env.batch_window > 0 or env.trace is not None:
+        result["arrivals"] = batch_arrivals
+        result["acceptance_rate"] = success_count / max(batch_arrivals, 1)
+    if PROFILER.enabled:
+        result["run_s"] = elapsed
+        result.update(PROFILER.totals())
+
+    # --- プロファイル出力（--profile 指定時のみ） ---
+    if profiler is not None:
+        profiler.disable()
+        os.makedirs("results/profile", exist_ok=True)
+        stats_path = f"results/profile/run_{run_id}.pstats"
+        profiler.dump_stats(stats_path)
+        print(f"\n⏱️  Run {run_id}: {elapsed:.3f}s (pstats: {stats_path})")
+        print(PROFILER.table(elapsed))
+
+    return result
+
+
+# ワーカープロセスごとに一度だけ受け取る設定
+_worker_config: dict = None
+_worker_resume = False
+
+
+def _init_worker(config: dict, resume: bool) -> None:
+    global _worker_config, _worker_resume
+    _worker_config = config
+    _worker_resume = resume
+
+
+def _run_in_worker(run_id: int) -> dict:
+    return run_single_experiment(
+        copy.deepcopy(_worker_config), run_id=run_id, resume=_worker_resume
+    )
+
+
+def _run_failed(config: dict, run_id: int, error: BaseException) -> dict:
+    seed = config["experiment"].get("seed", 42) + run_id
+    print(f"❌ Run {run_id} (seed={seed}) failed: {error!r}")
+    return {"run_id": run_id, "seed": seed, "error": repr(error)}
+
+
+def iter_runs(
+    config: dict,
+    repeat: int,
+    workers: int = 1,
+    run_ids: Optional[Sequence[int]] = None,
+    resume: bool = False,
+) -> Iterator[dict]:
+    """
+    Yield one result dict per run as soon as it finishes.
+
+    With ``workers > 1`` the runs are spread over a process pool; the
+    config is sent to each worker once through the pool initializer and
+    only the run id travels with every task. A run that raises yields a
+    dict with an ``error`` entry instead of stopping the batch.
 
+    ``run_ids`` restricts the batch to a subset of ``range(repeat)``;
+    ``resume`` lets runs continue from their checkpoints.
+    """
+    run_ids = list(range(repeat) if run_ids is None else run_ids)
+    if workers <= 1:
+        for run_id in run_ids:
+            print(f"\n--- Running experiment {run_id + 1}/{repeat} ---")
+            try:
+                yield run_single_experiment(
+                    copy.deepcopy(config), run_id=run_id, resume=resume
+                )
+            except Exception as e:
+                yield _run_failed(config, run_id, e)
+        return
 
-def run_batch(config_path: str, repeat: int = 1) -> None:
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(config, resume),
+    ) as pool:
+        futures = {
+            pool.submit(_run_in_worker, run_id): run_id
+            for run_id in run_ids
+        }
+        total = len(futures)
+        for done, future in enumerate(as_completed(futures), start=1):
+            run_id = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                yield _run_failed(config, run_id, e)
+                continue
+            print(f"--- Finished experiment {run_id} ({done}/{total}) ---")
+            yield result
+
+
+def run_batch(
+    config_path: str,
+    repeat: int = 1,
+    workers: int = 1,
+    profile: bool = False,
+    resume: bool = False,
+) -> pd.DataFrame:
+    """
+    Run ``repeat`` seeds of one config and write the summary CSV.
+
+    A failed run stays in the summary as a row with its ``run_id``,
+    ``seed`` and ``error``, so it cannot silently drop out.
+
+    Returns:
+        The summary, one row per run in ``run_id`` order
+    """
     config = load_config(config_path)
-    results = []
+    if profile:
+        config.setdefault("profiling", {})
+        config["profiling"].update({"phases": True, "cprofile": True})
+    results: List[dict] = []
+    failed: List[dict] = []
 
-    for run_id in range(repeat):
-        print(f"\n--- Running experiment {run_id + 1}/{repeat} ---")
-        result = run_single_experiment(copy.deepcopy(config), run_id=run_id)
-        results.append(result)
+    for result in iter_runs(config, repeat, workers, resume=resume):
+        (failed if "error" in result else results).append(result)
 
-    df = pd.DataFrame(results)
+    # 完了順に依存しないよう run_id 順に並べる（失敗した run も残す）
+    df = pd.DataFrame(
+        sorted(results + failed, key=lambda r: r["run_id"])
+    )
     embedder = config["experiment"].get("embedder", "unknown")
     os.makedirs("results", exist_ok=True)
     result_path = f"results/summary_{embedder}.csv"
     df.to_csv(result_path, index=False)
 
     print("\n✅ Batch experiment finished.")
-    print(df.describe())
+    if results:
+        print(df.describe())
     print(f"\n📁 Results saved to: {result_path}")
+    if failed:
+        failed_ids = sorted(r["run_id"] for r in failed)
+        print(f"\n⚠️  {len(failed)} run(s) failed: {failed_ids}")
+    return df
+
+
+def run_sweep(
+    sweep_path: str, workers: int = 1, resume: bool = False
+) -> List[str]:
+    """
+    Run every cell of a parameter grid, skipping work already done.
+
+    The sweep file names a ``base`` config, a ``grid`` of dotted config
+    paths to value lists, ``repeat`` (runs per cell) and ``out``. Each
+    cell's fully resolved config is hashed; its runs are stored as
+    ``<out>/<hash>/runs/run_<id>.json`` as soon as they finish, so a
+    rerun (after an interruption, or with new grid values) only does
+    the runs whose files are missing.
+
+    Returns:
+        A label for every run that failed (they are not stored)
+    """
+    sweep = load_config(sweep_path)
+    base = load_config(sweep.get("base", "configs/default.yaml"))
+    repeat = sweep.get("repeat", 1)
+    out_dir = sweep.get("out", "results/sweep")
+    cells = expand_grid(sweep["grid"])
+
+    rows: List[dict] = []
+    failed: List[str] = []
+    for k, overrides in enumerate(cells, start=1):
+        config = resolve_cell(base, overrides)
+        path = cell_dir(out_dir, config)
+        prepare_cell(path, config)
+
+        runs = load_cell_runs(path)
+        pending = [r for r in range(repeat) if r not in runs]
+        label = ", ".join(f"{key}={value}" for key, value in overrides.items())
+        print(
+            f"\n=== Cell {k}/{len(cells)} [{os.path.basename(path)}] "
+            f"{label}: {repeat - len(pending)}/{repeat} done ==="
+        )
+
+        # --- 未完了の run だけ実行し、終わった順に保存 ---
+        if pending:
+            for result in iter_runs(
+                config, repeat, workers, pending, resume=resume
+            ):
+                if "error" in result:
+                    failed.append(f"{label} run {result['run_id']}")
+                    continue
+                save_cell_run(path, result)
+                runs[result["run_id"]] = result
+
+        for run_id in sorted(r for r in runs if r < repeat):
+            rows.append(
+                {"cell": os.path.basename(path), **overrides, **runs[run_id]}
+            )
+
+    os.makedirs(out_dir, exist_ok=True)
+    summary_path = os.path.join(out_dir, "summary.csv")
+    df = pd.DataFrame(rows)
+    df.to_csv(summary_path, index=False)
+
+    print("\n✅ Sweep finished.")
+    if not df.empty:
+        keys = list(sweep["grid"])
+        print(df.groupby(keys)["acceptance_rate"].agg(["mean", "std"]))
+    print(f"\n📁 Results saved to: {summary_path}")
+    if failed:
+        print(f"\n⚠️  {len(failed)} run(s) failed: {failed}")
+    return failed
 
 
 if __name__ == "__main__":
@@ -91,5 +390,48 @@ if __name__ == "__main__":
     parser.add_argument(
         "--repeat", type=int, default=1, help="Number of repeated experiments"
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of worker processes for repeated experiments",
+    )
+    parser.add_argument(
+        "--sweep",
+        type=str,
+        default=None,
+        help="Sweep file with a parameter grid (overrides --config/--repeat)",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help=(
+            "Dump cProfile stats and a per-phase breakdown for each run "
+            "(not with --sweep)"
+        ),
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Continue interrupted runs from their checkpoints",
+    )
     args = parser.parse_args()
-    run_batch(args.config, repeat=args.repeat)
+    if args.sweep and args.profile:
+        # スイープのセルは設定ハッシュで再利用するので計測列を混ぜない
+        parser.error("--profile cannot be combined with --sweep")
+    if args.sweep:
+        failed = run_sweep(
+            args.sweep, workers=args.workers, resume=args.resume
+        )
+    else:
+        summary = run_batch(
+            args.config,
+            repeat=args.repeat,
+            workers=args.workers,
+            profile=args.profile,
+            resume=args.resume,
+        )
+        failed = "error" in summary
+    # 失敗した run があれば非ゼロで終了する
+    if failed:
+        sys.exit(1)
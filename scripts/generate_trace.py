@@ -0,0 +1,39 @@
+# scripts/generate_trace.py
+"""
+Pre-generate a binary VNR workload trace.
+
+Run it as a module from the repository root so ``utils`` is importable::
+
+    python -m scripts.generate_trace --out traces/default --num-vnrs 100000
+"""
+
+import argparse
+
+from utils.config_loader import load_config
+from utils.vnr_trace import generate_trace
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Pre-generate a binary VNR workload trace",
+        epilog="Run from the repository root as "
+        "`python -m scripts.generate_trace`.",
+    )
+    parser.add_argument(
+        "--config",
+        type=str,
+        default="configs/default.yaml",
+        help="Path to config file (vnr / arrival_rate sections are used)",
+    )
+    parser.add_argument(
+        "--num-vnrs", type=int, default=100000, help="Number of VNRs"
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    parser.add_argument(
+        "--out", type=str, required=True, help="Output trace directory"
+    )
+    args = parser.parse_args()
+
+    config = load_config(args.config)
+    generate_trace(config, args.num_vnrs, args.out, seed=args.seed)
+    print(f"📁 Trace with {args.num_vnrs} VNRs saved to: {args.out}")
@@ -0,0 +1,143 @@
+import copy
+import glob
+import multiprocessing
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+import run_experiment
+from envs.poisson_vne_env import PoissonVNEEnv
+from utils.checkpoint import load_checkpoint, write_checkpoint
+from utils.config_loader import load_config
+
+
+def rollout(env, steps):
+    trajectory = []
+    for _ in range(steps):
+        obs, reward, _, _, info = env.step(action=0)
+        trajectory.append((obs.copy(), reward, str(info)))
+    return (
+        trajectory,
+        env.substrate.cpu.copy(),
+        env.substrate.bandwidth.copy(),
+        sorted(env.active_vnrs),
+        list(env.event_queue),
+        env.metrics.summary(),
+    )
+
+
+def assert_same(a, b):
+    for (obs_a, r_a, i_a), (obs_b, r_b, i_b) in zip(a[0], b[0]):
+        assert np.array_equal(obs_a, obs_b) and r_a == r_b and i_a == i_b
+    assert np.array_equal(a[1], b[1]) and np.array_equal(a[2], b[2])
+    assert a[3] == b[3] and a[4] == b[4] and a[5] == b[5]
+
+
+def check_env(config, path, label):
+    env = PoissonVNEEnv(config)
+    env.reset(seed=7)
+    for _ in range(40):
+        env.step(action=0)
+    write_checkpoint(path, env.get_state())
+    first = rollout(env, 60)
+
+    # 別の env を同じシードで作り、ファイルから続きを再現する
+    resumed = PoissonVNEEnv(config)
+    resumed.reset(seed=7)
+    resumed.set_state(load_checkpoint(path))
+    assert_same(first, rollout(resumed, 60))
+    print(f"{label}: checkpoint reproduces the rollout")
+
+
+class CrashingEnv(PoissonVNEEnv):
+    def step(self, action):
+        if self.current_time == 37:
+            # 後始末なしでプロセスごと落とす（ログのフッターも書かれない）
+            os._exit(1)
+        return super().step(action)
+
+
+def crash_run(config):
+    run_experiment.PoissonVNEEnv = CrashingEnv
+    run_experiment.run_single_experiment(config)
+
+
+def read_logs(fmt):
+    # logs/poisson に残った1組のログ（ステップ行とメトリクス）を読む
+    (metrics_path,) = glob.glob("logs/poisson/*_metrics.jsonl")
+    base = metrics_path[: -len("_metrics.jsonl")]
+    paths = sorted(glob.glob(f"{base}*.{fmt}"))
+    assert paths and len(os.listdir("logs/poisson")) == len(paths) + 1
+    if fmt == "parquet":
+        rows = pd.concat([pd.read_parquet(p) for p in paths])
+    else:
+        (path,) = paths
+        rows = pd.read_csv(path)
+    with open(metrics_path) as f:
+        metrics = f.read()
+    shutil.rmtree("logs/poisson")
+    return rows.reset_index(drop=True), metrics
+
+
+def check_run(config, tmp, fmt):
+    config["experiment"]["max_steps"] = 60
+    config["experiment"]["checkpoint_interval"] = 10
+    config["experiment"]["checkpoint_dir"] = tmp
+    config["logging"]["format"] = fmt
+    config["logging"]["chunk_size"] = 4
+    shutil.rmtree("logs/poisson", ignore_errors=True)
+    full = run_experiment.run_single_experiment(copy.deepcopy(config))
+    full_rows, full_metrics = read_logs(fmt)
+
+    crashed = multiprocessing.Process(
+        target=crash_run, args=(copy.deepcopy(config),)
+    )
+    crashed.start()
+    crashed.join()
+    assert crashed.exitcode == 1
+    assert os.listdir(tmp), "checkpoint should be left after a crash"
+
+    resumed = run_experiment.run_single_experiment(
+        copy.deepcopy(config), resume=True
+    )
+    assert not os.listdir(tmp), "checkpoint should be removed when done"
+    # ログは中断した run のファイルを切り詰めて続けるので行が重複しない
+    # （read_logs は残ったファイルがログとメトリクスだけであることも見る）
+    rows, metrics = read_logs(fmt)
+    assert rows["step"].tolist() == list(range(1, 61))
+    pd.testing.assert_frame_equal(rows, full_rows)
+    assert metrics == full_metrics
+    # 所要時間・呼び出し回数以外は中断なしの run と一致する
+    for key, value in full.items():
+        if key.endswith("_s") or key.endswith("_calls"):
+            continue
+        assert resumed[key] == value, (key, resumed[key], value)
+    print(f"run_single_experiment ({fmt}): resumed run and log match")
+
+
+def main():
+    config = load_config("configs/default.yaml")
+    config["substrate"]["num_nodes"] = 50
+    config["substrate"]["edge_prob"] = 0.1
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "env.ckpt")
+        for embedder in ["first_fit", "random", "k_path_split", "node_rank"]:
+            config["experiment"]["embedder"] = embedder
+            check_env(config, path, embedder)
+
+        config["experiment"]["batch_window"] = 0.5
+        check_env(config, path, "batched admission")
+        config["experiment"]["batch_window"] = 0
+        os.remove(path)
+
+        config["experiment"]["embedder"] = "node_rank"
+        for fmt in ["parquet", "csv"]:
+            check_run(config, tmp, fmt)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+import time
+
+import numpy as np
+
+from envs.poisson_vne_env import PoissonVNEEnv
+from utils.config_loader import load_config
+
+
+def main():
+    config = load_config("configs/default.yaml")
+    config["substrate"]["num_nodes"] = 100
+    config["substrate"]["edge_prob"] = 0.05
+    # CPU も帯域も飽和する重い負荷
+    config["vnr"].update(
+        num_nodes=6,
+        edge_prob=0.4,
+        cpu_range=[30, 60],
+        bandwidth_range=[5, 15],
+        duration_range=[20, 40],
+    )
+    config["experiment"]["arrival_rate"] = 20.0
+
+    for embedder in ["first_fit", "greedy", "node_rank", "k_path_split"]:
+        config["experiment"]["embedder"] = embedder
+        env = PoissonVNEEnv(config)
+        env.reset(seed=0)
+
+        # 事前判定で棄却した VNR を実際に埋め込んでみて、失敗することを確認
+        check = env.prefilter.check
+
+        def checked(vnr):
+            if check(vnr):
+                return True
+            ok, _, _ = env.embedder.embed(env.substrate, vnr)
+            assert not ok, "prefilter rejected an embeddable VNR"
+            return False
+
+        env.prefilter.check = checked
+        stats = env.run_events(2000)
+        print(
+            f"{embedder}: accepted {stats['accepted']}/{stats['arrivals']}, "
+            f"{env.prefilter.stats()}"
+        )
+
+    # 事前判定の有無で結果は同じで、時間だけが変わる
+    config["experiment"]["embedder"] = "first_fit"
+    results = []
+    for prefilter in [False, True]:
+        config["experiment"]["prefilter"] = prefilter
+        env = PoissonVNEEnv(config)
+        env.reset(seed=0)
+        start = time.perf_counter()
+        stats = env.run_events(4000)
+        elapsed = time.perf_counter() - start
+        results.append((stats, env.substrate.cpu.copy()))
+        print(f"prefilter={prefilter}: {elapsed:.3f}s {stats}")
+    assert results[0][0] == results[1][0]
+    assert np.array_equal(results[0][1], results[1][1])
+
+
+if __name__ == "__main__":
+    main()
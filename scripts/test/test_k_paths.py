@@ -0,0 +1,89 @@
+import itertools
+
+import networkx as nx
+import numpy as np
+
+from envs.poisson_vne_env import PoissonVNEEnv
+from utils.config_loader import load_config
+from utils.k_paths import KPathTable
+from utils.link_mapping import is_split
+from utils.topology import generate_substrate_state
+
+
+def check_table():
+    config = {
+        "topology": "erdos_renyi",
+        "num_nodes": 30,
+        "avg_degree": 4.0,
+        "cpu_range": [40, 80],
+        "bandwidth_range": [30, 60],
+    }
+    substrate = generate_substrate_state(config, np.random.default_rng(0))
+    G = substrate.to_graph()
+    table = KPathTable(substrate, k=5)
+
+    for s, t in itertools.combinations(range(0, 30, 3), 2):
+        paths = table.get(s, t)
+        if not nx.has_path(G, s, t):
+            assert len(paths) == 0
+            continue
+        expected = [
+            len(p) for p in itertools.islice(
+                nx.shortest_simple_paths(G, s, t), 5
+            )
+        ]
+        lengths = [len(paths.path(i)) for i in range(len(paths))]
+        # 長さの列が networkx の k 最短単純路と一致する
+        assert lengths == expected, (s, t, lengths, expected)
+        for i in range(len(paths)):
+            path = paths.path(i)
+            assert len(set(path)) == len(path)
+            assert np.array_equal(
+                paths.edges(i), substrate.path_edge_ids(path)
+            )
+        bottlenecks = paths.bottlenecks(substrate.bandwidth)
+        for i in range(len(paths)):
+            assert bottlenecks[i] == substrate.bandwidth[paths.edges(i)].min()
+    print(f"k-path table matches networkx ({table.stats()})")
+
+
+def check_embedders():
+    config = load_config("configs/default.yaml")
+    config["substrate"]["num_nodes"] = 40
+    config["substrate"]["edge_prob"] = 0.1
+    # 帯域がボトルネックになる設定
+    config["substrate"]["cpu_range"] = [200, 300]
+    config["vnr"]["bandwidth_range"] = [30, 55]
+
+    for embedder in ["k_path", "k_path_split"]:
+        config["experiment"]["embedder"] = embedder
+        env = PoissonVNEEnv(config)
+        env.reset(seed=1)
+        accepted = split = 0
+        for _ in range(400):
+            _, _, _, _, info = env.step(0)
+            if info.get("success"):
+                accepted += 1
+                split += sum(
+                    is_split(route) for route in info["link_paths"].values()
+                )
+            assert (env.substrate.bandwidth >= -1e-9).all()
+        # 全 VNR が退去すれば資源は初期容量に戻る
+        while env.active_vnrs:
+            env._depart(next(iter(env.active_vnrs)))
+        assert np.allclose(env.substrate.cpu, env.substrate.cpu_capacity)
+        assert np.allclose(
+            env.substrate.bandwidth, env.substrate.bandwidth_capacity
+        )
+        print(f"{embedder}: accepted {accepted}, split links seen {split}")
+        if embedder == "k_path_split":
+            assert split > 0
+
+
+def main():
+    check_table()
+    check_embedders()
+
+
+if __name__ == "__main__":
+    main()
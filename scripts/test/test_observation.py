@@ -0,0 +1,65 @@
+import numpy as np
+
+from envs.poisson_vne_env import PoissonVNEEnv
+from utils.config_loader import load_config
+from utils.observation import ObservationBuilder, observation_size
+from utils.topology import topology_max_edges
+
+
+def check_link_slot(config):
+    # 疎なランダムグラフでも観測の辺スロットは n(n-1)/2 にならない
+    config = {**config, "observation": {}}
+    config["substrate"] = {
+        **config["substrate"],
+        "num_nodes": 100_000,
+        "avg_degree": 4,
+    }
+    size = observation_size(config)
+    assert size < 400_000, size
+
+    # 既定（max_links: null）の上界は実際の辺数を下回らない
+    config["substrate"].update(num_nodes=500, edge_prob=0.02)
+    del config["substrate"]["avg_degree"]
+    env = PoissonVNEEnv(config)
+    for seed in range(5):
+        env.reset(seed=seed)
+        bound = topology_max_edges(config["substrate"])
+        assert env.substrate.num_edges <= bound
+    print(f"link slot: {size} entries for 100k nodes, avg_degree 4")
+
+
+def main():
+    config = load_config("configs/default.yaml")
+    config["substrate"]["num_nodes"] = 30
+    config["substrate"]["edge_prob"] = 0.15
+    config["observation"] = {"max_links": 40}
+
+    for embedder in ["first_fit", "greedy", "random"]:
+        config["experiment"]["embedder"] = embedder
+        env = PoissonVNEEnv(config)
+        obs, _ = env.reset(seed=1)
+        assert not obs.flags.writeable
+
+        ref = ObservationBuilder(config)
+        for step in range(1, 301):
+            obs, _, _, _, _ = env.step(action=0)
+            assert env.observation_space.contains(obs), (embedder, step)
+
+            # 差分更新した観測と、SN から一から組み立てた観測を比較
+            # （attach は前の SN のリスナーを外してから組み立て直す）
+            ref.attach(env.substrate)
+            ref.set_vnr(env.vnr_stream.peek())
+            assert np.allclose(obs, ref.observation, atol=1e-6), (
+                embedder,
+                step,
+            )
+
+        ref.substrate.remove_listener(ref)
+        assert ref not in env.substrate._listeners
+        print(f"{embedder}: incremental observation matches ({obs.shape})")
+
+    check_link_slot(config)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+import numpy as np
+
+from envs.poisson_vne_env import PoissonVNEEnv
+from utils.config_loader import load_config
+from utils.evaluator import vnr_revenue
+
+
+def main():
+    config = load_config("configs/default.yaml")
+    config["substrate"]["num_nodes"] = 60
+    config["substrate"]["edge_prob"] = 0.1
+    config["experiment"]["embedder"] = "node_rank"
+    config["metrics"]["window"] = 50
+
+    env = PoissonVNEEnv(config)
+    env.reset(seed=5)
+    metrics = env.metrics
+
+    # record をラップして到着ごとの値を控え、素朴な再計算と突き合わせる
+    rows = []
+    record = metrics.record
+
+    def recording(vnr, duration, arrays=None):
+        if arrays is None:
+            rows.append((0.0, 0.0, 0.0))
+        else:
+            cost = (arrays[1].sum() + arrays[3].sum()) * duration
+            rows.append((1.0, vnr_revenue(vnr) * duration, cost))
+        record(vnr, duration, arrays)
+
+    metrics.record = recording
+    for _ in range(20):
+        env.run_events(100)
+        summary = metrics.summary()
+        rows_arr = np.array(rows)
+        last = rows_arr[-metrics.window:]
+
+        assert summary["arrivals"] == len(rows)
+        assert summary["accepted"] == int(rows_arr[:, 0].sum())
+        assert np.isclose(summary["revenue"], rows_arr[:, 1].sum())
+        assert np.isclose(summary["cost"], rows_arr[:, 2].sum())
+        assert np.isclose(summary["window_revenue"], last[:, 1].sum())
+        assert np.isclose(summary["window_cost"], last[:, 2].sum())
+        assert np.isclose(
+            summary["window_acceptance_ratio"], last[:, 0].mean()
+        )
+
+        # 利用率はビン幅の精度でパーセンタイルと一致
+        substrate = env.substrate
+        for name, residual, capacity in (
+            ("cpu", substrate.cpu, substrate.cpu_capacity),
+            ("bw", substrate.bandwidth, substrate.bandwidth_capacity),
+        ):
+            util = 1 - residual / capacity
+            assert np.isclose(
+                summary[f"{name}_util_mean"],
+                1 - residual.sum() / capacity.sum(),
+            )
+            for q in metrics.percentiles:
+                exact = np.percentile(util, q, method="inverted_cdf")
+                approx = summary[f"{name}_util_p{q:g}"]
+                assert exact <= approx + 1e-9 <= exact + 0.01 + 1e-9
+
+    print(
+        f"metrics match recomputation over {len(rows)} arrivals "
+        f"(acceptance {summary['acceptance_ratio']:.3f}, "
+        f"R/C {summary['rc_ratio']:.3f}, "
+        f"CPU p90 {summary['cpu_util_p90']:.2f})"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+import numpy as np
+
+from agents.random_embedder import RandomEmbedder
+from utils.evaluator import apply_embedding, release_embedding
+from utils.link_mapping import _bfs, find_path
+from utils.path_cache import PathCache
+from utils.topology import generate_substrate_state
+from utils.vnr_generator import generate_virtual_network_requests
+
+SUBSTRATE = {
+    "topology": "erdos_renyi",
+    "num_nodes": 40,
+    "avg_degree": 4.0,
+    "cpu_range": [60, 100],
+    "bandwidth_range": [30, 60],
+}
+VNR = {
+    "num_nodes": 3,
+    "edge_prob": 0.5,
+    "cpu_range": [5, 15],
+    "bandwidth_range": [10, 30],
+}
+
+
+def assert_matches_bfs(substrate, cache, step):
+    # キャッシュの全エントリが、今の残余帯域での BFS と一致する
+    for (source, target, demand), (path, edge_ids, _) in list(
+        cache._entries.items()
+    ):
+        fresh = _bfs(substrate, source, target, demand, None)
+        assert path == fresh, (step, source, target, demand, path, fresh)
+        if path is not None:
+            assert edge_ids.tolist() == substrate.path_edge_ids(
+                path
+            ).tolist()
+
+
+def check_invalidation():
+    rng = np.random.default_rng(0)
+    substrate = generate_substrate_state(SUBSTRATE, rng)
+    cache = PathCache(substrate, max_size=256)
+    embedder = RandomEmbedder()
+    embedder.set_rng(np.random.default_rng(1))
+    vnrs = generate_virtual_network_requests(VNR, 400, rng)
+
+    # 同じ問い合わせが繰り返されるよう、候補を少数に絞る
+    queries = [
+        (*rng.integers(40, size=2).tolist(), float(rng.integers(10, 60)))
+        for _ in range(15)
+    ]
+    active = []
+    for step, vnr in enumerate(vnrs):
+        # 埋め込み・解放を無作為に混ぜる
+        if active and rng.random() < 0.4:
+            k = int(rng.integers(len(active)))
+            release_embedding(substrate, *active.pop(k))
+        else:
+            ok, node_map, link_paths = embedder.embed(substrate, vnr)
+            if ok:
+                apply_embedding(substrate, vnr, node_map, link_paths)
+                active.append((vnr, node_map, link_paths))
+        assert_matches_bfs(substrate, cache, step)
+
+        # 無作為な問い合わせの結果も BFS と一致する
+        for k in rng.integers(len(queries), size=5).tolist():
+            source, target, demand = queries[k]
+            path = find_path(substrate, source, target, demand)
+            expected = (
+                [source]
+                if source == target
+                else _bfs(substrate, source, target, demand, None)
+            )
+            assert path == expected, (step, source, target, demand)
+
+    stats = cache.stats()
+    assert stats["hits"] > 0 and stats["invalidations"] > 0, stats
+    print(f"cached paths always match a fresh BFS ({stats})")
+
+
+def check_lru():
+    substrate = generate_substrate_state(
+        SUBSTRATE, np.random.default_rng(0)
+    )
+    cache = PathCache(substrate, max_size=8)
+    keys = [(s, s + 1, 1.0) for s in range(20)]
+    for key in keys[:8]:
+        cache.put(*key, [key[0], key[1]], np.array([0]))
+    # 先頭を読んで最近使ったことにすると、追い出されるのは 2 番目
+    assert cache.get(*keys[0])[0]
+    for key in keys[8:]:
+        cache.put(*key, [key[0], key[1]], np.array([0]))
+        assert len(cache) <= 8
+
+    assert len(cache) == 8 and cache.evictions == 12
+    assert cache.get(*keys[0])[0] is False
+    assert [cache.get(*key)[0] for key in keys[-8:]] == [True] * 8
+
+    cache.put(*keys[0], [0, 1], np.array([0]))
+    assert cache.get(*keys[12])[0] is False  # 最も古い要素が消える
+    print(f"LRU eviction keeps at most {cache.max_size} entries")
+
+
+def main():
+    check_invalidation()
+    check_lru()
+
+
+if __name__ == "__main__":
+    main()
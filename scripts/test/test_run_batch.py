@@ -0,0 +1,99 @@
+import os
+import subprocess
+import sys
+import tempfile
+
+import pandas as pd
+import yaml
+
+import run_experiment
+from utils.config_loader import load_config
+
+ROOT = os.path.abspath(".")
+
+
+def write_config(tmp, **experiment):
+    config = load_config(os.path.join(ROOT, "configs/default.yaml"))
+    config["experiment"].update(max_steps=40, **experiment)
+    path = os.path.join(tmp, f"config_{len(os.listdir(tmp))}.yaml")
+    with open(path, "w") as f:
+        yaml.safe_dump(config, f)
+    return path
+
+
+def check_workers(tmp):
+    path = write_config(tmp)
+    serial = run_experiment.run_batch(path, repeat=4, workers=1)
+    parallel = run_experiment.run_batch(path, repeat=4, workers=2)
+
+    # 並列でも run ごとの集計は逐次実行と同じ
+    assert serial["run_id"].tolist() == [0, 1, 2, 3]
+    pd.testing.assert_frame_equal(serial, parallel)
+    saved = pd.read_csv("results/summary_first_fit.csv")
+    assert saved["run_id"].tolist() == [0, 1, 2, 3]
+    print("workers=2 summary equals workers=1")
+
+
+def check_failed_run(tmp):
+    path = write_config(tmp)
+    run_single = run_experiment.run_single_experiment
+
+    def crash_second(config, run_id=0, resume=False):
+        if run_id == 1:
+            raise RuntimeError("boom")
+        return run_single(config, run_id=run_id, resume=resume)
+
+    run_experiment.run_single_experiment = crash_second
+    try:
+        summary = run_experiment.run_batch(path, repeat=3)
+    finally:
+        run_experiment.run_single_experiment = run_single
+
+    # 失敗した run も run_id / seed / error 付きで集計に残る
+    saved = pd.read_csv("results/summary_first_fit.csv")
+    for df in (summary, saved):
+        assert df["run_id"].tolist() == [0, 1, 2]
+        assert df["seed"].tolist() == [42, 43, 44]
+        assert df["error"].isna().tolist() == [True, False, True]
+        assert "boom" in df["error"][1]
+        assert df["total_reward"].isna().tolist() == [False, True, False]
+    print("failed run kept in the summary with its seed and error")
+
+
+def check_exit_code(tmp):
+    ok = write_config(tmp)
+    bad = write_config(tmp, embedder="no_such_embedder")
+    script = os.path.join(ROOT, "run_experiment.py")
+    env = dict(os.environ, PYTHONPATH=ROOT)
+
+    def run(path, workers):
+        return subprocess.run(
+            [sys.executable, script, "--config", path, "--repeat", "2",
+             "--workers", str(workers)],
+            env=env,
+            capture_output=True,
+        ).returncode
+
+    assert run(ok, 1) == 0
+    assert run(bad, 1) != 0 and run(bad, 2) != 0
+    errors = pd.read_csv("results/summary_no_such_embedder.csv")["error"]
+    assert errors.str.contains("Unknown embedder").all()
+    print("batch with failed runs exits non-zero")
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        # results/ と logs/ は一時ディレクトリに書く
+        os.chdir(tmp)
+        try:
+            configs = os.path.join(tmp, "configs")
+            os.makedirs(configs)
+            check_workers(configs)
+            check_failed_run(configs)
+            check_exit_code(configs)
+        finally:
+            os.chdir(ROOT)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+import numpy as np
+
+from envs.poisson_vne_env import PoissonVNEEnv
+from utils.config_loader import load_config
+from utils.path_cache import PathCache
+from utils.topology import generate_substrate_state
+
+
+def rollout(env, steps):
+    trajectory = []
+    for _ in range(steps):
+        obs, reward, _, _, info = env.step(action=0)
+        trajectory.append((obs.copy(), reward, str(info.get("node_mapping"))))
+    stats = env.run_events(50)
+    return (
+        trajectory,
+        stats,
+        env.substrate.cpu.copy(),
+        env.substrate.bandwidth.copy(),
+        sorted(env.active_vnrs),
+        list(env.event_queue),
+        list(env.path_cache.get_state()[0].items()),
+        env.path_cache.stats(),
+    )
+
+
+def assert_same(a, b):
+    for (obs_a, r_a, m_a), (obs_b, r_b, m_b) in zip(a[0], b[0]):
+        assert np.array_equal(obs_a, obs_b) and r_a == r_b and m_a == m_b
+    assert a[1] == b[1]
+    assert np.array_equal(a[2], b[2]) and np.array_equal(a[3], b[3])
+    assert a[4] == b[4] and a[5] == b[5]
+    # キャッシュの中身と LRU 順も元どおり（版数は restore で進むので除く）
+    assert [(k, e[0]) for k, e in a[6]] == [(k, e[0]) for k, e in b[6]]
+    assert a[7] == b[7]
+
+
+def cache_contents(cache):
+    entries, _, _, counters = cache.get_state()
+    return [(k, e[0]) for k, e in entries.items()], counters
+
+
+def check_path_cache(config):
+    # 無作為な put / get / clear の後、mark まで戻すと中身と LRU 順が一致する
+    rng = np.random.default_rng(0)
+    substrate = generate_substrate_state(config["substrate"], rng)
+    cache = PathCache(substrate, max_size=6)
+    marks = []
+    for step in range(3000):
+        key = tuple(rng.integers(0, 5, size=2).tolist()) + (
+            float(rng.integers(1, 4)),
+        )
+        op = rng.random()
+        if op < 0.45:
+            path = rng.integers(0, 50, size=3).tolist()
+            cache.put(*key, path, np.array(path[:2]))
+        elif op < 0.9:
+            cache.get(*key)
+        elif op < 0.92:
+            cache.clear()
+        elif op < 0.96:
+            marks.append((cache.mark(), cache_contents(cache)))
+        elif marks:
+            # 古い mark へ戻すと、それより新しい mark は使えなくなる
+            k = int(rng.integers(len(marks)))
+            mark, expected = marks[k]
+            del marks[k + 1:]
+            cache.rollback(mark)
+            assert cache_contents(cache) == expected, step
+    print(f"path cache: {cache.stats()} after random rollbacks")
+
+
+def main():
+    config = load_config("configs/default.yaml")
+    config["substrate"]["num_nodes"] = 50
+    config["substrate"]["edge_prob"] = 0.1
+
+    for embedder in [
+        "first_fit", "greedy", "random", "k_path_split", "node_rank"
+    ]:
+        config["experiment"]["embedder"] = embedder
+        env = PoissonVNEEnv(config)
+        env.reset(seed=3)
+        for _ in range(40):
+            env.step(action=0)
+
+        token = env.snapshot()
+        first = rollout(env, 60)
+        # 同じスナップショットから何度でも同じ軌跡を再現できる
+        for _ in range(2):
+            env.restore(token)
+            assert_same(first, rollout(env, 60))
+
+        print(f"{embedder}: restore reproduces the rollout")
+
+    # バッチ受付（受付待ちの VNR もスナップショットに含まれる）
+    config["experiment"]["embedder"] = "node_rank"
+    config["experiment"]["batch_window"] = 0.5
+    env = PoissonVNEEnv(config)
+    env.reset(seed=3)
+    for _ in range(40):
+        env.step(action=0)
+    env.run_events(3)
+    token = env.snapshot()
+    first = rollout(env, 60)
+    env.restore(token)
+    assert_same(first, rollout(env, 60))
+    print("batched admission: restore reproduces the rollout")
+
+    # 小さなキャッシュで追い出しを起こし、入れ子のスナップショットを戻す
+    config["experiment"]["batch_window"] = 0
+    config["experiment"]["path_cache_size"] = 8
+    env = PoissonVNEEnv(config)
+    env.reset(seed=3)
+    for _ in range(40):
+        env.step(action=0)
+    outer = env.snapshot()
+    first = rollout(env, 30)
+    inner = env.snapshot()
+    second = rollout(env, 30)
+    assert env.path_cache.evictions > outer.path_cache_state.counters[2]
+    env.restore(inner)
+    assert_same(second, rollout(env, 30))
+    env.restore(outer)
+    assert_same(first, rollout(env, 30))
+    try:
+        env.restore(inner)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("inner snapshot should be invalidated")
+    print("nested snapshots: path cache rolled back through evictions")
+
+    check_path_cache(config)
+
+
+if __name__ == "__main__":
+    main()
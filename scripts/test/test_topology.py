@@ -0,0 +1,116 @@
+import networkx as nx
+import numpy as np
+
+from utils.topology import (
+    generate_substrate_state,
+    topology_max_edges,
+    topology_num_nodes,
+)
+
+BASE = {"cpu_range": [40, 80], "bandwidth_range": [30, 60]}
+
+# (設定, ノード数, 辺数)。ランダムな系列は辺数 None
+CASES = [
+    ({"topology": "erdos_renyi", "num_nodes": 50, "edge_prob": 0.1}, 50, None),
+    ({"topology": "erdos_renyi", "num_nodes": 400, "avg_degree": 4}, 400,
+     None),
+    ({"topology": "waxman", "num_nodes": 60, "waxman_beta": 0.4}, 60, None),
+    ({"topology": "barabasi_albert", "num_nodes": 30, "ba_m": 3}, 30, 81),
+    ({"topology": "fat_tree", "fat_tree_k": 4}, 36, 48),
+    ({"topology": "fat_tree", "fat_tree_k": 4, "fat_tree_hosts": False},
+     20, 32),
+    ({"topology": "fat_tree", "fat_tree_k": 8}, 208, 384),
+    ({"topology": "grid", "grid_rows": 3, "grid_cols": 5}, 15, 22),
+]
+
+
+def as_graph(state):
+    G = nx.Graph()
+    G.add_nodes_from(range(state.num_nodes))
+    G.add_edges_from(zip(state.edge_src.tolist(), state.edge_dst.tolist()))
+    return G
+
+
+def check_counts():
+    for topology, num_nodes, num_edges in CASES:
+        config = dict(BASE, **topology)
+        assert topology_num_nodes(config) == num_nodes
+        bound = topology_max_edges(config)
+        if num_edges is not None:
+            # 決定的な系列と BA は上界がちょうど辺数
+            assert bound == num_edges, (topology, bound)
+
+        counts = []
+        for seed in range(10):
+            state = generate_substrate_state(
+                config, np.random.default_rng(seed)
+            )
+            G = as_graph(state)
+            assert state.num_nodes == num_nodes
+            # 重複辺・自己ループは無い
+            assert G.number_of_edges() == state.num_edges
+            assert nx.number_of_selfloops(G) == 0
+            assert state.num_edges <= bound, (topology, state.num_edges)
+            if num_edges is not None:
+                assert state.num_edges == num_edges
+            counts.append(state.num_edges)
+        print(
+            f"{topology['topology']}: {num_nodes} nodes, "
+            f"{min(counts)}-{max(counts)} edges (bound {bound})"
+        )
+
+
+def check_shapes():
+    rng = np.random.default_rng(0)
+    grid = generate_substrate_state(
+        dict(BASE, topology="grid", grid_rows=3, grid_cols=5), rng
+    )
+    expected = nx.convert_node_labels_to_integers(
+        nx.grid_2d_graph(3, 5), ordering="sorted"
+    )
+    assert nx.utils.edges_equal(as_graph(grid).edges, expected.edges)
+
+    # fat-tree のスイッチは全て次数 k、ホストは次数 1
+    k = 4
+    fat_tree = as_graph(
+        generate_substrate_state(
+            dict(BASE, topology="fat_tree", fat_tree_k=k), rng
+        )
+    )
+    degrees = [d for _, d in fat_tree.degree()]
+    assert degrees == [k] * (5 * k * k // 4) + [1] * (k**3 // 4)
+    assert nx.is_connected(fat_tree)
+
+    # BA は m 個の孤立ノードから始まり、以降の各ノードが m 本張る
+    ba = as_graph(
+        generate_substrate_state(
+            dict(BASE, topology="barabasi_albert", num_nodes=30, ba_m=3),
+            rng,
+        )
+    )
+    assert nx.is_connected(ba)
+    assert min(d for _, d in ba.degree()) >= 3
+    print("grid / fat_tree / barabasi_albert shapes match")
+
+
+def check_random_density():
+    # 辺数の平均は期待値 p * n(n-1)/2 に近い
+    n, p = 200, 0.05
+    config = dict(BASE, topology="erdos_renyi", num_nodes=n, edge_prob=p)
+    counts = [
+        generate_substrate_state(config, np.random.default_rng(s)).num_edges
+        for s in range(30)
+    ]
+    mean = p * n * (n - 1) / 2
+    assert abs(np.mean(counts) - mean) < 0.05 * mean, np.mean(counts)
+    print(f"erdos_renyi mean edges {np.mean(counts):.1f} (expected {mean})")
+
+
+def main():
+    check_counts()
+    check_shapes()
+    check_random_density()
+
+
+if __name__ == "__main__":
+    main()
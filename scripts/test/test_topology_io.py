@@ -0,0 +1,113 @@
+import os
+import tempfile
+
+import networkx as nx
+import numpy as np
+
+import utils.topology_io as topology_io
+from utils.topology import generate_substrate_state
+from utils.topology_io import load_topology
+
+
+def write_graphml(path, cpu_of_b=None):
+    G = nx.Graph()
+    G.add_node("a", cpu=50.0)
+    if cpu_of_b is None:
+        G.add_node("b")
+    else:
+        G.add_node("b", cpu=cpu_of_b)
+    G.add_node("c", cpu=70.0)
+    G.add_edge("a", "b", bandwidth=30.0)
+    G.add_edge("b", "c")
+    G.add_edge("c", "c", bandwidth=10.0)  # 自己ループは捨てられる
+    nx.write_graphml(G, path)
+
+
+def write_edgelist(path):
+    with open(path, "w") as f:
+        f.write("# u v bandwidth\n")
+        f.write("x y 40\n")
+        f.write("y z nan\n")
+        f.write("y x 99\n")  # 平行辺は最初の1本だけ残る
+        f.write("z w\n")
+
+
+def cache_files(cache_dir):
+    return sorted(os.listdir(cache_dir)) if os.path.isdir(cache_dir) else []
+
+
+def check_parsers(tmp, cache_dir):
+    graphml = os.path.join(tmp, "net.graphml")
+    write_graphml(graphml)
+    n, src, dst, cpu, bw = load_topology(graphml, cache_dir=cache_dir)
+    assert n == 3
+    assert list(zip(src.tolist(), dst.tolist())) == [(0, 1), (1, 2)]
+    assert cpu[0] == 50 and np.isnan(cpu[1]) and cpu[2] == 70
+    assert bw[0] == 30 and np.isnan(bw[1])
+
+    edgelist = os.path.join(tmp, "net.txt")
+    write_edgelist(edgelist)
+    n, src, dst, cpu, bw = load_topology(edgelist, cache_dir=cache_dir)
+    assert n == 4 and np.isnan(cpu).all()
+    assert list(zip(src.tolist(), dst.tolist())) == [(0, 1), (1, 2), (2, 3)]
+    assert bw[0] == 40 and np.isnan(bw[1]) and np.isnan(bw[2])
+    print("graphml / edgelist parsed")
+    return graphml
+
+
+def check_fill(graphml, cache_dir):
+    # 欠けた容量（NaN）だけが設定の範囲から埋まる
+    config = {
+        "source": "file",
+        "path": graphml,
+        "cache_dir": cache_dir,
+        "cpu_range": [10, 11],
+        "bandwidth_range": [5, 6],
+    }
+    state = generate_substrate_state(config, np.random.default_rng(0))
+    assert state.cpu_capacity.tolist() == [50, 10, 70]
+    assert state.bandwidth_capacity.tolist() == [30, 5]
+
+    # 既定値を変えると、キャッシュ越しでも新しい値で埋まる
+    config["cpu_range"] = [20, 21]
+    state = generate_substrate_state(config, np.random.default_rng(0))
+    assert state.cpu_capacity.tolist() == [50, 20, 70]
+    print("missing capacities filled from the config ranges")
+
+
+def check_cache(graphml, cache_dir):
+    before = cache_files(cache_dir)
+    assert len(before) == 2, before
+
+    # 2回目はパーサを通らず npz キャッシュから読む
+    parse = topology_io._parse_graphml
+    topology_io._parse_graphml = None
+    try:
+        n, _, _, cpu, _ = load_topology(graphml, cache_dir=cache_dir)
+    finally:
+        topology_io._parse_graphml = parse
+    assert n == 3 and cache_files(cache_dir) == before
+
+    # 容量の属性名が変わるとキーも変わる
+    load_topology(graphml, cpu_attr="capacity", cache_dir=cache_dir)
+    after_attr = cache_files(cache_dir)
+    assert len(after_attr) == 3
+
+    # ファイルの中身が変わるとキーが変わり、古いキャッシュは使われない
+    write_graphml(graphml, cpu_of_b=60.0)
+    _, _, _, cpu, _ = load_topology(graphml, cache_dir=cache_dir)
+    assert cpu[1] == 60
+    assert len(cache_files(cache_dir)) == 4
+    print("second load hits the npz cache; content / attrs change the key")
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        cache_dir = os.path.join(tmp, "cache")
+        graphml = check_parsers(tmp, cache_dir)
+        check_fill(graphml, cache_dir)
+        check_cache(graphml, cache_dir)
+
+
+if __name__ == "__main__":
+    main()
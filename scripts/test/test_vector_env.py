@@ -0,0 +1,55 @@
+import copy
+
+import numpy as np
+
+from envs.poisson_vne_env import PoissonVNEEnv
+from envs.vector_poisson_vne_env import VectorPoissonVNEEnv
+from utils.config_loader import load_config
+
+
+def main():
+    base_config = load_config("configs/default.yaml")
+    num_envs = 4
+    seed = 123
+
+    for embedder in ["first_fit", "greedy"]:
+        config = copy.deepcopy(base_config)
+        config["experiment"]["embedder"] = embedder
+        steps = config["experiment"]["max_steps"]
+
+        vec_env = VectorPoissonVNEEnv(config, num_envs=num_envs)
+        vec_obs, _ = vec_env.reset(seed=seed)
+
+        envs = [PoissonVNEEnv(copy.deepcopy(config)) for _ in range(num_envs)]
+        obs = [env.reset(seed=seed + i)[0] for i, env in enumerate(envs)]
+        assert np.array_equal(vec_obs, np.stack(obs))
+
+        for step in range(1, steps + 1):
+            vec_obs, vec_rewards, _, truncations, infos = vec_env.step(
+                np.zeros(num_envs, dtype=np.int64)
+            )
+            for i, env in enumerate(envs):
+                obs_i, reward_i, _, _, _ = env.step(action=0)
+                assert np.array_equal(vec_obs[i], obs_i), (embedder, step, i)
+                assert vec_rewards[i] == reward_i, (embedder, step, i)
+                assert np.array_equal(
+                    vec_env.substrates[i].cpu, env.substrate.cpu
+                )
+                assert np.array_equal(
+                    vec_env.substrates[i].bandwidth, env.substrate.bandwidth
+                )
+
+        assert truncations.all()
+        print(f"{embedder}: {num_envs} envs x {steps} steps match")
+
+        # 次のステップで自動リセットされる
+        vec_obs, vec_rewards, _, _, _ = vec_env.step(
+            np.zeros(num_envs, dtype=np.int64)
+        )
+        assert (vec_env.episode_steps == 0).all()
+        assert (vec_rewards == 0).all()
+        print(f"{embedder}: auto-reset OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,71 @@
-from utils.vnr_generator import generate_virtual_network_request
+import networkx as nx
+import numpy as np
 
-G = generate_virtual_network_request()
+from utils.vnr_generator import (
+    generate_virtual_network_request,
+    generate_virtual_network_requests,
+)
 
-print("VNR nodes:", G.number_of_nodes())
-print("VNR edges:", G.number_of_edges())
+CPU_RANGE = [5, 15]
+BANDWIDTH_RANGE = [10, 30]
 
-for n, d in G.nodes(data=True):
-    print(f"  Node {n}: CPU={d['cpu']}")
 
-for u, v, d in G.edges(data=True):
-    print(f"  Link ({u}, {v}): BW={d['bandwidth']}")
+def check_vnr(G, n, edge_prob):
+    assert G.number_of_nodes() == n and nx.is_connected(G)
+    m = G.number_of_edges()
+    assert n - 1 <= m <= n * (n - 1) // 2, (n, m)
+    assert nx.number_of_selfloops(G) == 0
+    # p=0 は全域木だけ、p=1 は完全グラフ
+    if edge_prob == 0:
+        assert m == n - 1
+    if edge_prob == 1:
+        assert m == n * (n - 1) // 2
+    assert all(
+        CPU_RANGE[0] <= cpu < CPU_RANGE[1] for _, cpu in G.nodes(data="cpu")
+    )
+    assert all(
+        BANDWIDTH_RANGE[0] <= bw < BANDWIDTH_RANGE[1]
+        for _, _, bw in G.edges(data="bandwidth")
+    )
+
+
+def check_bounds():
+    count = 0
+    for seed in range(20):
+        rng = np.random.default_rng(seed)
+        for n in (1, 2, 3, 5, 8):
+            for edge_prob in (0.0, 0.3, 1.0):
+                config = {
+                    "num_nodes": n,
+                    "edge_prob": edge_prob,
+                    "cpu_range": CPU_RANGE,
+                    "bandwidth_range": BANDWIDTH_RANGE,
+                }
+                for G in generate_virtual_network_requests(config, 10, rng):
+                    check_vnr(G, n, edge_prob)
+                    count += 1
+    print(f"{count} VNRs connected and within node / edge / demand bounds")
+
+
+def main():
+    check_bounds()
+
+    config = {
+        "num_nodes": 4,
+        "edge_prob": 0.5,
+        "cpu_range": CPU_RANGE,
+        "bandwidth_range": BANDWIDTH_RANGE,
+    }
+    G = generate_virtual_network_request(config, np.random.default_rng(0))
+    print("VNR nodes:", G.number_of_nodes())
+    print("VNR edges:", G.number_of_edges())
+
+    for n, d in G.nodes(data=True):
+        print(f"  Node {n}: CPU={d['cpu']}")
+
+    for u, v, d in G.edges(data=True):
+        print(f"  Link ({u}, {v}): BW={d['bandwidth']}")
+
+
+if __name__ == "__main__":
+    main()
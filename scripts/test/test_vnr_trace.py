@@ -0,0 +1,125 @@
+import copy
+import os
+import tempfile
+
+import numpy as np
+
+from envs.poisson_vne_env import ARRIVAL, PoissonVNEEnv
+from utils.config_loader import load_config
+from utils.vnr_arrays import VNRArrays
+from utils.vnr_generator import generate_virtual_network_requests
+from utils.vnr_trace import VNRTrace, generate_trace, write_trace
+
+NUM_VNRS = 200
+
+
+def same_graph(G, H):
+    return (
+        list(G.nodes(data="cpu")) == list(H.nodes(data="cpu"))
+        and sorted(G.edges(data="bandwidth"))
+        == sorted(H.edges(data="bandwidth"))
+    )
+
+
+def check_round_trip(config, tmp):
+    rng = np.random.default_rng(0)
+    arrival = np.cumsum(rng.exponential(0.5, size=NUM_VNRS))
+    duration = rng.integers(5, 10, size=NUM_VNRS, dtype=np.int32)
+    graphs = generate_virtual_network_requests(config["vnr"], NUM_VNRS, rng)
+    path = os.path.join(tmp, "written")
+    write_trace(path, arrival, duration, VNRArrays.from_graphs(graphs))
+
+    trace = VNRTrace(path)
+    assert len(trace) == NUM_VNRS and trace.meta["num_vnrs"] == NUM_VNRS
+    assert np.array_equal(trace.arrival, arrival)
+    assert np.array_equal(trace.duration, duration)
+    assert all(same_graph(trace.vnr(i), G) for i, G in enumerate(graphs))
+
+    # 同じシードなら generate_trace の出力も一致する
+    generate_trace(config, NUM_VNRS, os.path.join(tmp, "a"), seed=3)
+    generate_trace(config, NUM_VNRS, os.path.join(tmp, "b"), seed=3)
+    a = VNRTrace(os.path.join(tmp, "a"))
+    b = VNRTrace(os.path.join(tmp, "b"))
+    assert np.array_equal(a.arrival, b.arrival)
+    assert all(np.array_equal(x, y) for x, y in zip(a.vnrs, b.vnrs))
+    print("trace written and reloaded with identical arrivals")
+
+
+def replay(config, trace_path, embedder):
+    config = copy.deepcopy(config)
+    config["vnr"]["trace"] = trace_path
+    config["experiment"]["embedder"] = embedder
+    env = PoissonVNEEnv(config)
+    env.reset(seed=1)
+
+    # 到着ごとに (時刻, VNR) を記録する
+    seen = []
+    next_vnr = env._next_vnr
+
+    def record():
+        vnr, duration = next_vnr()
+        seen.append((env.current_time, duration, vnr))
+        return vnr, duration
+
+    env._next_vnr = record
+    stats = env.run_events(10 * NUM_VNRS)
+    assert stats["arrivals"] == NUM_VNRS and not env.event_queue
+    return seen, stats
+
+
+def check_replay(config, tmp):
+    path = os.path.join(tmp, "a")
+    trace = VNRTrace(path)
+    runs = {
+        name: replay(config, path, name)
+        for name in ("first_fit", "random", "node_rank")
+    }
+
+    for name, (seen, stats) in runs.items():
+        assert [t for t, _, _ in seen] == trace.arrival.tolist(), name
+        assert [d for _, d, _ in seen] == trace.duration.tolist(), name
+        assert all(
+            same_graph(vnr, trace.vnr(i))
+            for i, (_, _, vnr) in enumerate(seen)
+        ), name
+        print(f"{name}: accepted {stats['accepted']}/{stats['arrivals']}")
+
+    # 埋め込み手法が違っても、到着の列はまったく同じ
+    first, *rest = runs.values()
+    for seen, _ in rest:
+        assert [t for t, _, _ in seen] == [t for t, _, _ in first[0]]
+    print("every embedder replayed the same arrival sequence")
+
+
+def check_step_replay(config, tmp):
+    config = copy.deepcopy(config)
+    config["vnr"]["trace"] = os.path.join(tmp, "a")
+    env = PoissonVNEEnv(config)
+    env.reset(seed=1)
+    trace = env.trace
+
+    # 1 ティックに何件来ても、その時刻までの到着は全てそのステップで扱う
+    ticks = np.maximum(np.ceil(trace.arrival), 1).astype(int)
+    expected = np.bincount(ticks, minlength=ticks[-1] + 1)
+    for tick in range(1, ticks[-1] + 1):
+        _, _, _, _, info = env.step(action=0)
+        if "batch" in info:
+            arrivals = len(info["batch"])
+        else:
+            arrivals = int("success" in info)
+        assert arrivals == expected[tick], (tick, arrivals)
+    assert env._trace_pos == len(trace)
+    assert all(kind != ARRIVAL for _, _, kind, _ in env.event_queue)
+    print(f"step() drained up to {expected.max()} arrivals per tick")
+
+
+def main():
+    config = load_config("configs/default.yaml")
+    with tempfile.TemporaryDirectory() as tmp:
+        check_round_trip(config, tmp)
+        check_replay(config, tmp)
+        check_step_replay(config, tmp)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+# utils/capacity_index.py
+
+import heapq
+from typing import List, Optional
+
+import numpy as np
+
+
+class CapacityIndex:
+    """
+    Max-heap over a substrate residual array with lazy deletion.
+
+    Entries are ``(-value, id)`` pairs; an entry is stale once the
+    residual of ``id`` no longer equals ``value``. Updates just push a
+    fresh entry (the substrate notifies the index on every allocate /
+    release), stale entries are dropped when they reach the top, and
+    the heap is rebuilt once stale entries outnumber live ones. Ties
+    are broken towards the lowest id.
+
+    Args:
+        substrate: The SubstrateState to index
+        attr: ``"cpu"`` for nodes or ``"bandwidth"`` for edges
+    """
+
+    def __init__(self, substrate, attr: str = "cpu"):
+        self.substrate = substrate
+        self.attr = attr
+        self._heap: List = []
+        self._rebuild()
+        substrate.add_listener(self)
+
+    @property
+    def values(self) -> np.ndarray:
+        return getattr(self.substrate, self.attr)
+
+    def max(self) -> float:
+        """
+        Largest residual value (-inf if empty).
+        """
+        self._drop_stale()
+        return -self._heap[0][0] if self._heap else -np.inf
+
+    def top(self, k: int) -> np.ndarray:
+        """
+        The ``k`` largest residual values in descending order.
+        """
+        picked = []
+        seen = set()
+        while len(picked) < k:
+            entry = self._pop_valid()
+            if entry is None:
+                break
+            if entry[1] in seen:
+                # 同じ値で再登録された重複エントリは捨てる
+                continue
+            seen.add(entry[1])
+            picked.append(entry)
+        for entry in picked:
+            heapq.heappush(self._heap, entry)
+        return np.array([-v for v, _ in picked], dtype=np.float64)
+
+    def feasible(self, demands) -> bool:
+        """
+        Whether the demands can be met by distinct ids at all.
+
+        Compares the demands sorted in descending order against the
+        ``len(demands)`` largest residuals.
+        """
+        demands = np.sort(np.asarray(demands, dtype=np.float64))[::-1]
+        top = self.top(len(demands))
+        return len(top) == len(demands) and bool((top >= demands).all())
+
+    def select_greedy(self, demands) -> Optional[List[int]]:
+        """
+        Assign each demand, in order, to the unused id with the largest
+        residual.
+
+        Returns:
+            Chosen ids (one per demand), or None if some demand exceeds
+            the largest remaining residual
+        """
+        picked = []
+        seen = set()
+        result = []
+        for demand in demands:
+            entry = self._pop_valid()
+            while entry is not None and entry[1] in seen:
+                entry = self._pop_valid()
+            if entry is None or -entry[0] < demand:
+                if entry is not None:
+                    picked.append(entry)
+                result = None
+                break
+            picked.append(entry)
+            seen.add(entry[1])
+            result.append(entry[1])
+
+        # 選んだノードは残余が変わるまで有効なのでヒープに戻す
+        for entry in picked:
+            heapq.heappush(self._heap, entry)
+        return result
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+    def _rebuild(self) -> None:
+        values = self.values
+        self._heap = list(zip((-values).tolist(), range(len(values))))
+        heapq.heapify(self._heap)
+
+    def _drop_stale(self) -> None:
+        heap = self._heap
+        values = self.values
+        while heap and -heap[0][0] != values[heap[0][1]]:
+            heapq.heappop(heap)
+
+    def _pop_valid(self):
+        self._drop_stale()
+        return heapq.heappop(self._heap) if self._heap else None
+
+    def _push(self, ids: np.ndarray) -> None:
+        values = self.values
+        if len(self._heap) + len(ids) > 2 * len(values) + 64:
+            self._rebuild()
+            return
+        for i, v in zip(ids.tolist(), values[ids].tolist()):
+            heapq.heappush(self._heap, (-v, i))
+
+    # ------------------------------------------------------------------
+    # SubstrateState listener
+    # ------------------------------------------------------------------
+    def on_substrate_update(
+        self,
+        node_ids: np.ndarray,
+        old_cpu: np.ndarray,
+        edge_ids: np.ndarray,
+        old_bandwidth: np.ndarray,
+    ) -> None:
+        self._push(node_ids if self.attr == "cpu" else edge_ids)
+
+    def on_substrate_reset(self) -> None:
+        self._rebuild()
@@ -0,0 +1,108 @@
+# utils/checkpoint.py
+
+import hashlib
+import os
+import pickle
+import threading
+from typing import Any, Dict, Optional
+
+from utils.substrate_state import SubstrateState
+
+# ファイル先頭の識別子（形式を変えたら末尾の版数を上げる）
+_MAGIC = b"VNECKPT\x01"
+
+
+def substrate_digest(substrate: SubstrateState) -> str:
+    """
+    Hash of a substrate's topology and capacities.
+
+    A checkpoint only restores residuals, so it records this to make
+    sure it is loaded onto the same substrate it was taken on.
+    """
+    h = hashlib.sha256()
+    for array in (
+        substrate.edge_src,
+        substrate.edge_dst,
+        substrate.cpu_capacity,
+        substrate.bandwidth_capacity,
+    ):
+        h.update(array.tobytes())
+    return h.hexdigest()[:16]
+
+
+def write_checkpoint(path: str, state: Dict[str, Any]) -> None:
+    """
+    Pickle ``state`` to ``path`` atomically.
+
+    The file is written next to its destination, synced and then moved
+    over it, so a crash mid-write leaves the previous checkpoint intact.
+    """
+    data = pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_MAGIC)
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def load_checkpoint(path: str) -> Dict[str, Any]:
+    with open(path, "rb") as f:
+        if f.read(len(_MAGIC)) != _MAGIC:
+            raise ValueError(f"Not a checkpoint file: {path}")
+        return pickle.load(f)
+
+
+class CheckpointWriter:
+    """
+    Writes checkpoints of one run in a background thread.
+
+    :meth:`save` only hands the state over; serialization and the
+    atomic write (:func:`write_checkpoint`) happen in a worker thread so
+    the simulation keeps going. The state must therefore not be mutated
+    afterwards, which holds for ``PoissonVNEEnv.get_state`` (copies of
+    the residuals / heap, immutable ledger entries). At most one write
+    is in flight: a new :meth:`save` first waits for the previous one.
+    An error in the worker is raised by the next :meth:`save` /
+    :meth:`wait`.
+
+    Args:
+        path: Checkpoint file (replaced on every save)
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.saved = 0
+        self._thread: Optional[threading.Thread] = None
+        self._error: Optional[BaseException] = None
+
+    def save(self, state: Dict[str, Any]) -> None:
+        self.wait()
+        self._thread = threading.Thread(
+            target=self._write, args=(state,), daemon=True
+        )
+        self._thread.start()
+
+    def wait(self) -> None:
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+    def remove(self) -> None:
+        """
+        Wait for pending writes and delete the checkpoint (run finished).
+        """
+        self.wait()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def _write(self, state: Dict[str, Any]) -> None:
+        try:
+            write_checkpoint(self.path, state)
+            self.saved += 1
+        except BaseException as e:  # 呼び出し側のスレッドで送出し直す
+            self._error = e
@@ -1,17 +1,38 @@
 # utils/embedder_factory.py
 
+from typing import Any, Dict, List, Optional
+
 from agents.random_embedder import RandomEmbedder
 from agents.first_fit_embedder import FirstFitEmbedder
 from agents.greedy_embedder import GreedyEmbedder
+from agents.k_path_embedder import KPathEmbedder, SplittingKPathEmbedder
+from agents.node_rank_embedder import NodeRankEmbedder
+
+# 名前 → 埋め込み手法クラス
+EMBEDDERS = {
+    "random": RandomEmbedder,
+    "first_fit": FirstFitEmbedder,
+    "greedy": GreedyEmbedder,
+    "k_path": KPathEmbedder,
+    "k_path_split": SplittingKPathEmbedder,
+    "node_rank": NodeRankEmbedder,
+}
+
+
+def available_embedders() -> List[str]:
+    return list(EMBEDDERS)
+
 
+def get_embedder(name: str, params: Optional[Dict[str, Any]] = None):
+    """
+    Instantiate an embedder by name.
 
-def get_embedder(name: str):
+    Args:
+        name: Key of EMBEDDERS (case-insensitive)
+        params: Keyword arguments for the embedder's constructor
+            (``experiment.embedder_params`` in the config)
+    """
     name = name.lower()
-    if name == "random":
-        return RandomEmbedder()
-    elif name == "first_fit":
-        return FirstFitEmbedder()
-    elif name == "greedy":
-        return GreedyEmbedder()
-    else:
+    if name not in EMBEDDERS:
         raise ValueError(f"Unknown embedder: {name}")
+    return EMBEDDERS[name](**(params or {}))
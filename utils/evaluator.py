@@ -1,33 +1,101 @@
 # utils/evaluator.py
 
 import networkx as nx
-from typing import Dict, Tuple, List
+import numpy as np
+from typing import Dict, Tuple
+
+from utils.link_mapping import Route, link_flows
+from utils.substrate_state import SubstrateState
+
+
+def embedding_arrays(
+    substrate: SubstrateState,
+    vnr: nx.Graph,
+    node_mapping: Dict[int, int],
+    link_paths: Dict[Tuple[int, int], Route],
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Flatten an embedding into the arrays taken by SubstrateState.allocate.
+
+    Args:
+        substrate: The substrate state
+        vnr: The virtual network request
+        node_mapping: VNR node → SN node
+        link_paths: VNR edge → SN path (or split flows)
+
+    Returns:
+        node_ids, cpu, edge_ids, bandwidth
+    """
+    node_ids = np.fromiter(node_mapping.values(), dtype=np.int64)
+    cpu = np.fromiter(
+        (vnr.nodes[vnode]["cpu"] for vnode in node_mapping),
+        dtype=np.float64,
+        count=len(node_mapping),
+    )
+
+    eid_chunks = []
+    bw_chunks = []
+    for (u, v), route in link_paths.items():
+        for path, bw in link_flows(route, vnr.edges[u, v]["bandwidth"]):
+            eids = substrate.path_edge_ids(path)
+            eid_chunks.append(eids)
+            bw_chunks.append(np.full(len(eids), bw, dtype=np.float64))
+
+    if eid_chunks:
+        edge_ids = np.concatenate(eid_chunks)
+        bandwidth = np.concatenate(bw_chunks)
+    else:
+        edge_ids = np.empty(0, dtype=np.int64)
+        bandwidth = np.empty(0, dtype=np.float64)
+
+    return node_ids, cpu, edge_ids, bandwidth
 
 
 def apply_embedding(
-    substrate: nx.Graph,
+    substrate: SubstrateState,
     vnr: nx.Graph,
     node_mapping: Dict[int, int],
-    link_paths: Dict[Tuple[int, int], List[int]],
+    link_paths: Dict[Tuple[int, int], Route],
 ) -> None:
     """
     Reduce substrate resources based on a successful embedding.
 
     Args:
-        substrate: The substrate network
+        substrate: The substrate state
         vnr: The virtual network request
         node_mapping: VNR node → SN node
-        link_paths: VNR edge → SN path
-    """
-    # ノード資源を減算
-    for vnode, snode in node_mapping.items():
-        cpu_demand = vnr.nodes[vnode]["cpu"]
-        substrate.nodes[snode]["cpu"] -= cpu_demand
-
-    # リンク資源を減算
-    for (u, v), path in link_paths.items():
-        bw_demand = vnr.edges[u, v]["bandwidth"]
-        for i in range(len(path) - 1):
-            u_, v_ = path[i], path[i + 1]
-            if substrate.has_edge(u_, v_):
-                substrate.edges[u_, v_]["bandwidth"] -= bw_demand
+        link_paths: VNR edge → SN path (or split flows)
+    """
+    substrate.allocate(
+        *embedding_arrays(substrate, vnr, node_mapping, link_paths)
+    )
+
+
+def release_embedding(
+    substrate: SubstrateState,
+    vnr: nx.Graph,
+    node_mapping: Dict[int, int],
+    link_paths: Dict[Tuple[int, int], Route],
+) -> None:
+    """
+    Give back the substrate resources held by an embedding.
+
+    Args:
+        substrate: The substrate state
+        vnr: The virtual network request
+        node_mapping: VNR node → SN node
+        link_paths: VNR edge → SN path (or split flows)
+    """
+    substrate.release(
+        *embedding_arrays(substrate, vnr, node_mapping, link_paths)
+    )
+
+
+def vnr_revenue(vnr: nx.Graph) -> float:
+    """
+    Revenue of a VNR: total CPU plus total bandwidth it asks for.
+    """
+    return float(
+        sum(cpu for _, cpu in vnr.nodes(data="cpu"))
+        + sum(bw for _, _, bw in vnr.edges(data="bandwidth"))
+    )
@@ -0,0 +1,172 @@
+# utils/feasibility.py
+
+from typing import Dict, Optional
+
+import networkx as nx
+import numpy as np
+
+from utils.capacity_index import CapacityIndex
+from utils.substrate_state import SubstrateState
+
+# 浮動小数の和の丸め誤差で受理可能な VNR を落とさないための余裕
+_SLACK = 1e-9
+
+REASONS = ("total_cpu", "top_cpu", "link_bandwidth", "node_bounds")
+
+
+class FeasibilityFilter:
+    """
+    Cheap necessary conditions checked before calling an embedder.
+
+    A VNR is rejected (``check`` returns False) only when one of these
+    aggregate bounds already rules it out:
+
+    - ``total_cpu``: its total CPU demand exceeds the total residual CPU;
+    - ``top_cpu``: its CPU demands, sorted, do not fit the same number
+      of largest residual CPUs (``substrate.cpu_index``);
+    - ``link_bandwidth``: its largest link demand exceeds every residual
+      edge bandwidth (skipped for embedders that split links);
+    - ``node_bounds``: some virtual node has no substrate node with both
+      enough CPU and at least as much incident residual bandwidth as the
+      node's links ask for in total, or fewer substrate nodes than
+      virtual nodes pass the weakest of these bounds.
+
+    All embedders map the virtual nodes of a VNR to distinct substrate
+    nodes, so each virtual link leaves its host node over the host's own
+    edges; the bounds are therefore implied by any embedding and a VNR
+    the embedder would accept is never rejected.
+
+    The per-node incident bandwidth sums and the total CPU are kept up
+    to date by listening to the substrate; only nodes at the ends of
+    touched edges are recomputed.
+
+    Args:
+        substrate: The substrate state
+        split: Whether the embedder may split a link over several paths
+    """
+
+    def __init__(self, substrate: SubstrateState, split: bool = False):
+        self.substrate = substrate
+        self.split = split
+        self.bandwidth_index = CapacityIndex(substrate, "bandwidth")
+
+        self.checked = 0
+        self.skipped = 0
+        self.reasons: Dict[str, int] = {r: 0 for r in REASONS}
+
+        substrate.add_listener(self)
+        self.on_substrate_reset()
+
+    def check(self, vnr: nx.Graph) -> bool:
+        """
+        Whether the VNR may be embeddable (False means it certainly is
+        not and the embedder need not be called).
+        """
+        self.checked += 1
+        reason = self._violated(vnr)
+        if reason is None:
+            return True
+        self.skipped += 1
+        self.reasons[reason] += 1
+        return False
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "checked": self.checked,
+            "skipped": self.skipped,
+            **{f"skipped_{r}": n for r, n in self.reasons.items()},
+        }
+
+    def _violated(self, vnr: nx.Graph) -> Optional[str]:
+        cpu = np.fromiter(
+            (c for _, c in vnr.nodes(data="cpu")), dtype=np.float64
+        )
+        if cpu.sum() > self.total_cpu * (1 + _SLACK) + _SLACK:
+            return "total_cpu"
+        substrate_cpu = self.substrate.cpu
+        # 最大要求を満たすノードが V 個あれば上位 V との突き合わせは不要
+        if np.count_nonzero(
+            substrate_cpu >= cpu.max()
+        ) < len(cpu) and not self.substrate.cpu_index.feasible(cpu):
+            return "top_cpu"
+
+        # 仮想ノードごとの隣接リンク要求の合計（V は小さいので Python で）
+        need = dict.fromkeys(vnr.nodes, 0.0)
+        max_demand = 0.0
+        for u, v, demand in vnr.edges(data="bandwidth"):
+            need[u] += demand
+            need[v] += demand
+            max_demand = max(max_demand, demand)
+        if max_demand == 0.0:
+            return None
+
+        if not self.split and max_demand > self.bandwidth_index.max():
+            return "link_bandwidth"
+
+        # 各仮想ノードに CPU と隣接残余帯域の両方が足りる基盤ノードがあるか
+        need_sum = np.fromiter(need.values(), dtype=np.float64)
+        strength = self.strength * (1 + _SLACK) + _SLACK
+        # 全要求を上回るノードが V 個あれば十分（負荷が軽い時の近道）
+        strong = (substrate_cpu >= cpu.max()) & (strength >= need_sum.max())
+        if np.count_nonzero(strong) >= len(cpu):
+            return None
+        candidates = np.flatnonzero(
+            (substrate_cpu >= cpu.min()) & (strength >= need_sum.min())
+        )
+        if len(candidates) < len(cpu):
+            return "node_bounds"
+        ok = (substrate_cpu[candidates, None] >= cpu[None, :]) & (
+            strength[candidates, None] >= need_sum[None, :]
+        )
+        if not ok.any(axis=0).all():
+            return "node_bounds"
+        return None
+
+    def _refresh_nodes(self, nodes: np.ndarray) -> None:
+        substrate = self.substrate
+        starts = substrate.indptr[nodes]
+        counts = substrate.indptr[nodes + 1] - starts
+        self.strength[nodes] = 0.0
+        has = counts > 0
+        if not has.any():
+            return
+        nodes, starts, counts = nodes[has], starts[has], counts[has]
+
+        # 対象ノードの隣接スロットを連結して reduceat で集計
+        offsets = np.cumsum(counts) - counts
+        slots = np.arange(counts.sum()) + np.repeat(starts - offsets, counts)
+        values = substrate.bandwidth[substrate.adj_edge_ids[slots]]
+        self.strength[nodes] = np.add.reduceat(values, offsets)
+
+    # ------------------------------------------------------------------
+    # SubstrateState listener
+    # ------------------------------------------------------------------
+    def on_substrate_update(
+        self,
+        node_ids: np.ndarray,
+        old_cpu: np.ndarray,
+        edge_ids: np.ndarray,
+        old_bandwidth: np.ndarray,
+    ) -> None:
+        substrate = self.substrate
+        if len(node_ids):
+            self.total_cpu += float(
+                substrate.cpu[node_ids].sum() - old_cpu.sum()
+            )
+        if len(edge_ids):
+            self._refresh_nodes(
+                np.unique(
+                    np.concatenate(
+                        [
+                            substrate.edge_src[edge_ids],
+                            substrate.edge_dst[edge_ids],
+                        ]
+                    )
+                )
+            )
+
+    def on_substrate_reset(self) -> None:
+        substrate = self.substrate
+        self.total_cpu = float(substrate.cpu.sum())
+        self.strength = np.zeros(substrate.num_nodes)
+        self._refresh_nodes(np.arange(substrate.num_nodes))
@@ -0,0 +1,261 @@
+# utils/k_paths.py
+
+import heapq
+from collections import OrderedDict
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import networkx as nx
+import numpy as np
+
+from utils.link_mapping import Flows, Route, find_path
+from utils.substrate_state import SubstrateState
+
+
+class PathSet(NamedTuple):
+    """
+    The k shortest loop-free paths between one node pair, flattened.
+
+    Path ``i`` visits ``nodes[node_ptr[i]:node_ptr[i + 1]]`` over edges
+    ``edge_ids[edge_ptr[i]:edge_ptr[i + 1]]``. Paths are ordered by hop
+    count (ties towards the lexicographically smaller node sequence) and
+    run from the smaller node id to the larger one.
+    """
+
+    nodes: np.ndarray
+    node_ptr: np.ndarray
+    edge_ids: np.ndarray
+    edge_ptr: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.edge_ptr) - 1
+
+    def path(self, i: int, reverse: bool = False) -> List[int]:
+        nodes = self.nodes[self.node_ptr[i]:self.node_ptr[i + 1]].tolist()
+        return nodes[::-1] if reverse else nodes
+
+    def edges(self, i: int) -> np.ndarray:
+        return self.edge_ids[self.edge_ptr[i]:self.edge_ptr[i + 1]]
+
+    def bottlenecks(self, residual: np.ndarray) -> np.ndarray:
+        """
+        Smallest residual along every path, in one vectorized pass.
+        """
+        if len(self) == 0:
+            return np.empty(0, dtype=residual.dtype)
+        return np.minimum.reduceat(residual[self.edge_ids], self.edge_ptr[:-1])
+
+
+class KPathTable:
+    """
+    Lazily built table of the k shortest loop-free paths per node pair.
+
+    Paths depend on the topology only, so an entry is computed (Yen's
+    algorithm over hop count) the first time a pair is asked for and
+    then stays valid for the lifetime of the substrate; residual
+    bandwidth is checked at lookup time with :meth:`PathSet.bottlenecks`.
+    Entries are kept per unordered pair in an LRU of ``max_pairs``.
+
+    Use :func:`k_path_table` to get the table shared by everything that
+    works on the same substrate.
+
+    Args:
+        substrate: The substrate state
+        k: Paths per pair
+        max_pairs: Pairs kept before the least recently used is dropped
+    """
+
+    def __init__(
+        self, substrate: SubstrateState, k: int, max_pairs: int = 65536
+    ):
+        if k < 1:
+            raise ValueError("k must be >= 1")
+        self.substrate = substrate
+        self.k = k
+        self.max_pairs = max_pairs
+
+        self._entries: "OrderedDict[Tuple[int, int], PathSet]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, source: int, target: int) -> PathSet:
+        """
+        Paths between two distinct nodes (empty if they are disconnected).
+
+        The PathSet runs from ``min(source, target)`` to the other node;
+        pass ``reverse=source > target`` to :meth:`PathSet.path`.
+        """
+        key = (min(source, target), max(source, target))
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+        self.misses += 1
+        entry = self._build(*key)
+        self._entries[key] = entry
+        if len(self._entries) > self.max_pairs:
+            self._entries.popitem(last=False)
+        return entry
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+    def _build(self, source: int, target: int) -> PathSet:
+        paths = yen_k_shortest_paths(self.substrate, source, target, self.k)
+        edge_counts = [len(p) - 1 for p in paths]
+        node_ptr = np.zeros(len(paths) + 1, dtype=np.int64)
+        edge_ptr = np.zeros(len(paths) + 1, dtype=np.int64)
+        np.cumsum([len(p) for p in paths], out=node_ptr[1:])
+        np.cumsum(edge_counts, out=edge_ptr[1:])
+        return PathSet(
+            nodes=np.array([n for p in paths for n in p], dtype=np.int64),
+            node_ptr=node_ptr,
+            edge_ids=np.concatenate(
+                [self.substrate.path_edge_ids(p) for p in paths]
+                or [np.empty(0, dtype=np.int64)]
+            ),
+            edge_ptr=edge_ptr,
+        )
+
+
+def k_path_table(substrate: SubstrateState, k: int) -> KPathTable:
+    """
+    The KPathTable for ``k`` paths on a substrate, created on first use.
+    """
+    table = substrate.k_path_tables.get(k)
+    if table is None:
+        table = substrate.k_path_tables[k] = KPathTable(substrate, k)
+    return table
+
+
+def yen_k_shortest_paths(
+    substrate: SubstrateState, source: int, target: int, k: int
+) -> List[List[int]]:
+    """
+    Yen's algorithm with the hop-count BFS of :func:`find_path`.
+
+    Removed nodes / edges of each spur search are expressed as a
+    residual mask (-1 on blocked edges, searched with demand 0), so no
+    graph copy is made. The searches bypass the PathCache, whose
+    entries describe the substrate residuals rather than these masks.
+
+    Returns:
+        Up to ``k`` loop-free node paths, shortest first
+    """
+    first = find_path(
+        substrate, source, target, 0.0, _mask(substrate), use_cache=False
+    )
+    if first is None:
+        return []
+
+    found = [first]
+    seen = {tuple(first)}
+    candidates: List[Tuple[int, Tuple[int, ...]]] = []
+
+    while len(found) < k:
+        prev = found[-1]
+        for i in range(len(prev) - 1):
+            root = prev[:i + 1]
+            mask = _mask(substrate)
+            # 同じ根を持つ既知経路の次の辺と、根上のノードを除外
+            for path in found:
+                if path[:i + 1] == root:
+                    mask[substrate.edge_id(path[i], path[i + 1])] = -1.0
+            for node in root[:-1]:
+                mask[substrate.incident_edges(node)] = -1.0
+
+            spur = find_path(
+                substrate, root[-1], target, 0.0, mask, use_cache=False
+            )
+            if spur is None:
+                continue
+            path = tuple(root[:-1] + spur)
+            if path not in seen:
+                seen.add(path)
+                heapq.heappush(candidates, (len(path), path))
+
+        if not candidates:
+            break
+        found.append(list(heapq.heappop(candidates)[1]))
+
+    return found
+
+
+def _mask(substrate: SubstrateState) -> np.ndarray:
+    return np.ones(substrate.num_edges, dtype=np.float64)
+
+
+def map_links_k_paths(
+    substrate: SubstrateState,
+    vnr: nx.Graph,
+    node_mapping: Dict[int, int],
+    k: int,
+    split: bool = False,
+) -> Optional[Dict[Tuple[int, int], Route]]:
+    """
+    Route every virtual link over one of its k precomputed paths.
+
+    Each link takes the shortest candidate whose bottleneck fits the
+    whole demand. With ``split=True`` a link that fits on no single path
+    is spread over the candidates in order, each carrying as much as its
+    bottleneck allows, and is stored as a list of ``(path, bandwidth)``
+    flows instead of a node path. Bandwidth is reserved on a scratch
+    residual array as links are routed, as in :func:`map_links`.
+
+    Returns:
+        link_paths (VNR edge → SN path or flows), or None if any link
+        cannot be routed
+    """
+    link_paths = {}
+    if vnr.number_of_edges() == 0:
+        return link_paths
+
+    table = k_path_table(substrate, k)
+    residual = substrate.bandwidth.copy()
+
+    for u, v in vnr.edges:
+        demand = vnr.edges[u, v]["bandwidth"]
+        source, target = node_mapping[u], node_mapping[v]
+        if source == target:
+            link_paths[(u, v)] = [source]
+            continue
+
+        paths = table.get(source, target)
+        reverse = source > target
+        bottlenecks = paths.bottlenecks(residual)
+        fits = np.flatnonzero(bottlenecks >= demand)
+        if len(fits):
+            i = int(fits[0])
+            residual[paths.edges(i)] -= demand
+            link_paths[(u, v)] = paths.path(i, reverse)
+            continue
+
+        if not split or bottlenecks.sum() < demand:
+            return None
+
+        # 経路を順に使い、残り容量の分だけ流す（経路は辺を共有しうる）
+        flows: Flows = []
+        remaining = float(demand)
+        for i in range(len(paths)):
+            eids = paths.edges(i)
+            bw = min(float(residual[eids].min()), remaining)
+            if bw <= 0:
+                continue
+            residual[eids] -= bw
+            flows.append((paths.path(i, reverse), bw))
+            remaining -= bw
+            if remaining <= 0:
+                break
+        if remaining > 0:
+            return None
+        link_paths[(u, v)] = flows
+
+    return link_paths
@@ -0,0 +1,180 @@
+# utils/link_mapping.py
+
+from typing import Dict, List, Optional, Tuple, Union
+
+import networkx as nx
+import numpy as np
+
+from utils.substrate_state import SubstrateState
+
+# 帯域を分割したリンク: [(ノード経路, 帯域), ...]
+Flows = List[Tuple[List[int], float]]
+# link_paths の値: ノード経路、または分割時は Flows
+Route = Union[List[int], Flows]
+
+
+def is_split(route: Route) -> bool:
+    return bool(route) and isinstance(route[0], tuple)
+
+
+def link_flows(route: Route, demand: Optional[float]) -> Flows:
+    """
+    A ``link_paths`` value as ``(path, bandwidth)`` flows; an unsplit
+    path carries the whole demand.
+    """
+    if is_split(route):
+        return [(path, float(bw)) for path, bw in route]
+    return [(route, demand)]
+
+
+def find_path(
+    substrate: SubstrateState,
+    source: int,
+    target: int,
+    demand: float,
+    residual: Optional[np.ndarray] = None,
+    use_cache: bool = True,
+) -> Optional[List[int]]:
+    """
+    Hop-count shortest path using only edges with enough residual bandwidth.
+
+    The search is a level-synchronous BFS over the CSR adjacency: each
+    level expands the whole frontier with NumPy and drops edges whose
+    residual is below ``demand`` on the fly, so no filtered graph is built.
+    Ties are broken towards the lowest node id.
+
+    If the substrate has a PathCache attached, results computed on the
+    substrate's own residual bandwidth are cached. A cached path is reused
+    for a scratch ``residual`` when it still fits there, which gives the
+    same answer as a fresh search since the scratch array only ever holds
+    less bandwidth than the substrate.
+
+    Args:
+        substrate: The substrate state
+        source: Source substrate node
+        target: Target substrate node
+        demand: Bandwidth demand of the virtual link
+        residual: Per-edge residual bandwidth to search over
+            (defaults to ``substrate.bandwidth``)
+        use_cache: Whether to go through the PathCache (searches over
+            masks that are not residuals should not)
+
+    Returns:
+        Node path from source to target, or None if no feasible path exists
+    """
+    if source == target:
+        return [source]
+
+    cache = substrate.path_cache
+    if cache is None or not use_cache:
+        return _bfs(substrate, source, target, demand, residual)
+
+    demand = float(demand)
+    found, path, edge_ids = cache.get(source, target, demand)
+    if not found:
+        path = _bfs(substrate, source, target, demand, None)
+        if path is not None:
+            edge_ids = substrate.path_edge_ids(path)
+        cache.put(source, target, demand, path, edge_ids)
+
+    if path is None:
+        return None
+    if (
+        residual is None
+        or residual is substrate.bandwidth
+        or residual[edge_ids].min() >= demand
+    ):
+        return list(path)
+    return _bfs(substrate, source, target, demand, residual)
+
+
+def _bfs(
+    substrate: SubstrateState,
+    source: int,
+    target: int,
+    demand: float,
+    residual: Optional[np.ndarray],
+) -> Optional[List[int]]:
+    if residual is None:
+        residual = substrate.bandwidth
+
+    indptr = substrate.indptr
+    indices = substrate.indices
+    adj_edge_ids = substrate.adj_edge_ids
+
+    parent = np.full(substrate.num_nodes, -1, dtype=np.int64)
+    parent[source] = source
+    frontier = np.array([source], dtype=np.int64)
+
+    while frontier.size:
+        starts = indptr[frontier]
+        counts = indptr[frontier + 1] - starts
+        total = int(counts.sum())
+        if total == 0:
+            break
+
+        # フロンティア全体の隣接スロットを一括展開
+        offsets = np.cumsum(counts) - counts
+        slots = np.arange(total) + np.repeat(starts - offsets, counts)
+        owners = np.repeat(frontier, counts)
+        nbrs = indices[slots]
+
+        ok = (residual[adj_edge_ids[slots]] >= demand) & (parent[nbrs] < 0)
+        if not ok.any():
+            break
+
+        frontier, first = np.unique(nbrs[ok], return_index=True)
+        parent[frontier] = owners[ok][first]
+        if parent[target] >= 0:
+            break
+
+    if parent[target] < 0:
+        return None
+
+    path = [target]
+    node = target
+    while node != source:
+        node = int(parent[node])
+        path.append(node)
+    path.reverse()
+    return path
+
+
+def map_links(
+    substrate: SubstrateState,
+    vnr: nx.Graph,
+    node_mapping: Dict[int, int],
+) -> Optional[Dict[Tuple[int, int], List[int]]]:
+    """
+    Route every virtual link of a VNR over the residual bandwidth.
+
+    Bandwidth is reserved on a scratch copy of the residual array as each
+    link is routed, so later links of the same VNR cannot oversubscribe
+    an edge already used by an earlier one.
+
+    Args:
+        substrate: The substrate state
+        vnr: The virtual network request
+        node_mapping: VNR node → SN node
+
+    Returns:
+        link_paths (VNR edge → SN path), or None if any link cannot be routed
+    """
+    link_paths = {}
+    if vnr.number_of_edges() == 0:
+        return link_paths
+
+    residual = substrate.bandwidth.copy()
+
+    for u, v in vnr.edges:
+        bw_demand = vnr.edges[u, v]["bandwidth"]
+        path = find_path(
+            substrate, node_mapping[u], node_mapping[v], bw_demand, residual
+        )
+        if path is None:
+            return None
+
+        residual[substrate.path_edge_ids(path)] -= bw_demand
+        link_paths[(u, v)] = path
+
+    return link_paths
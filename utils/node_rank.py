@@ -0,0 +1,188 @@
+# utils/node_rank.py
+
+import numpy as np
+import scipy.sparse as sp
+
+from utils.substrate_state import SubstrateState
+
+
+class NodeRank:
+    """
+    GRC / NodeRank-style score of every substrate node, kept cached.
+
+    A node's own weight is ``cpu * (residual bandwidth of its incident
+    edges)``, normalized to sum to 1. The rank is the stationary vector
+    of ``r = (1 - d) * c + d * M r`` where ``M`` moves a node's rank to
+    its neighbours in proportion to the residual bandwidth of the
+    connecting edges. It is solved by power iteration on a SciPy CSR
+    matrix that shares the substrate's adjacency layout, warm-started
+    from the previous rank.
+
+    The rank is only recomputed once the residuals have drifted far
+    enough from the ones it was computed on: the listener keeps the L1
+    distance of CPU and bandwidth from that point (relative to total
+    capacity) up to date on every allocate / release, and
+    :attr:`rank` refreshes when either exceeds ``drift_threshold``.
+
+    Args:
+        substrate: The substrate state
+        damping: Share of rank that flows to neighbours each iteration
+        drift_threshold: Relative L1 drift that triggers a refresh
+            (0 refreshes after every change)
+        tol: L1 convergence tolerance of the power iteration
+        max_iter: Iteration cap of the power iteration
+    """
+
+    def __init__(
+        self,
+        substrate: SubstrateState,
+        damping: float = 0.85,
+        drift_threshold: float = 0.05,
+        tol: float = 1e-6,
+        max_iter: int = 100,
+    ):
+        self.substrate = substrate
+        self.damping = damping
+        self.drift_threshold = drift_threshold
+        self.tol = tol
+        self.max_iter = max_iter
+
+        n = substrate.num_nodes
+        # 隣接スロットと同じ並びの CSR（data だけ残余帯域で差し替える）
+        self._adjacency = sp.csr_matrix(
+            (
+                np.zeros(len(substrate.indices)),
+                substrate.indices,
+                substrate.indptr,
+            ),
+            shape=(n, n),
+        )
+        self._cpu_scale = max(float(substrate.cpu_capacity.sum()), 1e-12)
+        self._bw_scale = max(
+            float(substrate.bandwidth_capacity.sum()), 1e-12
+        )
+
+        self._rank = np.full(n, 1.0 / max(n, 1))
+        self._order = np.arange(n)
+        self._base_cpu = None
+        self._base_bw = None
+        self._cpu_drift = 0.0
+        self._bw_drift = 0.0
+        self.refreshes = 0
+        self.iterations = 0
+
+        substrate.add_listener(self)
+
+    @property
+    def rank(self) -> np.ndarray:
+        if self._stale():
+            self.refresh()
+        return self._rank
+
+    @property
+    def order(self) -> np.ndarray:
+        """
+        Node ids by descending rank (ties towards the lowest id).
+        """
+        if self._stale():
+            self.refresh()
+        return self._order
+
+    def refresh(self) -> None:
+        substrate = self.substrate
+        cpu, bandwidth = substrate.cpu, substrate.bandwidth
+        n = substrate.num_nodes
+
+        strength = np.bincount(
+            substrate.edge_src, bandwidth, minlength=n
+        ) + np.bincount(substrate.edge_dst, bandwidth, minlength=n)
+        weight = np.clip(cpu, 0, None) * np.clip(strength, 0, None)
+        total = weight.sum()
+        own = weight / total if total > 0 else np.full(n, 1.0 / max(n, 1))
+
+        A = self._adjacency
+        A.data[:] = np.clip(bandwidth[substrate.adj_edge_ids], 0, None)
+        dangling = strength <= 0
+        inv_strength = np.divide(
+            1.0, strength, out=np.zeros(n), where=~dangling
+        )
+
+        d = self.damping
+        rank = self._rank
+        for it in range(1, self.max_iter + 1):
+            # 帯域を持たないノードの分は自身の重みに従って配り直す
+            spread = A @ (rank * inv_strength) + rank[dangling].sum() * own
+            new = (1 - d) * own + d * spread
+            delta = np.abs(new - rank).sum()
+            rank = new
+            if delta < self.tol:
+                break
+        self.iterations += it
+        self.refreshes += 1
+
+        self._rank = rank
+        self._order = np.argsort(-rank, kind="stable")
+        self._base_cpu = cpu.copy()
+        self._base_bw = bandwidth.copy()
+        self._cpu_drift = 0.0
+        self._bw_drift = 0.0
+
+    def get_state(self) -> tuple:
+        """
+        Cached rank and drift bookkeeping, for :meth:`set_state`.
+        """
+        return (
+            self._rank,
+            self._order,
+            self._base_cpu,
+            self._base_bw,
+            self._cpu_drift,
+            self._bw_drift,
+        )
+
+    def set_state(self, state: tuple) -> None:
+        # 配列は refresh で作り直すだけなので共有してよい
+        (
+            self._rank,
+            self._order,
+            self._base_cpu,
+            self._base_bw,
+            self._cpu_drift,
+            self._bw_drift,
+        ) = state
+
+    def _stale(self) -> bool:
+        if self._base_cpu is None:
+            return True
+        threshold = self.drift_threshold
+        return (
+            self._cpu_drift / self._cpu_scale > threshold
+            or self._bw_drift / self._bw_scale > threshold
+        )
+
+    # ------------------------------------------------------------------
+    # SubstrateState listener
+    # ------------------------------------------------------------------
+    def on_substrate_update(
+        self,
+        node_ids: np.ndarray,
+        old_cpu: np.ndarray,
+        edge_ids: np.ndarray,
+        old_bandwidth: np.ndarray,
+    ) -> None:
+        if self._base_cpu is None:
+            return
+        # 基準時点からの L1 距離を、触れた要素の分だけ更新
+        base = self._base_cpu[node_ids]
+        self._cpu_drift += float(
+            np.abs(self.substrate.cpu[node_ids] - base).sum()
+            - np.abs(old_cpu - base).sum()
+        )
+        base = self._base_bw[edge_ids]
+        self._bw_drift += float(
+            np.abs(self.substrate.bandwidth[edge_ids] - base).sum()
+            - np.abs(old_bandwidth - base).sum()
+        )
+
+    def on_substrate_reset(self) -> None:
+        self._base_cpu = None
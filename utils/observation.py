@@ -0,0 +1,240 @@
+# utils/observation.py
+
+from typing import Any, Dict, Optional
+
+import networkx as nx
+import numpy as np
+from gymnasium import spaces
+
+from utils.topology import topology_max_edges, topology_num_nodes
+
+NUM_VNR_STATS = 3
+NUM_AGGREGATES = 4
+
+
+def observation_size(config: Dict[str, Any]) -> int:
+    """
+    Length of the observation vector for a config.
+    """
+    max_nodes, max_links, vnr_nodes = _dimensions(config)
+    return max_nodes + max_links + vnr_nodes + NUM_VNR_STATS + NUM_AGGREGATES
+
+
+def observation_space(config: Dict[str, Any]) -> spaces.Box:
+    return spaces.Box(
+        low=0, high=1, shape=(observation_size(config),), dtype=np.float32
+    )
+
+
+def _dimensions(config: Dict[str, Any]):
+    max_nodes = topology_num_nodes(config["substrate"])
+    max_links = config.get("observation", {}).get("max_links")
+    if max_links is None:
+        max_links = topology_max_edges(config["substrate"])
+    return max_nodes, max_links, config["vnr"]["num_nodes"]
+
+
+class ObservationBuilder:
+    """
+    Observation vector kept in sync with a SubstrateState.
+
+    The vector lives in one preallocated float32 buffer laid out as::
+
+        node_util    (max_nodes)   1 - residual / capacity CPU per node
+        link_util    (max_links)   the same for bandwidth per edge id
+        vnr          (vnr_nodes)   CPU demands of the pending VNR, sorted
+                                   in descending order
+        vnr_stats    (3)           link density, mean / max link demand
+        aggregates   (4)           mean / max node util, mean / max link util
+
+    Every entry lies in [0, 1]; demands are scaled by the upper bound of
+    the VNR ``cpu_range`` / ``bandwidth_range``. ``max_links`` defaults
+    to ``topology_max_edges`` (a high-probability bound for random
+    graphs, so it scales with the expected edge count rather than
+    ``n(n-1)/2``); edges beyond it are left out of ``link_util`` but
+    still count towards the aggregates.
+
+    The builder is a substrate listener: after an allocate / release only
+    the touched node and edge entries are recomputed, and the aggregates
+    are maintained from running sums plus the position of the current
+    maximum. ``observation`` is a read-only view of the buffer, so it
+    changes in place as the substrate does; copy it to keep a snapshot.
+
+    Args:
+        config: Full experiment config
+        out: Optional float32 array of ``observation_size(config)`` to
+            use as the buffer (e.g. a row of a batched array)
+    """
+
+    def __init__(
+        self, config: Dict[str, Any], out: Optional[np.ndarray] = None
+    ):
+        self.max_nodes, self.max_links, self.vnr_nodes = _dimensions(config)
+        self.cpu_scale = float(config["vnr"]["cpu_range"][1])
+        self.bandwidth_scale = float(config["vnr"]["bandwidth_range"][1])
+
+        size = observation_size(config)
+        if out is None:
+            out = np.zeros(size, dtype=np.float32)
+        assert out.shape == (size,)
+        self.buffer = out
+
+        # バッファを区切ったビュー（コピーは作らない）
+        bounds = np.cumsum(
+            [
+                0,
+                self.max_nodes,
+                self.max_links,
+                self.vnr_nodes,
+                NUM_VNR_STATS,
+                NUM_AGGREGATES,
+            ]
+        )
+        (
+            self.node_util,
+            self.link_util,
+            self.vnr_cpu,
+            self.vnr_stats,
+            self.aggregates,
+        ) = (out[a:b] for a, b in zip(bounds[:-1], bounds[1:]))
+        self._view = out.view()
+        self._view.flags.writeable = False
+
+        self.substrate = None
+        self._util = {}
+        self._sum = {}
+        self._argmax = {}
+
+    @property
+    def observation(self) -> np.ndarray:
+        return self._view
+
+    def attach(self, substrate) -> None:
+        """
+        Follow a (new) substrate and recompute every entry from it.
+        """
+        if self.substrate is not None:
+            self.substrate.remove_listener(self)
+        self.substrate = substrate
+        substrate.add_listener(self)
+        self.on_substrate_reset()
+
+    def set_vnr(self, vnr: Optional[nx.Graph]) -> None:
+        """
+        Write the demand features of the VNR waiting to be embedded
+        (zeros if there is none).
+        """
+        self.vnr_cpu[:] = 0.0
+        self.vnr_stats[:] = 0.0
+        if vnr is None:
+            return
+
+        cpu = np.fromiter(
+            (c for _, c in vnr.nodes(data="cpu")), dtype=np.float64
+        )
+        cpu = np.sort(cpu)[::-1][:self.vnr_nodes]
+        self.vnr_cpu[:len(cpu)] = cpu / self.cpu_scale
+
+        n = vnr.number_of_nodes()
+        bandwidth = np.fromiter(
+            (bw for _, _, bw in vnr.edges(data="bandwidth")), dtype=np.float64
+        )
+        if len(bandwidth):
+            self.vnr_stats[0] = len(bandwidth) / (n * (n - 1) / 2)
+            self.vnr_stats[1] = bandwidth.mean() / self.bandwidth_scale
+            self.vnr_stats[2] = bandwidth.max() / self.bandwidth_scale
+
+    def get_state(self) -> tuple:
+        """
+        Pending-VNR features and aggregate bookkeeping, for
+        :meth:`set_state`. The per-node / per-link entries are not
+        included; they follow the substrate through the listener.
+        """
+        return (
+            self.vnr_cpu.copy(),
+            self.vnr_stats.copy(),
+            self.aggregates.copy(),
+            dict(self._sum),
+            dict(self._argmax),
+        )
+
+    def set_state(self, state: tuple) -> None:
+        vnr_cpu, vnr_stats, aggregates, sums, argmax = state
+        self.vnr_cpu[:] = vnr_cpu
+        self.vnr_stats[:] = vnr_stats
+        # 累積和は丸め誤差ごと保存時の値に戻す（再現性のため）
+        self.aggregates[:] = aggregates
+        self._sum = dict(sums)
+        self._argmax = dict(argmax)
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+    def _refresh(self, kind: str, ids: np.ndarray) -> None:
+        substrate = self.substrate
+        if kind == "cpu":
+            residual, capacity = substrate.cpu, substrate.cpu_capacity
+            visible, slot = self.node_util, 0
+        else:
+            residual = substrate.bandwidth
+            capacity = substrate.bandwidth_capacity
+            visible, slot = self.link_util, 2
+
+        util = self._util[kind]
+        old = util[ids]
+        new = 1.0 - np.divide(
+            residual[ids],
+            capacity[ids],
+            out=np.ones(len(ids)),
+            where=capacity[ids] > 0,
+        )
+        util[ids] = new
+        self._sum[kind] += new.sum() - old.sum()
+
+        shown = ids[ids < len(visible)]
+        visible[shown] = util[shown]
+
+        # 最大値の位置を追跡（最大だった要素が下がった時だけ全体を再走査）
+        best = self._argmax[kind]
+        hit = np.flatnonzero(ids == best)
+        if len(hit) and new[hit[0]] < old[hit[0]]:
+            best = int(util.argmax())
+        elif len(ids):
+            k = int(ids[new.argmax()])
+            if best < 0 or util[k] > util[best]:
+                best = k
+
+        self._argmax[kind] = best
+        count = len(util)
+        # 累積和の丸め誤差で [0, 1] をはみ出さないようにする
+        mean = self._sum[kind] / count if count else 0.0
+        self.aggregates[slot] = min(max(mean, 0.0), 1.0)
+        self.aggregates[slot + 1] = util[best] if best >= 0 else 0.0
+
+    # ------------------------------------------------------------------
+    # SubstrateState listener
+    # ------------------------------------------------------------------
+    def on_substrate_update(
+        self,
+        node_ids: np.ndarray,
+        old_cpu: np.ndarray,
+        edge_ids: np.ndarray,
+        old_bandwidth: np.ndarray,
+    ) -> None:
+        if len(node_ids):
+            self._refresh("cpu", node_ids)
+        if len(edge_ids):
+            self._refresh("bandwidth", edge_ids)
+
+    def on_substrate_reset(self) -> None:
+        substrate = self.substrate
+        self.node_util[:] = 0.0
+        self.link_util[:] = 0.0
+        for kind, count in (
+            ("cpu", substrate.num_nodes),
+            ("bandwidth", substrate.num_edges),
+        ):
+            self._util[kind] = np.zeros(count)
+            self._sum[kind] = 0.0
+            self._argmax[kind] = -1
+            self._refresh(kind, np.arange(count))
@@ -0,0 +1,283 @@
+# utils/online_metrics.py
+
+import math
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+import networkx as nx
+import numpy as np
+
+from utils.evaluator import vnr_revenue
+from utils.substrate_state import SubstrateState
+
+
+class UtilizationHistogram:
+    """
+    Fixed-bin histogram of per-element utilization (``1 - residual /
+    capacity``) that is updated only where residuals changed.
+
+    Percentiles are read off the cumulative counts, so they are exact up
+    to the bin width ``1 / bins`` and cost O(bins) regardless of the
+    number of elements. Elements with zero capacity count as unused.
+
+    Args:
+        capacity: Capacity of every element
+        bins: Number of equal-width bins over [0, 1]
+    """
+
+    def __init__(self, capacity: np.ndarray, bins: int = 100):
+        self.bins = bins
+        self.counts = np.zeros(bins, dtype=np.int64)
+        self._capacity = np.asarray(capacity, dtype=np.float64)
+        self._inv_capacity = np.divide(
+            1.0,
+            self._capacity,
+            out=np.zeros(len(self._capacity)),
+            where=self._capacity > 0,
+        )
+        self._bin = np.zeros(len(self._capacity), dtype=np.int64)
+        self.total_residual = 0.0
+        self.total_capacity = float(self._capacity.sum())
+
+    def rebuild(self, residual: np.ndarray) -> None:
+        self._bin = self._bin_of(np.arange(len(residual)), residual)
+        self.counts = np.bincount(self._bin, minlength=self.bins)
+        self.total_residual = float(residual.sum())
+
+    def update(
+        self, ids: np.ndarray, residual: np.ndarray, old: np.ndarray
+    ) -> None:
+        """
+        Move ``ids`` (unique) to the bins of their new residuals.
+        """
+        if len(ids) == 0:
+            return
+        new_bin = self._bin_of(ids, residual)
+        # ufunc.at より bincount の差分の方が速い（要素数が少ないため）
+        self.counts += np.bincount(
+            new_bin, minlength=self.bins
+        ) - np.bincount(self._bin[ids], minlength=self.bins)
+        self._bin[ids] = new_bin
+        self.total_residual += float(residual.sum() - old.sum())
+
+    def percentile(self, q: float) -> float:
+        """
+        Upper edge of the bin holding the ``q``-th percentile.
+        """
+        cumulative = np.cumsum(self.counts)
+        if cumulative[-1] == 0:
+            return 0.0
+        k = int(np.searchsorted(cumulative, q / 100.0 * cumulative[-1]))
+        return min(k + 1, self.bins) / self.bins
+
+    @property
+    def mean(self) -> float:
+        """
+        Capacity-weighted utilization (used / total capacity).
+        """
+        if self.total_capacity <= 0:
+            return 0.0
+        return 1.0 - self.total_residual / self.total_capacity
+
+    def _bin_of(self, ids: np.ndarray, residual: np.ndarray) -> np.ndarray:
+        used = (self._capacity[ids] - residual) * self._inv_capacity[ids]
+        return np.clip(
+            (used * self.bins).astype(np.int64), 0, self.bins - 1
+        )
+
+
+class OnlineMetrics:
+    """
+    Running VNE metrics with memory independent of the run length.
+
+    Per arrival (:meth:`record`), in O(1):
+
+    - acceptance ratio;
+    - long-term revenue, ``(total CPU + total bandwidth demand) x
+      lifetime`` of every accepted VNR;
+    - embedding cost, ``(total CPU + sum of bandwidth x path hops) x
+      lifetime``, read off the allocated arrays (one bandwidth entry per
+      edge of every path);
+    - revenue / cost ratio.
+
+    Each comes as a cumulative value and over a sliding window of the
+    last ``window`` arrivals (a ring buffer whose sums are updated on
+    every arrival and recomputed exactly once per lap).
+
+    Node (CPU) and link (bandwidth) utilization are tracked as
+    :class:`UtilizationHistogram` s kept up to date by listening to the
+    substrate, so an allocate / release costs O(touched elements);
+    percentiles and capacity-weighted means are available at any time.
+
+    :meth:`due` / :meth:`snapshot` produce a :meth:`summary` every
+    ``interval`` time units for periodic reporting.
+
+    Args:
+        substrate: The substrate state
+        window: Arrivals in the sliding window
+        interval: Simulation time between snapshots (0 disables them)
+        bins: Histogram bins for utilization percentiles
+        percentiles: Percentiles reported by :meth:`summary`
+    """
+
+    def __init__(
+        self,
+        substrate: SubstrateState,
+        window: int = 1000,
+        interval: float = 100.0,
+        bins: int = 100,
+        percentiles: Sequence[float] = (50, 90, 99),
+    ):
+        if window < 1:
+            raise ValueError("window must be >= 1")
+        self.substrate = substrate
+        self.window = window
+        self.interval = interval
+        self.percentiles = tuple(percentiles)
+
+        self.arrivals = 0
+        self.accepted = 0
+        self.revenue = 0.0
+        self.cost = 0.0
+        self.next_snapshot = interval
+
+        # 直近 window 件の到着のリングバッファ（受理 / 収益 / コスト）
+        self._ring = np.zeros((window, 3), dtype=np.float64)
+        self._ring_sum = np.zeros(3, dtype=np.float64)
+        self._ring_pos = 0
+
+        self.cpu = UtilizationHistogram(substrate.cpu_capacity, bins)
+        self.bandwidth = UtilizationHistogram(
+            substrate.bandwidth_capacity, bins
+        )
+        substrate.add_listener(self)
+        self.on_substrate_reset()
+
+    def record(
+        self,
+        vnr: nx.Graph,
+        duration: float,
+        arrays: Optional[Tuple[np.ndarray, ...]] = None,
+    ) -> None:
+        """
+        Account for one arrival.
+
+        Args:
+            vnr: The arriving VNR
+            duration: Its lifetime
+            arrays: ``embedding_arrays`` of its embedding, or None if it
+                was rejected
+        """
+        self.arrivals += 1
+        row = self._ring[self._ring_pos]
+        self._ring_sum -= row
+        if arrays is None:
+            row[:] = 0.0
+        else:
+            _, cpu, _, bandwidth = arrays
+            revenue = vnr_revenue(vnr) * duration
+            cost = float(cpu.sum() + bandwidth.sum()) * duration
+            self.accepted += 1
+            self.revenue += revenue
+            self.cost += cost
+            row[:] = (1.0, revenue, cost)
+        self._ring_sum += row
+
+        self._ring_pos += 1
+        if self._ring_pos == self.window:
+            self._ring_pos = 0
+            # 加減算の丸め誤差が溜まらないよう一周ごとに合計を取り直す
+            self._ring_sum = self._ring.sum(axis=0)
+
+    def summary(self) -> Dict[str, float]:
+        """
+        Cumulative and windowed metrics plus utilization statistics.
+        """
+        window_arrivals = min(self.arrivals, self.window)
+        win_accepted, win_revenue, win_cost = self._ring_sum.tolist()
+        out = {
+            "arrivals": self.arrivals,
+            "accepted": self.accepted,
+            "acceptance_ratio": _ratio(self.accepted, self.arrivals),
+            "revenue": self.revenue,
+            "cost": self.cost,
+            "rc_ratio": _ratio(self.revenue, self.cost),
+            "window_arrivals": window_arrivals,
+            "window_acceptance_ratio": _ratio(win_accepted, window_arrivals),
+            "window_revenue": win_revenue,
+            "window_cost": win_cost,
+            "window_rc_ratio": _ratio(win_revenue, win_cost),
+        }
+        for name, hist in (("cpu", self.cpu), ("bw", self.bandwidth)):
+            out[f"{name}_util_mean"] = hist.mean
+            for q in self.percentiles:
+                out[f"{name}_util_p{q:g}"] = hist.percentile(q)
+        return out
+
+    def due(self, now: float) -> bool:
+        return self.interval > 0 and now >= self.next_snapshot
+
+    def snapshot(self, now: float) -> Dict[str, Any]:
+        """
+        :meth:`summary` stamped with ``now``; schedules the next one.
+        """
+        if self.interval > 0:
+            self.next_snapshot = (
+                math.floor(now / self.interval) + 1
+            ) * self.interval
+        return {"time": now, **self.summary()}
+
+    def get_state(self) -> tuple:
+        """
+        Accumulators and the sliding window, for :meth:`set_state`.
+
+        The utilization histograms follow the substrate residuals
+        through the listener and are not part of the state.
+        """
+        return (
+            self.arrivals,
+            self.accepted,
+            self.revenue,
+            self.cost,
+            self.next_snapshot,
+            self._ring.copy(),
+            self._ring_sum.copy(),
+            self._ring_pos,
+        )
+
+    def set_state(self, state: tuple) -> None:
+        (
+            self.arrivals,
+            self.accepted,
+            self.revenue,
+            self.cost,
+            self.next_snapshot,
+            ring,
+            ring_sum,
+            self._ring_pos,
+        ) = state
+        self._ring = ring.copy()
+        self._ring_sum = ring_sum.copy()
+
+    # ------------------------------------------------------------------
+    # SubstrateState listener
+    # ------------------------------------------------------------------
+    def on_substrate_update(
+        self,
+        node_ids: np.ndarray,
+        old_cpu: np.ndarray,
+        edge_ids: np.ndarray,
+        old_bandwidth: np.ndarray,
+    ) -> None:
+        substrate = self.substrate
+        self.cpu.update(node_ids, substrate.cpu[node_ids], old_cpu)
+        self.bandwidth.update(
+            edge_ids, substrate.bandwidth[edge_ids], old_bandwidth
+        )
+
+    def on_substrate_reset(self) -> None:
+        self.cpu.rebuild(self.substrate.cpu)
+        self.bandwidth.rebuild(self.substrate.bandwidth)
+
+
+def _ratio(num: float, den: float) -> float:
+    return num / den if den > 0 else 0.0
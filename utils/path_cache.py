@@ -0,0 +1,428 @@
+# utils/path_cache.py
+
+import heapq
+import itertools
+import weakref
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+from utils.substrate_state import SubstrateState
+
+CacheKey = Tuple[int, int, float]
+
+
+class CacheMark:
+    """
+    Point in a PathCache's change log, returned by :meth:`PathCache.mark`.
+    """
+
+    __slots__ = ("journal", "position", "record", "counters", "__weakref__")
+
+    def __init__(
+        self, journal: list, position: int, record: Any, counters: tuple
+    ):
+        self.journal = journal
+        self.position = position
+        self.record = record
+        self.counters = counters
+
+
+class PathCache:
+    """
+    LRU cache of bandwidth-filtered shortest paths.
+
+    Entries are keyed by ``(source, target, demand)`` and hold the path
+    found on the substrate's residual bandwidth (or ``None`` when no path
+    exists), together with the substrate version it was computed at.
+
+    The cache listens to the substrate and invalidates selectively:
+
+    - when an edge loses bandwidth, only cached paths running over that
+      edge whose demand no longer fits are dropped;
+    - when an edge gains bandwidth, entries whose demand newly fits on
+      that edge are dropped, since a shorter path (or any path) may now
+      exist.
+
+    Everything else stays exactly what a fresh search would return.
+
+    LRU order is an access stamp per entry plus a min-heap of stamps
+    (outdated heap items are skipped when evicting). While a
+    :meth:`mark` is alive, every insert / discard / access is appended
+    to a change log, so :meth:`rollback` puts the cache back by undoing
+    only what changed since the mark.
+    """
+
+    def __init__(self, substrate: SubstrateState, max_size: int = 4096):
+        self.substrate = substrate
+        self.max_size = max_size
+
+        self._entries: Dict[CacheKey, Tuple] = {}
+        self._by_edge: Dict[int, Set[CacheKey]] = {}
+        self._by_demand: Dict[float, Set[CacheKey]] = {}
+        # 最終アクセス時刻とその最小ヒープ（古くなった要素は遅延削除）
+        self._stamp: Dict[CacheKey, int] = {}
+        self._lru: List[Tuple[int, CacheKey]] = []
+        self._clock = itertools.count()
+        # mark 以降の変更履歴（生きている mark が無い間は記録しない）
+        self._journal: List[tuple] = []
+        self._marks = weakref.WeakSet()
+        self._synced_version = substrate.version
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+        substrate.path_cache = self
+        substrate.add_listener(self)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(
+        self, source: int, target: int, demand: float
+    ) -> Tuple[bool, Optional[List[int]], Optional[np.ndarray]]:
+        """
+        Look up a path.
+
+        Returns:
+            found (bool): Whether the key was cached
+            path: Cached node path (None if no feasible path exists)
+            edge_ids: Edge ids along the path (None if no path)
+        """
+        if self._synced_version != self.substrate.version:
+            # 通知なしで資源が書き換えられた
+            self.clear()
+
+        key = (source, target, demand)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return False, None, None
+
+        self._touch(key)
+        self.hits += 1
+        path, edge_ids, _ = entry
+        return True, path, edge_ids
+
+    def put(
+        self,
+        source: int,
+        target: int,
+        demand: float,
+        path: Optional[List[int]],
+        edge_ids: Optional[np.ndarray],
+    ) -> None:
+        key = (source, target, demand)
+        if key in self._entries:
+            self._discard(key)
+
+        self._insert(key, (path, edge_ids, self.substrate.version))
+        while len(self._entries) > self.max_size:
+            self._discard(self._oldest())
+            self.evictions += 1
+
+    def clear(self) -> None:
+        self.invalidations += len(self._entries)
+        if self._entries:
+            # 入れ物ごと差し替え、履歴には古い入れ物を残す
+            self._log(
+                (
+                    "clear",
+                    self._entries,
+                    self._by_edge,
+                    self._by_demand,
+                    self._stamp,
+                    self._lru,
+                )
+            )
+            self._entries, self._by_edge, self._by_demand = {}, {}, {}
+            self._stamp, self._lru = {}, []
+        self._synced_version = self.substrate.version
+
+    def mark(self) -> CacheMark:
+        """
+        Remember the current contents for :meth:`rollback`.
+
+        O(1); the change log is kept only while some mark is referenced.
+        """
+        if not self._marks:
+            self._journal.clear()
+        journal = self._journal
+        mark = CacheMark(
+            journal,
+            len(journal),
+            journal[-1] if journal else None,
+            (self.hits, self.misses, self.evictions, self.invalidations),
+        )
+        self._marks.add(mark)
+        return mark
+
+    def rollback(self, mark: CacheMark) -> None:
+        """
+        Undo every change made since ``mark``, newest first.
+
+        A mark can be rolled back to any number of times, but no longer
+        after a rollback to an earlier mark or :meth:`set_state`. The
+        caller is responsible for the substrate residuals matching the
+        ones the mark was taken at.
+        """
+        journal = self._journal
+        position = mark.position
+        if (
+            mark.journal is not journal
+            or position > len(journal)
+            or (position and journal[position - 1] is not mark.record)
+        ):
+            raise ValueError("Cache mark is no longer valid")
+
+        while len(journal) > position:
+            record = journal.pop()
+            kind = record[0]
+            if kind == "touch":
+                _, key, stamp = record
+                self._stamp[key] = stamp
+                heapq.heappush(self._lru, (stamp, key))
+            elif kind == "insert":
+                key = record[1]
+                del self._stamp[key]
+                self._unindex(key, self._entries.pop(key))
+            elif kind == "discard":
+                _, key, entry, stamp = record
+                self._entries[key] = entry
+                self._stamp[key] = stamp
+                heapq.heappush(self._lru, (stamp, key))
+                self._index(key, entry)
+            else:
+                (
+                    _,
+                    self._entries,
+                    self._by_edge,
+                    self._by_demand,
+                    self._stamp,
+                    self._lru,
+                ) = record
+        self.hits, self.misses, self.evictions, self.invalidations = (
+            mark.counters
+        )
+        self._synced_version = self.substrate.version
+
+    def get_state(self) -> tuple:
+        """
+        Copy of the cache contents (least recently used first) and the
+        counters, for :meth:`set_state`; O(entries), see :meth:`mark`
+        for cheap rollbacks.
+
+        Cached paths themselves are shared, only the containers are
+        copied.
+        """
+        return (
+            OrderedDict((key, self._entries[key]) for key in self._lru_keys()),
+            {eid: set(keys) for eid, keys in self._by_edge.items()},
+            {d: set(keys) for d, keys in self._by_demand.items()},
+            (self.hits, self.misses, self.evictions, self.invalidations),
+        )
+
+    def set_state(self, state: tuple) -> None:
+        """
+        Put back contents saved by :meth:`get_state` (or :meth:`unpack`).
+
+        Invalidates every outstanding mark. The caller is responsible
+        for the substrate residuals matching the ones the state was
+        saved at.
+        """
+        entries, by_edge, by_demand, counters = state
+        self._entries = dict(entries)
+        self._by_edge = {eid: set(keys) for eid, keys in by_edge.items()}
+        self._by_demand = {d: set(keys) for d, keys in by_demand.items()}
+        self._stamp = {key: next(self._clock) for key in entries}
+        # 時刻順に並んだリストはそのままヒープになっている
+        self._lru = [(stamp, key) for key, stamp in self._stamp.items()]
+        self._journal = []
+        self.hits, self.misses, self.evictions, self.invalidations = counters
+        self._synced_version = self.substrate.version
+
+    def pack(self) -> Dict[str, Any]:
+        """
+        Contents as flat arrays plus counters (e.g. for a checkpoint
+        file); the edge / demand indexes are rebuilt by :meth:`unpack`.
+        """
+        keys = self._lru_keys()
+        entries = [self._entries[key] for key in keys]
+        found = [p is not None for p, _, _ in entries]
+        paths = [p for p, _, _ in entries if p is not None]
+        eids = [e for _, e, _ in entries if e is not None]
+        node_ptr = np.zeros(len(paths) + 1, dtype=np.int64)
+        edge_ptr = np.zeros(len(eids) + 1, dtype=np.int64)
+        np.cumsum([len(p) for p in paths], out=node_ptr[1:])
+        np.cumsum([len(e) for e in eids], out=edge_ptr[1:])
+        return {
+            "source": np.array([k[0] for k in keys], dtype=np.int64),
+            "target": np.array([k[1] for k in keys], dtype=np.int64),
+            "demand": np.array([k[2] for k in keys], dtype=np.float64),
+            "version": np.array([v for _, _, v in entries], dtype=np.int64),
+            "found": np.array(found, dtype=bool),
+            "nodes": np.array(
+                [n for p in paths for n in p], dtype=np.int64
+            ),
+            "node_ptr": node_ptr,
+            "edge_ids": np.concatenate(
+                eids or [np.empty(0, dtype=np.int64)]
+            ),
+            "edge_ptr": edge_ptr,
+            "counters": (
+                self.hits, self.misses, self.evictions, self.invalidations
+            ),
+        }
+
+    @staticmethod
+    def unpack(packed: Dict[str, Any]) -> tuple:
+        """
+        Rebuild the output of :meth:`pack` as a :meth:`set_state` state.
+        """
+        entries: "OrderedDict[CacheKey, Tuple]" = OrderedDict()
+        by_edge: Dict[int, Set[CacheKey]] = {}
+        by_demand: Dict[float, Set[CacheKey]] = {}
+        nodes = packed["nodes"].tolist()
+        node_ptr = packed["node_ptr"].tolist()
+        edge_ids, edge_ptr = packed["edge_ids"], packed["edge_ptr"]
+        k = 0
+        for source, target, demand, version, found in zip(
+            packed["source"].tolist(),
+            packed["target"].tolist(),
+            packed["demand"].tolist(),
+            packed["version"].tolist(),
+            packed["found"].tolist(),
+        ):
+            key = (source, target, demand)
+            by_demand.setdefault(demand, set()).add(key)
+            if not found:
+                entries[key] = (None, None, version)
+                continue
+            eids = edge_ids[edge_ptr[k]:edge_ptr[k + 1]]
+            entries[key] = (nodes[node_ptr[k]:node_ptr[k + 1]], eids, version)
+            for eid in eids.tolist():
+                by_edge.setdefault(eid, set()).add(key)
+            k += 1
+        return entries, by_edge, by_demand, packed["counters"]
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+    def _lru_keys(self) -> List[CacheKey]:
+        return sorted(self._entries, key=self._stamp.__getitem__)
+
+    def _log(self, record: tuple) -> None:
+        if self._marks:
+            self._journal.append(record)
+        elif self._journal:
+            self._journal.clear()
+
+    def _push(self, stamp: int, key: CacheKey) -> None:
+        heapq.heappush(self._lru, (stamp, key))
+        # 遅延削除で溜まった古い要素が増えすぎたら作り直す
+        if len(self._lru) > 2 * len(self._stamp) + 64:
+            self._lru = [(s, k) for k, s in self._stamp.items()]
+            heapq.heapify(self._lru)
+
+    def _oldest(self) -> CacheKey:
+        while True:
+            stamp, key = heapq.heappop(self._lru)
+            if self._stamp.get(key) == stamp:
+                return key
+
+    def _touch(self, key: CacheKey) -> None:
+        self._log(("touch", key, self._stamp[key]))
+        stamp = next(self._clock)
+        self._stamp[key] = stamp
+        self._push(stamp, key)
+
+    def _insert(self, key: CacheKey, entry: Tuple) -> None:
+        self._log(("insert", key))
+        stamp = next(self._clock)
+        self._entries[key] = entry
+        self._stamp[key] = stamp
+        self._push(stamp, key)
+        self._index(key, entry)
+
+    def _discard(self, key: CacheKey) -> None:
+        entry = self._entries.pop(key)
+        stamp = self._stamp.pop(key)
+        self._log(("discard", key, entry, stamp))
+        self._unindex(key, entry)
+
+    def _index(self, key: CacheKey, entry: Tuple) -> None:
+        self._by_demand.setdefault(key[2], set()).add(key)
+        edge_ids = entry[1]
+        if edge_ids is not None:
+            for eid in edge_ids.tolist():
+                self._by_edge.setdefault(eid, set()).add(key)
+
+    def _unindex(self, key: CacheKey, entry: Tuple) -> None:
+        demand_keys = self._by_demand.get(key[2])
+        if demand_keys is not None:
+            demand_keys.discard(key)
+            if not demand_keys:
+                del self._by_demand[key[2]]
+        edge_ids = entry[1]
+        if edge_ids is not None:
+            for eid in edge_ids.tolist():
+                edge_keys = self._by_edge.get(eid)
+                if edge_keys is not None:
+                    edge_keys.discard(key)
+                    if not edge_keys:
+                        del self._by_edge[eid]
+
+    def _invalidate(self, keys) -> None:
+        for key in list(keys):
+            if key in self._entries:
+                self._discard(key)
+                self.invalidations += 1
+
+    # ------------------------------------------------------------------
+    # SubstrateState listener
+    # ------------------------------------------------------------------
+    def on_substrate_update(
+        self,
+        node_ids: np.ndarray,
+        old_cpu: np.ndarray,
+        edge_ids: np.ndarray,
+        old_bandwidth: np.ndarray,
+    ) -> None:
+        if self._entries and len(edge_ids):
+            new_bandwidth = self.substrate.bandwidth[edge_ids]
+
+            # 帯域が減ったエッジ：そこを通り、需要を満たさなくなった経路のみ破棄
+            decreased = new_bandwidth < old_bandwidth
+            for eid, bw in zip(
+                edge_ids[decreased].tolist(), new_bandwidth[decreased].tolist()
+            ):
+                keys = self._by_edge.get(eid)
+                if keys:
+                    self._invalidate([k for k in keys if k[2] > bw])
+
+            # 帯域が増えたエッジ：新たに使えるようになった需要のエントリを破棄
+            increased = new_bandwidth > old_bandwidth
+            if increased.any() and self._by_demand:
+                old_inc = old_bandwidth[increased]
+                new_inc = new_bandwidth[increased]
+                demands = np.fromiter(self._by_demand, dtype=np.float64)
+                affected = (
+                    (old_inc[None, :] < demands[:, None])
+                    & (new_inc[None, :] >= demands[:, None])
+                ).any(axis=1)
+                for demand in demands[affected].tolist():
+                    self._invalidate(self._by_demand.get(demand, ()))
+
+        self._synced_version = self.substrate.version
+
+    def on_substrate_reset(self) -> None:
+        self.clear()
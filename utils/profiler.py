@@ -0,0 +1,110 @@
+# utils/profiler.py
+
+import time
+from typing import Dict
+
+PHASES = (
+    "vnr_generation",
+    "node_mapping",
+    "link_mapping",
+    "apply_embedding",
+    "release",
+    "logging",
+)
+
+
+class _NullPhase:
+    __slots__ = ()
+
+    def __enter__(self) -> None:
+        return None
+
+    def __exit__(self, *exc) -> None:
+        return None
+
+
+_NULL_PHASE = _NullPhase()
+
+
+class _Phase:
+    __slots__ = ("profiler", "name", "start")
+
+    def __init__(self, profiler: "PhaseProfiler", name: str):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self) -> None:
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc) -> None:
+        self.profiler.add(self.name, time.perf_counter() - self.start)
+
+
+class PhaseProfiler:
+    """
+    Accumulates wall time and call counts per simulator phase.
+
+    Hot paths wrap a phase in ``with PROFILER.phase("node_mapping"):``.
+    While disabled, ``phase`` returns a shared no-op context manager, so
+    the only cost left is one attribute check per call site.
+    """
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.seconds: Dict[str, float] = {}
+        self.calls: Dict[str, int] = {}
+
+    def phase(self, name: str):
+        if not self.enabled:
+            return _NULL_PHASE
+        return _Phase(self, name)
+
+    def add(self, name: str, seconds: float) -> None:
+        self.seconds[name] = self.seconds.get(name, 0.0) + seconds
+        self.calls[name] = self.calls.get(name, 0) + 1
+
+    def reset(self, enabled: bool = None) -> None:
+        if enabled is not None:
+            self.enabled = enabled
+        self.seconds.clear()
+        self.calls.clear()
+
+    def totals(self) -> Dict[str, float]:
+        """
+        Flat per-phase totals as ``<phase>_s`` / ``<phase>_calls`` entries.
+        """
+        result = {}
+        for name in PHASES + tuple(n for n in self.seconds if n not in PHASES):
+            result[f"{name}_s"] = self.seconds.get(name, 0.0)
+            result[f"{name}_calls"] = self.calls.get(name, 0)
+        return result
+
+    def table(self, total_seconds: float = None) -> str:
+        """
+        Human-readable per-phase breakdown.
+
+        Args:
+            total_seconds: Wall time of the whole run, used for the share
+                column (defaults to the sum over phases)
+        """
+        names = PHASES + tuple(n for n in self.seconds if n not in PHASES)
+        if total_seconds is None:
+            total_seconds = sum(self.seconds.values())
+        lines = [
+            f"{'phase':<16}{'calls':>10}{'total [s]':>12}"
+            f"{'mean [us]':>12}{'share':>8}"
+        ]
+        for name in names:
+            seconds = self.seconds.get(name, 0.0)
+            calls = self.calls.get(name, 0)
+            mean_us = seconds / calls * 1e6 if calls else 0.0
+            share = seconds / total_seconds if total_seconds else 0.0
+            lines.append(
+                f"{name:<16}{calls:>10}{seconds:>12.4f}"
+                f"{mean_us:>12.1f}{share:>8.1%}"
+            )
+        return "\n".join(lines)
+
+
+# プロセス内で共有するプロファイラ（既定では無効）
+PROFILER = PhaseProfiler()
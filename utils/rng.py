@@ -0,0 +1,102 @@
+# utils/rng.py
+
+from typing import Callable, Dict
+
+import numpy as np
+
+# 1 エピソード分の乱数ストリーム（用途ごとに独立）
+STREAMS = ("substrate", "vnrs", "arrivals", "durations", "embedder")
+
+
+def spawn_streams(
+    seed_seq: np.random.SeedSequence,
+) -> Dict[str, np.random.Generator]:
+    """
+    One independent Generator per entry of :data:`STREAMS`.
+
+    The streams are children spawned from ``seed_seq``, so every call
+    (e.g. every episode of an env) gets fresh, non-overlapping streams
+    and nothing is shared with other envs or the global ``np.random``.
+    """
+    children = seed_seq.spawn(len(STREAMS))
+    return {
+        name: np.random.default_rng(child)
+        for name, child in zip(STREAMS, children)
+    }
+
+
+class BlockSampler:
+    """
+    Scalar samples drawn from a Generator ``block_size`` at a time.
+
+    ``next(sampler)`` returns the next value of the current block (as a
+    Python scalar) and draws a new block with one vectorized call when
+    it runs out, so the per-call overhead of the Generator is paid once
+    per block instead of once per sample.
+
+    Args:
+        rng: Generator owned by this sampler
+        draw: ``draw(rng, n)`` returns ``n`` samples
+        block_size: Samples drawn per refill
+    """
+
+    def __init__(
+        self,
+        rng: np.random.Generator,
+        draw: Callable[[np.random.Generator, int], np.ndarray],
+        block_size: int = 4096,
+    ):
+        if block_size < 1:
+            raise ValueError("block_size must be >= 1")
+        self.rng = rng
+        self.draw = draw
+        self.block_size = block_size
+        self._block: list = []
+        self._pos = 0
+
+    def __iter__(self) -> "BlockSampler":
+        return self
+
+    def __next__(self):
+        if self._pos >= len(self._block):
+            self._block = self.draw(self.rng, self.block_size).tolist()
+            self._pos = 0
+        value = self._block[self._pos]
+        self._pos += 1
+        return value
+
+    def get_state(self) -> tuple:
+        """
+        Position in the current block and the Generator state.
+
+        The block is shared rather than copied (a refill replaces it).
+        """
+        return self._block, self._pos, self.rng.bit_generator.state
+
+    def set_state(self, state: tuple) -> None:
+        self._block, self._pos, rng_state = state
+        self.rng.bit_generator.state = rng_state
+
+
+def interarrival_sampler(
+    rng: np.random.Generator, arrival_rate: float, block_size: int = 4096
+) -> BlockSampler:
+    """
+    Exponential interarrival times of a Poisson process.
+    """
+    scale = 1.0 / arrival_rate
+    return BlockSampler(
+        rng, lambda g, n: g.exponential(scale, n), block_size
+    )
+
+
+def duration_sampler(
+    rng: np.random.Generator, duration_range, block_size: int = 4096
+) -> BlockSampler:
+    """
+    Integer lifetimes uniform on ``[low, high)`` (as ``randint``).
+    """
+    low, high = duration_range
+    return BlockSampler(
+        rng, lambda g, n: g.integers(low, high, n), block_size
+    )
@@ -0,0 +1,289 @@
+# utils/run_logger.py
+
+import csv
+import json
+import os
+from typing import Any, Dict, Optional, Tuple
+
+from utils.link_mapping import Route, link_flows
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow は任意依存（無ければ CSV に切り替え）
+    pa = None
+    pq = None
+
+LOG_LEVELS = ("steps", "aggregate")
+
+_COLUMNS = (
+    "step",
+    "reward",
+    "success",
+    "vnodes",
+    "snodes",
+    "vlinks",
+    "link_paths",
+    "link_bw",
+    "expires_at",
+)
+
+
+def _arrow_schema():
+    int_list = pa.list_(pa.int64())
+    return pa.schema(
+        [
+            ("step", pa.int64()),
+            ("reward", pa.float64()),
+            ("success", pa.bool_()),
+            ("vnodes", int_list),
+            ("snodes", int_list),
+            ("vlinks", pa.list_(int_list)),
+            ("link_paths", pa.list_(int_list)),
+            ("link_bw", pa.list_(pa.float64())),
+            ("expires_at", pa.float64()),
+        ]
+    )
+
+
+class RunLogger:
+    """
+    Incremental per-step logger for a single run.
+
+    Rows are buffered column-wise and flushed every ``chunk_size`` steps,
+    so memory stays bounded however long the run is. With pyarrow
+    installed each chunk becomes a Parquet row group; mappings are typed
+    list columns (``vnodes`` / ``snodes`` for the node mapping, ``vlinks``
+    / ``link_paths`` for the link mapping). A virtual link whose
+    bandwidth was split over several paths gets one ``vlinks`` /
+    ``link_paths`` entry per path, and ``link_bw`` gives the bandwidth
+    each entry carries (null for a path carrying the whole demand).
+    Without pyarrow, chunks are appended to a CSV file with the list
+    columns JSON-encoded.
+
+    With ``level="aggregate"`` no per-step rows are written at all and
+    only the totals tracked by the caller remain.
+
+    Periodic metric snapshots (:meth:`log_metrics`) go to
+    ``<path>_metrics.jsonl``, one JSON object per line, at either level.
+
+    A Parquet file is only readable once its writer is closed, so with
+    ``parts=True`` the log is written as ``<path>.part-00000.parquet``,
+    ``<path>.part-00001.parquet``, ... and :meth:`checkpoint` closes the
+    current part: every row logged before a checkpoint stays readable
+    even if the process is killed afterwards. :meth:`checkpoint` returns
+    where the written files end; a logger created with ``resume_from``
+    set to it continues the same files from that point (CSV / JSONL are
+    truncated, Parquet parts written after the checkpoint are removed),
+    so a resumed run neither loses nor repeats rows.
+
+    Args:
+        path: Output path without extension
+        level: ``"steps"`` or ``"aggregate"``
+        chunk_size: Rows buffered before each flush
+        fmt: ``"auto"``, ``"parquet"`` or ``"csv"``
+        parts: Write Parquet as part files closed at every checkpoint
+        resume_from: :meth:`checkpoint` of an earlier logger with the
+            same path and settings
+    """
+
+    def __init__(
+        self,
+        path: str,
+        level: str = "steps",
+        chunk_size: int = 1024,
+        fmt: str = "auto",
+        parts: bool = False,
+        resume_from: Optional[Dict[str, Any]] = None,
+    ):
+        if level not in LOG_LEVELS:
+            raise ValueError(f"Unknown logging level: {level}")
+        if fmt == "auto":
+            fmt = "parquet" if pa is not None else "csv"
+        if fmt == "parquet" and pa is None:
+            raise ImportError("Parquet logging requires pyarrow")
+
+        self.level = level
+        self.chunk_size = chunk_size
+        self.fmt = fmt
+        self.parts = parts and fmt == "parquet"
+        self.metrics_path = f"{path}_metrics.jsonl"
+        self.rows_written = 0
+        self._base = path
+        self._part = 0
+        self.path = None
+        if level == "steps":
+            self.path = self._part_path(0) if self.parts else f"{path}.{fmt}"
+
+        self._buffer: Dict[str, list] = {c: [] for c in _COLUMNS}
+        self._writer = None
+        self._file = None
+        self._csv = None
+        self._metrics_file = None
+        if resume_from is not None:
+            self._reopen(resume_from)
+
+    def log_step(
+        self,
+        step: int,
+        reward: float,
+        success: Optional[bool],
+        node_mapping: Optional[Dict[int, int]] = None,
+        link_paths: Optional[Dict[Tuple[int, int], Route]] = None,
+        expires_at: Optional[float] = None,
+    ) -> None:
+        if self.level != "steps":
+            return
+
+        node_mapping = node_mapping or {}
+        link_paths = link_paths or {}
+        buf = self._buffer
+        buf["step"].append(step)
+        buf["reward"].append(float(reward))
+        buf["success"].append(success)
+        buf["vnodes"].append([int(v) for v in node_mapping])
+        buf["snodes"].append([int(s) for s in node_mapping.values()])
+
+        vlinks, paths, bws = [], [], []
+        for (u, v), route in link_paths.items():
+            # 分割されていない経路の帯域は要求そのもの（None で表す）
+            for path, bw in link_flows(route, None):
+                vlinks.append([int(u), int(v)])
+                paths.append([int(n) for n in path])
+                bws.append(bw)
+        buf["vlinks"].append(vlinks)
+        buf["link_paths"].append(paths)
+        buf["link_bw"].append(bws)
+        buf["expires_at"].append(
+            None if expires_at is None else float(expires_at)
+        )
+
+        if len(buf["step"]) >= self.chunk_size:
+            self.flush()
+
+    def log_metrics(self, snapshot: Dict[str, Any]) -> None:
+        if self._metrics_file is None:
+            self._metrics_file = open(self.metrics_path, "w")
+        self._metrics_file.write(json.dumps(snapshot) + "\n")
+        self._metrics_file.flush()
+
+    def flush(self) -> None:
+        count = len(self._buffer["step"])
+        if count == 0:
+            return
+
+        if self.fmt == "parquet":
+            self._flush_parquet()
+        else:
+            self._flush_csv()
+
+        self.rows_written += count
+        for column in self._buffer.values():
+            column.clear()
+
+    def checkpoint(self) -> Dict[str, int]:
+        """
+        Flush, close the current Parquet part, and return where the
+        written files end (for ``resume_from``).
+        """
+        self.flush()
+        if self.parts and self._writer is not None:
+            self._writer.close()
+            self._writer = None
+            self._part += 1
+            self.path = self._part_path(self._part)
+        return {
+            "rows": self.rows_written,
+            "parts": self._part,
+            "log_bytes": self._file.tell() if self._file is not None else 0,
+            "metrics_bytes": (
+                self._metrics_file.tell()
+                if self._metrics_file is not None
+                else 0
+            ),
+        }
+
+    def close(self) -> None:
+        self.flush()
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self._metrics_file is not None:
+            self._metrics_file.close()
+            self._metrics_file = None
+
+    def __enter__(self) -> "RunLogger":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    def _reopen(self, state: Dict[str, Any]) -> None:
+        # 保存時点より後に書かれた行を捨て、続きから追記できるようにする
+        if state["metrics_bytes"]:
+            self._metrics_file = open(self.metrics_path, "r+")
+            self._metrics_file.truncate(state["metrics_bytes"])
+            self._metrics_file.seek(0, os.SEEK_END)
+        elif os.path.exists(self.metrics_path):
+            os.remove(self.metrics_path)
+        if self.path is None:
+            return
+
+        if self.fmt == "csv":
+            if not state["rows"]:
+                if os.path.exists(self.path):
+                    os.remove(self.path)
+                return
+            self.rows_written = state["rows"]
+            self._file = open(self.path, "r+", newline="")
+            self._file.truncate(state["log_bytes"])
+            self._file.seek(0, os.SEEK_END)
+            self._csv = csv.writer(self._file)
+            return
+
+        if not self.parts:
+            raise ValueError("Resuming a Parquet log requires parts=True")
+        # 保存時点より後に書かれたパート（閉じていない可能性あり）を消す
+        self._part = state["parts"]
+        self.rows_written = state["rows"]
+        self.path = self._part_path(self._part)
+        part = self._part
+        while os.path.exists(self._part_path(part)):
+            os.remove(self._part_path(part))
+            part += 1
+
+    def _part_path(self, part: int) -> str:
+        return f"{self._base}.part-{part:05d}.parquet"
+
+    def _flush_parquet(self) -> None:
+        schema = _arrow_schema()
+        if self._writer is None:
+            self._writer = pq.ParquetWriter(self.path, schema)
+        table = pa.Table.from_pydict(self._buffer, schema=schema)
+        self._writer.write_table(table)
+
+    def _flush_csv(self) -> None:
+        if self._file is None:
+            self._file = open(self.path, "w", newline="")
+            self._csv = csv.writer(self._file)
+            self._csv.writerow(_COLUMNS)
+
+        buf = self._buffer
+        for i in range(len(buf["step"])):
+            self._csv.writerow(
+                [
+                    buf["step"][i],
+                    buf["reward"][i],
+                    "" if buf["success"][i] is None else buf["success"][i],
+                    json.dumps(buf["vnodes"][i]),
+                    json.dumps(buf["snodes"][i]),
+                    json.dumps(buf["vlinks"][i]),
+                    json.dumps(buf["link_paths"][i]),
+                    json.dumps(buf["link_bw"][i]),
+                    "" if buf["expires_at"][i] is None else buf["expires_at"][i],
+                ]
+            )
+        self._file.flush()
@@ -3,19 +3,26 @@
 import networkx as nx
 import numpy as np
 
+from utils.topology import generate_substrate_state
 
-def generate_substrate_network(config: dict) -> nx.Graph:
-    num_nodes = config["num_nodes"]
-    edge_prob = config["edge_prob"]
-    cpu_range = tuple(config["cpu_range"])
-    bandwidth_range = tuple(config["bandwidth_range"])
 
-    G = nx.erdos_renyi_graph(n=num_nodes, p=edge_prob, seed=42)
+def generate_substrate_network(config: dict, rng=None) -> nx.Graph:
+    """
+    Generate a substrate network as an nx.Graph.
 
-    for node in G.nodes:
-        G.nodes[node]["cpu"] = np.random.randint(*cpu_range)
+    Thin wrapper over :mod:`utils.topology` for callers that want a
+    graph; the envs use ``generate_substrate_state`` directly.
 
-    for u, v in G.edges:
-        G.edges[u, v]["bandwidth"] = np.random.randint(*bandwidth_range)
+    Args:
+        config: The ``substrate`` config section
+        rng: np.random.Generator, or a legacy np.random.RandomState /
+            the global np.random (a Generator is seeded from one draw)
 
-    return G
+    Returns:
+        The substrate with ``cpu`` / ``bandwidth`` attributes
+    """
+    if not isinstance(rng, np.random.Generator):
+        legacy = np.random if rng is None else rng
+        rng = np.random.default_rng(legacy.randint(2**31))
+
+    return generate_substrate_state(config, rng).to_graph()
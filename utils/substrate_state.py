@@ -0,0 +1,248 @@
+# utils/substrate_state.py
+
+from typing import Dict, List, Tuple
+
+import networkx as nx
+import numpy as np
+
+from utils.capacity_index import CapacityIndex
+
+
+class SubstrateState:
+    """
+    Array-backed residual state of a substrate network.
+
+    Node CPU and link bandwidth are stored as flat NumPy arrays. The
+    topology is kept as a CSR adjacency (``indptr`` / ``indices``) where
+    ``adj_edge_ids`` gives the edge id of every adjacency slot, so a node's
+    neighbours and incident edges are contiguous slices. Node ids are
+    ``0 .. num_nodes - 1`` and edge ids are ``0 .. num_edges - 1``.
+    """
+
+    def __init__(
+        self,
+        num_nodes: int,
+        edge_src: np.ndarray,
+        edge_dst: np.ndarray,
+        cpu: np.ndarray,
+        bandwidth: np.ndarray,
+    ):
+        self.num_nodes = int(num_nodes)
+        self.edge_src = np.asarray(edge_src, dtype=np.int64)
+        self.edge_dst = np.asarray(edge_dst, dtype=np.int64)
+        self.num_edges = len(self.edge_src)
+
+        self.cpu = np.asarray(cpu, dtype=np.float64).copy()
+        self.bandwidth = np.asarray(bandwidth, dtype=np.float64).copy()
+        # 初期容量（利用率の計算用）
+        self.cpu_capacity = self.cpu.copy()
+        self.bandwidth_capacity = self.bandwidth.copy()
+
+        self._build_csr()
+
+        # allocate / release のたびに増える版数
+        self.version = 0
+        self.path_cache = None
+        # k → KPathTable（utils.k_paths.k_path_table が作成）
+        self.k_path_tables = {}
+        self._listeners = []
+        self._cpu_index: CapacityIndex = None
+
+    @classmethod
+    def from_graph(cls, graph: nx.Graph) -> "SubstrateState":
+        """
+        Build a state from an nx.Graph with ``cpu`` / ``bandwidth`` attributes.
+
+        Nodes must be labelled ``0 .. n - 1``.
+        """
+        num_nodes = graph.number_of_nodes()
+        cpu = np.array(
+            [graph.nodes[n]["cpu"] for n in range(num_nodes)], dtype=np.float64
+        )
+        edges = list(graph.edges(data="bandwidth"))
+        edge_src = np.array([u for u, _, _ in edges], dtype=np.int64)
+        edge_dst = np.array([v for _, v, _ in edges], dtype=np.int64)
+        bandwidth = np.array([bw for _, _, bw in edges], dtype=np.float64)
+        return cls(num_nodes, edge_src, edge_dst, cpu, bandwidth)
+
+    def _build_csr(self) -> None:
+        # 無向グラフなので両方向のスロットを持つ
+        eids = np.arange(self.num_edges, dtype=np.int64)
+        heads = np.concatenate([self.edge_src, self.edge_dst])
+        tails = np.concatenate([self.edge_dst, self.edge_src])
+        slot_eids = np.concatenate([eids, eids])
+
+        order = np.lexsort((tails, heads))
+        self.indices = tails[order]
+        self.adj_edge_ids = slot_eids[order]
+        counts = np.bincount(heads, minlength=self.num_nodes)
+        self.indptr = np.zeros(self.num_nodes + 1, dtype=np.int64)
+        np.cumsum(counts, out=self.indptr[1:])
+
+        self.edge_index: Dict[Tuple[int, int], int] = {}
+        for eid, (u, v) in enumerate(
+            zip(self.edge_src.tolist(), self.edge_dst.tolist())
+        ):
+            self.edge_index[(u, v)] = eid
+            self.edge_index[(v, u)] = eid
+
+    # ------------------------------------------------------------------
+    # Topology queries
+    # ------------------------------------------------------------------
+    def neighbors(self, node: int) -> np.ndarray:
+        return self.indices[self.indptr[node]:self.indptr[node + 1]]
+
+    def incident_edges(self, node: int) -> np.ndarray:
+        return self.adj_edge_ids[self.indptr[node]:self.indptr[node + 1]]
+
+    def has_edge(self, u: int, v: int) -> bool:
+        return (u, v) in self.edge_index
+
+    def edge_id(self, u: int, v: int) -> int:
+        return self.edge_index[(u, v)]
+
+    def path_edge_ids(self, path: List[int]) -> np.ndarray:
+        """
+        Convert a node path ``[n0, n1, ..., nk]`` into its edge id array.
+        """
+        index = self.edge_index
+        return np.fromiter(
+            (index[(path[i], path[i + 1])] for i in range(len(path) - 1)),
+            dtype=np.int64,
+            count=max(len(path) - 1, 0),
+        )
+
+    @property
+    def cpu_index(self) -> CapacityIndex:
+        """
+        Max-CPU index over the nodes, created on first use and kept up to
+        date by allocate / release.
+        """
+        if self._cpu_index is None:
+            self._cpu_index = CapacityIndex(self, "cpu")
+        return self._cpu_index
+
+    # ------------------------------------------------------------------
+    # Change notification
+    # ------------------------------------------------------------------
+    def add_listener(self, listener) -> None:
+        """
+        Register an object to be told about residual changes.
+
+        Listeners implement ``on_substrate_update(node_ids, old_cpu,
+        edge_ids, old_bandwidth)``, called after every allocate / release
+        with the unique touched ids and their previous values, and
+        ``on_substrate_reset()``, called by :meth:`mark_modified`.
+        """
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener) -> None:
+        self._listeners.remove(listener)
+
+    def mark_modified(self) -> None:
+        """
+        Signal that ``cpu`` / ``bandwidth`` were written directly.
+        """
+        self.version += 1
+        for listener in self._listeners:
+            listener.on_substrate_reset()
+
+    def _update(
+        self,
+        ufunc: np.ufunc,
+        node_ids: np.ndarray,
+        cpu: np.ndarray,
+        edge_ids: np.ndarray,
+        bandwidth: np.ndarray,
+    ) -> None:
+        if self._listeners:
+            touched_nodes = np.unique(node_ids)
+            touched_edges = np.unique(edge_ids)
+            old_cpu = self.cpu[touched_nodes]
+            old_bandwidth = self.bandwidth[touched_edges]
+
+        # 同じエッジを複数の仮想リンクが通る場合があるので ufunc.at を使う
+        ufunc.at(self.cpu, node_ids, cpu)
+        ufunc.at(self.bandwidth, edge_ids, bandwidth)
+        self.version += 1
+
+        for listener in self._listeners:
+            listener.on_substrate_update(
+                touched_nodes, old_cpu, touched_edges, old_bandwidth
+            )
+
+    # ------------------------------------------------------------------
+    # Resource updates
+    # ------------------------------------------------------------------
+    def allocate(
+        self,
+        node_ids: np.ndarray,
+        cpu: np.ndarray,
+        edge_ids: np.ndarray,
+        bandwidth: np.ndarray,
+    ) -> None:
+        """
+        Subtract CPU / bandwidth demands in one vectorized pass.
+
+        Args:
+            node_ids: Substrate node ids receiving CPU demands
+            cpu: CPU amount per entry of ``node_ids``
+            edge_ids: Substrate edge ids on the mapped paths
+            bandwidth: Bandwidth amount per entry of ``edge_ids``
+        """
+        self._update(np.subtract, node_ids, cpu, edge_ids, bandwidth)
+
+    def release(
+        self,
+        node_ids: np.ndarray,
+        cpu: np.ndarray,
+        edge_ids: np.ndarray,
+        bandwidth: np.ndarray,
+    ) -> None:
+        """
+        Give back resources previously taken by :meth:`allocate`.
+        """
+        self._update(np.add, node_ids, cpu, edge_ids, bandwidth)
+
+    def assign(self, cpu: np.ndarray, bandwidth: np.ndarray) -> None:
+        """
+        Overwrite the residuals in place, e.g. to restore a snapshot.
+
+        Only the entries that differ are written and reported to the
+        listeners, so going back a few allocations stays cheap.
+
+        Args:
+            cpu: Residual CPU for every node
+            bandwidth: Residual bandwidth for every edge
+        """
+        node_ids = np.flatnonzero(self.cpu != cpu)
+        edge_ids = np.flatnonzero(self.bandwidth != bandwidth)
+        old_cpu = self.cpu[node_ids]
+        old_bandwidth = self.bandwidth[edge_ids]
+
+        self.cpu[node_ids] = cpu[node_ids]
+        self.bandwidth[edge_ids] = bandwidth[edge_ids]
+        self.version += 1
+
+        for listener in self._listeners:
+            listener.on_substrate_update(
+                node_ids, old_cpu, edge_ids, old_bandwidth
+            )
+
+    # ------------------------------------------------------------------
+    # Conversion
+    # ------------------------------------------------------------------
+    def to_graph(self) -> nx.Graph:
+        """
+        Export the current residual state as an nx.Graph.
+        """
+        G = nx.Graph()
+        for n in range(self.num_nodes):
+            G.add_node(n, cpu=self.cpu[n].item())
+        for eid in range(self.num_edges):
+            G.add_edge(
+                int(self.edge_src[eid]),
+                int(self.edge_dst[eid]),
+                bandwidth=self.bandwidth[eid].item(),
+            )
+        return G
@@ -0,0 +1,91 @@
+# utils/sweep.py
+
+import copy
+import glob
+import hashlib
+import itertools
+import json
+import os
+from typing import Any, Dict, List
+
+
+def expand_grid(grid: Dict[str, List[Any]]) -> List[Dict[str, Any]]:
+    """
+    Cartesian product of a sweep grid.
+
+    Args:
+        grid: Dotted config path (e.g. ``"experiment.arrival_rate"``) →
+            list of values
+
+    Returns:
+        One ``{path: value}`` dict per cell, in grid order
+    """
+    keys = list(grid)
+    return [
+        dict(zip(keys, values))
+        for values in itertools.product(*(grid[k] for k in keys))
+    ]
+
+
+def resolve_cell(
+    base: Dict[str, Any], overrides: Dict[str, Any]
+) -> Dict[str, Any]:
+    """
+    Copy of ``base`` with every dotted-path override applied.
+    """
+    config = copy.deepcopy(base)
+    for path, value in overrides.items():
+        *parents, leaf = path.split(".")
+        section = config
+        for key in parents:
+            section = section.setdefault(key, {})
+        section[leaf] = value
+    return config
+
+
+def config_hash(config: Dict[str, Any]) -> str:
+    """
+    Stable short hash of a fully resolved config (key order ignored).
+    """
+    text = json.dumps(config, sort_keys=True, default=str)
+    return hashlib.sha256(text.encode()).hexdigest()[:16]
+
+
+def cell_dir(out_dir: str, config: Dict[str, Any]) -> str:
+    return os.path.join(out_dir, config_hash(config))
+
+
+def prepare_cell(path: str, config: Dict[str, Any]) -> None:
+    """
+    Create a cell directory and record the config it was run with.
+    """
+    os.makedirs(os.path.join(path, "runs"), exist_ok=True)
+    config_path = os.path.join(path, "config.json")
+    if not os.path.exists(config_path):
+        write_json(config_path, config)
+
+
+def load_cell_runs(path: str) -> Dict[int, Dict[str, Any]]:
+    """
+    Results of the runs already completed in a cell, keyed by run id.
+    """
+    runs = {}
+    for run_path in glob.glob(os.path.join(path, "runs", "run_*.json")):
+        with open(run_path) as f:
+            result = json.load(f)
+        runs[result["run_id"]] = result
+    return runs
+
+
+def save_cell_run(path: str, result: Dict[str, Any]) -> None:
+    write_json(
+        os.path.join(path, "runs", f"run_{result['run_id']}.json"), result
+    )
+
+
+def write_json(path: str, data: Any) -> None:
+    # 一時ファイルに書いてから置き換え、中断しても壊れたファイルを残さない
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f, indent=2, default=str)
+    os.replace(tmp_path, path)
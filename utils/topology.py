@@ -0,0 +1,322 @@
+# utils/topology.py
+
+import math
+from typing import Any, Dict, Tuple
+
+import numpy as np
+
+from utils.substrate_state import SubstrateState
+from utils.topology_io import fill_capacities, load_config_topology
+
+Edges = Tuple[int, np.ndarray, np.ndarray]
+
+TOPOLOGIES = ("erdos_renyi", "waxman", "barabasi_albert", "fat_tree", "grid")
+
+
+def topology_num_nodes(config: Dict[str, Any]) -> int:
+    """
+    Number of substrate nodes a ``substrate`` config section produces.
+
+    Equal to ``num_nodes`` except for fat-tree and grid, whose size
+    follows from their shape parameters, and file topologies.
+    """
+    if config.get("source") == "file":
+        return load_config_topology(config)[0]
+    topology = config.get("topology", "erdos_renyi")
+    if topology == "fat_tree":
+        k = config["fat_tree_k"]
+        switches = 5 * k * k // 4
+        hosts = k**3 // 4 if config.get("fat_tree_hosts", True) else 0
+        return switches + hosts
+    if topology == "grid":
+        return config["grid_rows"] * config["grid_cols"]
+    return config["num_nodes"]
+
+
+def topology_max_edges(config: Dict[str, Any]) -> int:
+    """
+    Upper bound on the edge count of a ``substrate`` config section.
+
+    Exact for files and the deterministic families (and
+    Barabási–Albert). For Erdős–Rényi / Waxman every pair is an edge
+    with probability at most ``p`` (``edge_prob`` or ``avg_degree / (n -
+    1)``; ``waxman_beta``), so the count is bounded by
+    :func:`_binomial_bound` of the ``n(n-1)/2`` pairs instead of the
+    pair count itself, which would grow as ``n^2`` for sparse graphs.
+    """
+    if config.get("source") == "file":
+        return len(load_config_topology(config)[1])
+    topology = config.get("topology", "erdos_renyi")
+    if topology == "fat_tree":
+        half = config["fat_tree_k"] // 2
+        per_layer = 2 * half**3
+        return per_layer * (3 if config.get("fat_tree_hosts", True) else 2)
+    if topology == "grid":
+        rows, cols = config["grid_rows"], config["grid_cols"]
+        return rows * (cols - 1) + cols * (rows - 1)
+    if topology == "barabasi_albert":
+        m = config.get("ba_m", 2)
+        return (config["num_nodes"] - m) * m
+    n = topology_num_nodes(config)
+    pairs = n * (n - 1) // 2
+    if topology == "waxman":
+        return _binomial_bound(pairs, config.get("waxman_beta", 0.4))
+    if "avg_degree" in config:
+        return _binomial_bound(pairs, config["avg_degree"] / max(n - 1, 1))
+    return _binomial_bound(pairs, config["edge_prob"])
+
+
+def _binomial_bound(trials: int, p: float, sigmas: float = 6.0) -> int:
+    """
+    Mean plus ``sigmas`` standard deviations of Binomial(trials, p),
+    capped at ``trials``; exceeded with negligible probability.
+    """
+    p = min(max(p, 0.0), 1.0)
+    mean = trials * p
+    bound = math.ceil(mean + sigmas * math.sqrt(mean * (1.0 - p)))
+    return min(trials, bound)
+
+
+def generate_substrate_state(
+    config: Dict[str, Any], rng: np.random.Generator
+) -> SubstrateState:
+    """
+    Generate a substrate straight into array form.
+
+    The topology family is chosen by ``topology`` (default
+    ``erdos_renyi``); CPU and bandwidth are drawn for all nodes / edges
+    at once from ``cpu_range`` / ``bandwidth_range``. Everything comes
+    from ``rng``, so the same seed gives the same substrate.
+
+    With ``source: file`` the topology is read from ``path`` instead
+    (see :mod:`utils.topology_io`) and only capacities the file does
+    not give are drawn.
+
+    Args:
+        config: The ``substrate`` config section
+        rng: Random generator
+
+    Returns:
+        SubstrateState with capacities equal to the drawn attributes
+    """
+    if config.get("source") == "file":
+        arrays = load_config_topology(config)
+        num_nodes, edge_src, edge_dst = arrays[:3]
+        cpu, bandwidth = fill_capacities(arrays, config, rng)
+    else:
+        num_nodes, edge_src, edge_dst = generate_edges(config, rng)
+        cpu = rng.integers(*config["cpu_range"], size=num_nodes)
+        bandwidth = rng.integers(
+            *config["bandwidth_range"], size=len(edge_src)
+        )
+    return SubstrateState(num_nodes, edge_src, edge_dst, cpu, bandwidth)
+
+
+def generate_edges(config: Dict[str, Any], rng: np.random.Generator) -> Edges:
+    """
+    Draw the edge list of the configured topology.
+
+    Returns:
+        num_nodes, edge_src, edge_dst (``edge_src < edge_dst``, no
+        duplicates)
+    """
+    topology = config.get("topology", "erdos_renyi")
+    if topology == "erdos_renyi":
+        n = config["num_nodes"]
+        if "avg_degree" in config:
+            p = config["avg_degree"] / max(n - 1, 1)
+        else:
+            p = config["edge_prob"]
+        return erdos_renyi_edges(n, p, rng)
+    if topology == "waxman":
+        return waxman_edges(
+            config["num_nodes"],
+            config.get("waxman_alpha", 0.1),
+            config.get("waxman_beta", 0.4),
+            rng,
+        )
+    if topology == "barabasi_albert":
+        return barabasi_albert_edges(
+            config["num_nodes"], config.get("ba_m", 2), rng
+        )
+    if topology == "fat_tree":
+        return fat_tree_edges(
+            config["fat_tree_k"], config.get("fat_tree_hosts", True)
+        )
+    if topology == "grid":
+        return grid_edges(config["grid_rows"], config["grid_cols"])
+    raise ValueError(f"Unknown topology: {topology}")
+
+
+# ----------------------------------------------------------------------
+# Topology families
+# ----------------------------------------------------------------------
+def erdos_renyi_edges(
+    n: int, p: float, rng: np.random.Generator
+) -> Edges:
+    """
+    G(n, p) in O(n + m).
+
+    The edge count is drawn from Binomial(n(n-1)/2, p) and that many
+    distinct pair indices are sampled and decoded into ``(u, v)``, so
+    the cost never depends on the number of absent pairs.
+    """
+    num_pairs = n * (n - 1) // 2
+    if num_pairs == 0 or p <= 0:
+        return n, np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    m = rng.binomial(num_pairs, min(p, 1.0))
+    pairs = np.sort(rng.choice(num_pairs, size=m, replace=False))
+    src, dst = _decode_pairs(n, pairs)
+    return n, src, dst
+
+
+def waxman_edges(
+    n: int, alpha: float, beta: float, rng: np.random.Generator
+) -> Edges:
+    """
+    Waxman graph on uniform points in the unit square.
+
+    Each pair is linked with probability ``beta * exp(-d / (alpha * L))``
+    where ``L`` is the largest distance. Pairs are evaluated in row
+    blocks, so memory stays O(n * block) although time is O(n^2).
+    """
+    pos = rng.random((n, 2))
+    span = np.ptp(pos, axis=0)
+    max_dist = float(np.hypot(*span)) or 1.0
+
+    src_parts, dst_parts = [], []
+    block = max(1, 2**22 // max(n, 1))
+    for start in range(0, n - 1, block):
+        rows = np.arange(start, min(start + block, n - 1))
+        # 行 i について列 j > i のみを見る
+        diff = pos[rows, None, :] - pos[None, :, :]
+        dist = np.hypot(diff[..., 0], diff[..., 1])
+        prob = beta * np.exp(-dist / (alpha * max_dist))
+        upper = np.arange(n)[None, :] > rows[:, None]
+        hit = (rng.random(prob.shape) < prob) & upper
+        i, j = np.nonzero(hit)
+        src_parts.append(rows[i])
+        dst_parts.append(j)
+
+    if not src_parts:
+        return n, np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    return (
+        n,
+        np.concatenate(src_parts).astype(np.int64),
+        np.concatenate(dst_parts).astype(np.int64),
+    )
+
+
+def barabasi_albert_edges(
+    n: int, m: int, rng: np.random.Generator
+) -> Edges:
+    """
+    Barabási–Albert preferential attachment in O(n * m).
+
+    Starts from ``m`` isolated nodes like ``nx.barabasi_albert_graph``;
+    each new node attaches to ``m`` distinct earlier nodes chosen with
+    probability proportional to their degree (by sampling the list of
+    edge endpoints).
+    """
+    if m < 1 or m >= n:
+        raise ValueError("barabasi_albert needs 1 <= ba_m < num_nodes")
+
+    num_edges = (n - m) * m
+    src = np.empty(num_edges, dtype=np.int64)
+    dst = np.empty(num_edges, dtype=np.int64)
+    # 次数に比例して選ぶための端点リスト（辺を張るたびに両端を追加）
+    endpoints = np.empty(2 * num_edges, dtype=np.int64)
+    filled = 0
+
+    targets = np.arange(m)
+    for k, node in enumerate(range(m, n)):
+        src[k * m:(k + 1) * m] = targets
+        dst[k * m:(k + 1) * m] = node
+        endpoints[filled:filled + m] = targets
+        endpoints[filled + m:filled + 2 * m] = node
+        filled += 2 * m
+
+        chosen = set()
+        while len(chosen) < m:
+            draws = endpoints[rng.integers(filled, size=2 * m)]
+            for target in draws.tolist():
+                chosen.add(target)
+                if len(chosen) == m:
+                    break
+        targets = np.fromiter(chosen, dtype=np.int64, count=m)
+
+    lo = np.minimum(src, dst)
+    hi = np.maximum(src, dst)
+    return n, lo, hi
+
+
+def fat_tree_edges(k: int, hosts: bool = True) -> Edges:
+    """
+    k-ary fat-tree (k even).
+
+    Node ids: ``(k/2)^2`` core switches, then per pod ``k/2``
+    aggregation and ``k/2`` edge switches, then (optionally) ``k/2``
+    hosts per edge switch.
+    """
+    if k % 2:
+        raise ValueError("fat_tree_k must be even")
+    half = k // 2
+    num_core = half * half
+    agg = num_core + np.arange(k)[:, None] * k + np.arange(half)[None, :]
+    edge = agg + half
+
+    # コアスイッチ c は全ポッドの集約スイッチ c // half に接続
+    core = np.arange(num_core)
+    edges_src = [np.repeat(core, k)]
+    edges_dst = [agg[:, core // half].T.ravel()]
+    # ポッド内は集約スイッチとエッジスイッチの完全二部グラフ
+    edges_src.append(np.repeat(agg, half, axis=1).ravel())
+    edges_dst.append(np.tile(edge, (1, half)).ravel())
+
+    num_switches = num_core + k * k
+    num_nodes = num_switches
+    if hosts:
+        host_ids = num_switches + np.arange(k * half * half)
+        edges_src.append(np.repeat(edge.ravel(), half))
+        edges_dst.append(host_ids)
+        num_nodes += len(host_ids)
+
+    return (
+        num_nodes,
+        np.concatenate(edges_src).astype(np.int64),
+        np.concatenate(edges_dst).astype(np.int64),
+    )
+
+
+def grid_edges(rows: int, cols: int) -> Edges:
+    """
+    ``rows x cols`` 2D lattice; node ``r * cols + c``.
+    """
+    ids = np.arange(rows * cols).reshape(rows, cols)
+    src = np.concatenate([ids[:, :-1].ravel(), ids[:-1, :].ravel()])
+    dst = np.concatenate([ids[:, 1:].ravel(), ids[1:, :].ravel()])
+    return rows * cols, src.astype(np.int64), dst.astype(np.int64)
+
+
+def _decode_pairs(
+    n: int, pairs: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Map row-major indices of the strict upper triangle to ``(u, v)``.
+    """
+    pairs = pairs.astype(np.int64)
+    # 行 u の先頭インデックスは u*n - u(u+1)/2（浮動小数で求めてから補正）
+    u = np.floor(
+        (2 * n - 1 - np.sqrt((2 * n - 1) ** 2 - 8.0 * pairs)) / 2
+    ).astype(np.int64)
+    u = np.clip(u, 0, n - 2)
+    row_start = u * n - u * (u + 1) // 2
+    too_far = row_start > pairs
+    u[too_far] -= 1
+    row_start = u * n - u * (u + 1) // 2
+    next_start = (u + 1) * n - (u + 1) * (u + 2) // 2
+    too_short = pairs >= next_start
+    u[too_short] += 1
+    row_start = u * n - u * (u + 1) // 2
+    v = pairs - row_start + u + 1
+    return u, v
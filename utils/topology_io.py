@@ -0,0 +1,250 @@
+# utils/topology_io.py
+
+import functools
+import hashlib
+import os
+from typing import Any, Dict, Optional, Tuple
+
+import networkx as nx
+import numpy as np
+
+# (num_nodes, edge_src, edge_dst, cpu, bandwidth)。欠けている容量は NaN
+TopologyArrays = Tuple[int, np.ndarray, np.ndarray, np.ndarray, np.ndarray]
+
+FORMATS = ("graphml", "edgelist", "npz")
+DEFAULT_CACHE_DIR = "cache/topology"
+
+
+def detect_format(path: str) -> str:
+    ext = os.path.splitext(path)[1].lower()
+    if ext in (".graphml", ".xml"):
+        return "graphml"
+    if ext == ".npz":
+        return "npz"
+    return "edgelist"
+
+
+def file_hash(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_topology(
+    path: str,
+    fmt: Optional[str] = None,
+    cpu_attr: str = "cpu",
+    bandwidth_attr: str = "bandwidth",
+    cache_dir: Optional[str] = DEFAULT_CACHE_DIR,
+) -> TopologyArrays:
+    """
+    Read a topology file into flat arrays, going through an npz cache.
+
+    GraphML and edge-list files are parsed once; the result is saved as
+    ``<cache_dir>/<name>_<sha256>.npz`` and later calls (in any process)
+    load that instead, as long as the file content is unchanged. Nodes
+    are relabelled ``0 .. n - 1`` in file order, self-loops and
+    parallel edges are dropped.
+
+    Args:
+        path: GraphML, edge list (``u v [bandwidth]`` per line) or npz
+        fmt: One of FORMATS (guessed from the extension if None)
+        cpu_attr: Node attribute holding CPU capacity
+        bandwidth_attr: Edge attribute holding bandwidth capacity
+        cache_dir: Where parsed arrays are cached (None disables it)
+
+    Returns:
+        num_nodes, edge_src, edge_dst, cpu, bandwidth, with NaN where
+        the file gives no capacity
+    """
+    fmt = fmt or detect_format(path)
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown topology format: {fmt}")
+    if fmt == "npz":
+        return _read_npz(path)
+
+    cache_path = None
+    if cache_dir is not None:
+        # 属性名が変わると中身も変わるのでキーに含める
+        key = f"{file_hash(path)}:{fmt}:{cpu_attr}:{bandwidth_attr}"
+        digest = hashlib.sha256(key.encode()).hexdigest()[:16]
+        name = os.path.splitext(os.path.basename(path))[0]
+        cache_path = os.path.join(cache_dir, f"{name}_{digest}.npz")
+        if os.path.exists(cache_path):
+            return _read_npz(cache_path)
+
+    if fmt == "graphml":
+        arrays = _parse_graphml(path, cpu_attr, bandwidth_attr)
+    else:
+        arrays = _parse_edgelist(path)
+
+    if cache_path is not None:
+        save_topology(cache_path, *arrays)
+    return arrays
+
+
+def save_topology(
+    path: str,
+    num_nodes: int,
+    edge_src: np.ndarray,
+    edge_dst: np.ndarray,
+    cpu: np.ndarray,
+    bandwidth: np.ndarray,
+) -> None:
+    """
+    Write topology arrays as an npz readable by :func:`load_topology`.
+
+    The file is written under a temporary name and renamed, so parallel
+    runs never see a half-written cache entry.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp.npz"
+    np.savez(
+        tmp_path,
+        num_nodes=np.int64(num_nodes),
+        edge_src=edge_src,
+        edge_dst=edge_dst,
+        cpu=cpu,
+        bandwidth=bandwidth,
+    )
+    os.replace(tmp_path, path)
+
+
+def fill_capacities(
+    arrays: TopologyArrays, config: Dict[str, Any], rng: np.random.Generator
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    CPU / bandwidth capacities with the missing (NaN) entries drawn from
+    ``cpu_range`` / ``bandwidth_range``.
+    """
+    _, _, _, cpu, bandwidth = arrays
+    cpu = cpu.copy()
+    bandwidth = bandwidth.copy()
+    for values, key in ((cpu, "cpu_range"), (bandwidth, "bandwidth_range")):
+        missing = np.isnan(values)
+        if missing.any():
+            values[missing] = rng.integers(*config[key], size=missing.sum())
+    return cpu, bandwidth
+
+
+@functools.lru_cache(maxsize=8)
+def _load_cached(
+    path: str,
+    fmt: Optional[str],
+    cpu_attr: str,
+    bandwidth_attr: str,
+    cache_dir: Optional[str],
+    mtime: float,
+) -> TopologyArrays:
+    arrays = load_topology(path, fmt, cpu_attr, bandwidth_attr, cache_dir)
+    for a in arrays[1:]:
+        a.flags.writeable = False
+    return arrays
+
+
+def load_config_topology(config: Dict[str, Any]) -> TopologyArrays:
+    """
+    :func:`load_topology` for a ``substrate`` section with
+    ``source: file``, memoized within the process (the arrays returned
+    are read-only).
+    """
+    path = config["path"]
+    return _load_cached(
+        path,
+        config.get("format"),
+        config.get("cpu_attr", "cpu"),
+        config.get("bandwidth_attr", "bandwidth"),
+        config.get("cache_dir", DEFAULT_CACHE_DIR),
+        os.path.getmtime(path),
+    )
+
+
+# ----------------------------------------------------------------------
+# Parsers
+# ----------------------------------------------------------------------
+def _read_npz(path: str) -> TopologyArrays:
+    with np.load(path) as data:
+        num_nodes = int(data["num_nodes"])
+        m = len(data["edge_src"])
+        return (
+            num_nodes,
+            data["edge_src"].astype(np.int64),
+            data["edge_dst"].astype(np.int64),
+            _optional(data, "cpu", num_nodes),
+            _optional(data, "bandwidth", m),
+        )
+
+
+def _optional(data, name: str, size: int) -> np.ndarray:
+    if name in data.files:
+        return data[name].astype(np.float64)
+    return np.full(size, np.nan)
+
+
+def _parse_graphml(
+    path: str, cpu_attr: str, bandwidth_attr: str
+) -> TopologyArrays:
+    G = nx.read_graphml(path)
+    index = {node: i for i, node in enumerate(G.nodes)}
+    cpu = np.array(
+        [_number(G.nodes[node].get(cpu_attr)) for node in G.nodes],
+        dtype=np.float64,
+    )
+
+    src, dst, bandwidth = [], [], []
+    seen = set()
+    for u, v, data in G.edges(data=True):
+        a, b = sorted((index[u], index[v]))
+        if a == b or (a, b) in seen:
+            continue
+        seen.add((a, b))
+        src.append(a)
+        dst.append(b)
+        bandwidth.append(_number(data.get(bandwidth_attr)))
+
+    return (
+        len(index),
+        np.array(src, dtype=np.int64),
+        np.array(dst, dtype=np.int64),
+        cpu,
+        np.array(bandwidth, dtype=np.float64),
+    )
+
+
+def _parse_edgelist(path: str) -> TopologyArrays:
+    index: Dict[str, int] = {}
+    src, dst, bandwidth = [], [], []
+    seen = set()
+    with open(path) as f:
+        for line in f:
+            fields = line.split("#", 1)[0].split()
+            if len(fields) < 2:
+                continue
+            u = index.setdefault(fields[0], len(index))
+            v = index.setdefault(fields[1], len(index))
+            a, b = min(u, v), max(u, v)
+            if a == b or (a, b) in seen:
+                continue
+            seen.add((a, b))
+            src.append(a)
+            dst.append(b)
+            bandwidth.append(
+                _number(fields[2]) if len(fields) > 2 else np.nan
+            )
+
+    return (
+        len(index),
+        np.array(src, dtype=np.int64),
+        np.array(dst, dtype=np.int64),
+        np.full(len(index), np.nan),
+        np.array(bandwidth, dtype=np.float64),
+    )
+
+
+def _number(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
@@ -0,0 +1,95 @@
+# utils/vnr_arrays.py
+
+from typing import List, NamedTuple
+
+import networkx as nx
+import numpy as np
+
+
+class VNRArrays(NamedTuple):
+    """
+    Compact array form of a sequence of VNRs.
+
+    VNR ``i`` owns nodes ``node_ptr[i]:node_ptr[i + 1]`` of ``node_cpu``
+    and edges ``edge_ptr[i]:edge_ptr[i + 1]`` of ``edge_src`` /
+    ``edge_dst`` / ``edge_bw``. Edge endpoints are local node ids
+    (``0 .. num_nodes - 1`` within the VNR).
+    """
+
+    node_ptr: np.ndarray
+    node_cpu: np.ndarray
+    edge_ptr: np.ndarray
+    edge_src: np.ndarray
+    edge_dst: np.ndarray
+    edge_bw: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.node_ptr) - 1
+
+    def graph(self, i: int) -> nx.Graph:
+        """
+        Build the nx.Graph of VNR ``i`` with ``cpu`` / ``bandwidth`` attrs.
+        """
+        n0, n1 = int(self.node_ptr[i]), int(self.node_ptr[i + 1])
+        e0, e1 = int(self.edge_ptr[i]), int(self.edge_ptr[i + 1])
+
+        G = nx.Graph()
+        G.add_nodes_from(
+            (n, {"cpu": cpu})
+            for n, cpu in enumerate(self.node_cpu[n0:n1].tolist())
+        )
+        G.add_edges_from(
+            (u, v, {"bandwidth": bw})
+            for u, v, bw in zip(
+                self.edge_src[e0:e1].tolist(),
+                self.edge_dst[e0:e1].tolist(),
+                self.edge_bw[e0:e1].tolist(),
+            )
+        )
+        return G
+
+    def graphs(self) -> List[nx.Graph]:
+        return [self.graph(i) for i in range(len(self))]
+
+    @classmethod
+    def from_graphs(cls, graphs: List[nx.Graph]) -> "VNRArrays":
+        node_counts = [G.number_of_nodes() for G in graphs]
+        edge_counts = [G.number_of_edges() for G in graphs]
+
+        node_cpu = [cpu for G in graphs for _, cpu in G.nodes(data="cpu")]
+        edges = [e for G in graphs for e in G.edges(data="bandwidth")]
+
+        return cls(
+            node_ptr=_offsets(node_counts),
+            node_cpu=np.array(node_cpu, dtype=np.int32),
+            edge_ptr=_offsets(edge_counts),
+            edge_src=np.array([u for u, _, _ in edges], dtype=np.int32),
+            edge_dst=np.array([v for _, v, _ in edges], dtype=np.int32),
+            edge_bw=np.array([bw for _, _, bw in edges], dtype=np.int32),
+        )
+
+    @classmethod
+    def concat(cls, parts: List["VNRArrays"]) -> "VNRArrays":
+        node_ptr = [np.zeros(1, dtype=np.int64)]
+        edge_ptr = [np.zeros(1, dtype=np.int64)]
+        node_base = edge_base = 0
+        for part in parts:
+            node_ptr.append(part.node_ptr[1:] + node_base)
+            edge_ptr.append(part.edge_ptr[1:] + edge_base)
+            node_base += int(part.node_ptr[-1])
+            edge_base += int(part.edge_ptr[-1])
+
+        return cls(
+            node_ptr=np.concatenate(node_ptr),
+            node_cpu=np.concatenate([p.node_cpu for p in parts]),
+            edge_ptr=np.concatenate(edge_ptr),
+            edge_src=np.concatenate([p.edge_src for p in parts]),
+            edge_dst=np.concatenate([p.edge_dst for p in parts]),
+            edge_bw=np.concatenate([p.edge_bw for p in parts]),
+        )
+
+
+def _offsets(counts: List[int]) -> np.ndarray:
+    ptr = np.zeros(len(counts) + 1, dtype=np.int64)
+    np.cumsum(counts, out=ptr[1:])
+    return ptr
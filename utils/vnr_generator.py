@@ -1,24 +1,154 @@
 # utils/vnr_generator.py
 
+from typing import List, Union
+
 import networkx as nx
 import numpy as np
 
+from utils.vnr_arrays import VNRArrays
+
+
+def generate_virtual_network_request(config: dict, rng=None) -> nx.Graph:
+    """
+    Generate one connected VNR.
+
+    Args:
+        config: The ``vnr`` config section
+        rng: np.random.Generator, or a legacy np.random.RandomState /
+            the global np.random (a Generator is seeded from one draw)
+
+    Returns:
+        The VNR with ``cpu`` / ``bandwidth`` attributes
+    """
+    if not isinstance(rng, np.random.Generator):
+        legacy = np.random if rng is None else rng
+        rng = np.random.default_rng(legacy.randint(2**31))
+    return generate_virtual_network_requests(config, 1, rng)[0]
 
-def generate_virtual_network_request(config: dict) -> nx.Graph:
-    num_nodes = config["num_nodes"]
+
+def generate_virtual_network_requests(
+    config: dict,
+    num_vnrs: int,
+    rng: np.random.Generator,
+    as_arrays: bool = False,
+) -> Union[List[nx.Graph], VNRArrays]:
+    """
+    Generate ``num_vnrs`` connected VNRs without rejection sampling.
+
+    Each VNR starts from a random spanning tree (every node, in a random
+    order, attaches to a uniformly chosen earlier node), and every other
+    node pair is then added with probability ``edge_prob``. The result is
+    connected by construction, so the cost no longer depends on how
+    likely ``erdos_renyi_graph`` is to be connected. All attributes are
+    drawn for the whole batch at once.
+
+    Args:
+        config: The ``vnr`` config section
+        num_vnrs: Number of VNRs to generate
+        rng: Random generator
+        as_arrays: Return the compact VNRArrays form instead of graphs
+
+    Returns:
+        List of nx.Graph, or VNRArrays
+    """
+    n = config["num_nodes"]
     edge_prob = config["edge_prob"]
     cpu_range = tuple(config["cpu_range"])
     bandwidth_range = tuple(config["bandwidth_range"])
+    k = num_vnrs
+
+    # ノード対 (a < b) の通し番号表
+    pair_src, pair_dst = np.triu_indices(n, k=1)
+    num_pairs = len(pair_src)
+
+    # --- 全域木：順列の i 番目を手前のランダムなノードに接続 ---
+    order = rng.permuted(np.tile(np.arange(n), (k, 1)), axis=1)
+    rows = np.arange(k)[:, None]
+    later = np.arange(1, n)
+    earlier = (rng.random((k, n - 1)) * later).astype(np.int64)
+    a = order[rows, later]
+    b = order[rows, earlier]
+    lo = np.minimum(a, b)
+    hi = np.maximum(a, b)
+    tree_pairs = lo * n - lo * (lo + 1) // 2 + (hi - lo - 1)
+
+    # --- 追加エッジ：残りのノード対を確率 p で追加 ---
+    adjacency = rng.random((k, num_pairs)) < edge_prob
+    adjacency[rows, tree_pairs] = True
+
+    vnr_idx, pair_idx = np.nonzero(adjacency)
+    edge_counts = np.bincount(vnr_idx, minlength=k)
+    edge_ptr = np.zeros(k + 1, dtype=np.int64)
+    np.cumsum(edge_counts, out=edge_ptr[1:])
+
+    vnrs = VNRArrays(
+        node_ptr=np.arange(k + 1, dtype=np.int64) * n,
+        node_cpu=rng.integers(*cpu_range, size=k * n, dtype=np.int32),
+        edge_ptr=edge_ptr,
+        edge_src=pair_src[pair_idx].astype(np.int32),
+        edge_dst=pair_dst[pair_idx].astype(np.int32),
+        edge_bw=rng.integers(
+            *bandwidth_range, size=len(pair_idx), dtype=np.int32
+        ),
+    )
+    return vnrs if as_arrays else vnrs.graphs()
+
+
+class VNRStream:
+    """
+    Endless iterator of VNRs generated in blocks.
+
+    ``generate_virtual_network_requests`` is called for ``block_size``
+    VNRs at a time and each ``next()`` only builds the graph of one
+    slice, so the per-request NumPy overhead is paid once per block.
+    """
+
+    def __init__(
+        self, config: dict, rng: np.random.Generator, block_size: int = 256
+    ):
+        self.config = config
+        self.rng = rng
+        self.block_size = block_size
+        self._block: VNRArrays = None
+        self._pos = 0
+        self._peeked: nx.Graph = None
+
+    def __iter__(self) -> "VNRStream":
+        return self
+
+    def __next__(self) -> nx.Graph:
+        vnr = self.peek()
+        self._peeked = None
+        return vnr
 
-    while True:
-        G = nx.erdos_renyi_graph(n=num_nodes, p=edge_prob)
-        if nx.is_connected(G):
-            break
+    def get_state(self) -> tuple:
+        """
+        Position in the stream, for :meth:`set_state`.
 
-    for node in G.nodes:
-        G.nodes[node]["cpu"] = np.random.randint(*cpu_range)
+        The current block is shared rather than copied (it is never
+        modified), so this is cheap.
+        """
+        return (
+            self._block,
+            self._pos,
+            self._peeked,
+            self.rng.bit_generator.state,
+        )
 
-    for u, v in G.edges:
-        G.edges[u, v]["bandwidth"] = np.random.randint(*bandwidth_range)
+    def set_state(self, state: tuple) -> None:
+        self._block, self._pos, self._peeked, rng_state = state
+        self.rng.bit_generator.state = rng_state
 
-    return G
+    def peek(self) -> nx.Graph:
+        """
+        The VNR the next ``next()`` call will return, without consuming it.
+        """
+        if self._peeked is None:
+            if self._block is None or self._pos >= len(self._block):
+                self._block = generate_virtual_network_requests(
+                    self.config, self.block_size, self.rng, as_arrays=True
+                )
+                self._pos = 0
+            self._peeked = self._block.graph(self._pos)
+            self._pos += 1
+        return self._peeked
@@ -0,0 +1,227 @@
+# utils/vnr_ledger.py
+
+from typing import Dict, Iterable, Iterator
+
+import numpy as np
+
+from utils.substrate_state import SubstrateState
+
+
+class LedgerEntry:
+    """
+    Resources held by one admitted VNR, as flat arrays.
+
+    ``ids`` holds the substrate node ids followed by the edge ids the
+    embedding allocated on, ``amounts`` the CPU / bandwidth taken at
+    each of them, in the same order; the first ``num_nodes`` entries are
+    nodes. Entries are never mutated once created.
+    """
+
+    __slots__ = ("ids", "amounts", "num_nodes", "expire_at")
+
+    def __init__(
+        self,
+        ids: np.ndarray,
+        amounts: np.ndarray,
+        num_nodes: int,
+        expire_at: float,
+    ):
+        self.ids = ids
+        self.amounts = amounts
+        self.num_nodes = num_nodes
+        self.expire_at = expire_at
+
+    @property
+    def node_ids(self) -> np.ndarray:
+        return self.ids[:self.num_nodes]
+
+    @property
+    def cpu(self) -> np.ndarray:
+        return self.amounts[:self.num_nodes]
+
+    @property
+    def edge_ids(self) -> np.ndarray:
+        return self.ids[self.num_nodes:]
+
+    @property
+    def bandwidth(self) -> np.ndarray:
+        return self.amounts[self.num_nodes:]
+
+    @property
+    def nbytes(self) -> int:
+        return self.ids.nbytes + self.amounts.nbytes
+
+
+class VNRLedger:
+    """
+    Active VNRs keyed by ``vnr_id``, kept as the arrays they allocated.
+
+    An admitted VNR is recorded from the arrays it was allocated with
+    (see :func:`utils.evaluator.embedding_arrays`), so neither the VNR
+    graph nor its mappings have to be kept alive, and releasing it is a
+    single ``SubstrateState.release`` with no graph lookups. Ids are
+    stored as int32 (two arrays per VNR in total); amounts stay float64
+    so a release gives back exactly what was taken.
+
+    Iterating the ledger yields the active ``vnr_id`` s.
+
+    Args:
+        substrate: The substrate the recorded resources were taken from
+    """
+
+    def __init__(self, substrate: SubstrateState):
+        self.substrate = substrate
+        self._entries: Dict[int, LedgerEntry] = {}
+        # 基盤のノード・エッジ数が int32 に収まるなら ID を半分の幅で持つ
+        largest = max(substrate.num_nodes, substrate.num_edges)
+        self._id_dtype = np.int32 if largest < 2**31 else np.int64
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, vnr_id: int) -> bool:
+        return vnr_id in self._entries
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self._entries)
+
+    def __getitem__(self, vnr_id: int) -> LedgerEntry:
+        return self._entries[vnr_id]
+
+    def add(
+        self,
+        vnr_id: int,
+        node_ids: np.ndarray,
+        cpu: np.ndarray,
+        edge_ids: np.ndarray,
+        bandwidth: np.ndarray,
+        expire_at: float,
+    ) -> LedgerEntry:
+        """
+        Record resources that have already been allocated.
+
+        Args:
+            vnr_id: Id of the admitted VNR
+            node_ids, cpu, edge_ids, bandwidth: The arrays passed to
+                ``SubstrateState.allocate``
+            expire_at: Departure time of the VNR
+        """
+        entry = LedgerEntry(
+            np.concatenate([node_ids, edge_ids]).astype(self._id_dtype),
+            np.concatenate([cpu, bandwidth]).astype(np.float64),
+            len(node_ids),
+            expire_at,
+        )
+        self._entries[vnr_id] = entry
+        return entry
+
+    def release(self, vnr_id: int) -> None:
+        """
+        Give a VNR's resources back to the substrate and forget it.
+        """
+        entry = self._entries.pop(vnr_id)
+        self.substrate.release(
+            entry.node_ids, entry.cpu, entry.edge_ids, entry.bandwidth
+        )
+
+    def release_many(self, vnr_ids: Iterable[int]) -> None:
+        """
+        Release several VNRs with one ``SubstrateState.release``.
+
+        Amounts are added back in the order given, so the residuals end
+        up the same as after releasing the VNRs one by one.
+        """
+        entries = [self._entries.pop(vnr_id) for vnr_id in vnr_ids]
+        if not entries:
+            return
+        self.substrate.release(
+            np.concatenate([e.node_ids for e in entries]),
+            np.concatenate([e.cpu for e in entries]),
+            np.concatenate([e.edge_ids for e in entries]),
+            np.concatenate([e.bandwidth for e in entries]),
+        )
+
+    def release_expired(self, now: float) -> float:
+        """
+        Release every VNR with ``expire_at <= now`` in one call.
+
+        Returns:
+            Earliest ``expire_at`` still in the ledger (inf if empty)
+        """
+        expired = []
+        next_expiry = np.inf
+        for vnr_id, entry in self._entries.items():
+            if entry.expire_at <= now:
+                expired.append(vnr_id)
+            else:
+                next_expiry = min(next_expiry, entry.expire_at)
+        self.release_many(expired)
+        return next_expiry
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def nbytes(self) -> int:
+        """
+        Bytes held by the recorded arrays (excluding object overhead).
+        """
+        return sum(entry.nbytes for entry in self._entries.values())
+
+    def pack(self) -> Dict[str, np.ndarray]:
+        """
+        All entries as a few flat arrays (e.g. for a checkpoint file).
+
+        Entry ``k`` owns ``ids[ptr[k]:ptr[k + 1]]`` and the same slice of
+        ``amounts``; see :meth:`unpack`.
+        """
+        entries = list(self._entries.values())
+        ptr = np.zeros(len(entries) + 1, dtype=np.int64)
+        np.cumsum([len(e.ids) for e in entries], out=ptr[1:])
+        return {
+            "vnr_ids": np.fromiter(self._entries, dtype=np.int64),
+            "ptr": ptr,
+            "ids": np.concatenate(
+                [e.ids for e in entries] or [np.empty(0, self._id_dtype)]
+            ),
+            "amounts": np.concatenate(
+                [e.amounts for e in entries] or [np.empty(0)]
+            ),
+            "num_nodes": np.array(
+                [e.num_nodes for e in entries], dtype=np.int64
+            ),
+            "expire_at": np.array(
+                [e.expire_at for e in entries], dtype=np.float64
+            ),
+        }
+
+    @staticmethod
+    def unpack(packed: Dict[str, np.ndarray]) -> Dict[int, LedgerEntry]:
+        """
+        Rebuild the output of :meth:`pack` as a :meth:`set_state` state.
+
+        Entries are views into the packed arrays (in the original order).
+        """
+        ptr = packed["ptr"]
+        ids, amounts = packed["ids"], packed["amounts"]
+        return {
+            vnr_id: LedgerEntry(
+                ids[ptr[k]:ptr[k + 1]],
+                amounts[ptr[k]:ptr[k + 1]],
+                num_nodes,
+                expire_at,
+            )
+            for k, (vnr_id, num_nodes, expire_at) in enumerate(
+                zip(
+                    packed["vnr_ids"].tolist(),
+                    packed["num_nodes"].tolist(),
+                    packed["expire_at"].tolist(),
+                )
+            )
+        }
+
+    def get_state(self) -> Dict[int, LedgerEntry]:
+        # エントリは不変なので浅いコピーで足りる
+        return dict(self._entries)
+
+    def set_state(self, state: Dict[int, LedgerEntry]) -> None:
+        self._entries = dict(state)
@@ -0,0 +1,115 @@
+# utils/vnr_trace.py
+
+import json
+import os
+from typing import Any, Dict, Optional
+
+import networkx as nx
+import numpy as np
+
+from utils.vnr_arrays import VNRArrays
+from utils.vnr_generator import generate_virtual_network_requests
+
+_ARRAY_FIELDS = ("arrival", "duration") + VNRArrays._fields
+
+
+def write_trace(
+    path: str,
+    arrival: np.ndarray,
+    duration: np.ndarray,
+    vnrs: VNRArrays,
+    meta: Optional[Dict[str, Any]] = None,
+) -> None:
+    """
+    Write a VNR workload trace as a directory of ``.npy`` arrays.
+
+    Args:
+        path: Output directory
+        arrival: Absolute arrival time of each VNR
+        duration: Lifetime of each VNR
+        vnrs: The VNRs in compact array form
+        meta: Extra metadata stored in ``meta.json``
+    """
+    assert len(arrival) == len(duration) == len(vnrs)
+    os.makedirs(path, exist_ok=True)
+
+    arrays = {"arrival": arrival, "duration": duration, **vnrs._asdict()}
+    for name in _ARRAY_FIELDS:
+        np.save(os.path.join(path, f"{name}.npy"), arrays[name])
+
+    with open(os.path.join(path, "meta.json"), "w") as f:
+        json.dump({"num_vnrs": len(arrival), **(meta or {})}, f, indent=2)
+
+
+def generate_trace(
+    config: Dict[str, Any],
+    num_vnrs: int,
+    path: str,
+    seed: int = 0,
+    chunk_size: int = 10000,
+) -> None:
+    """
+    Pre-generate a Poisson VNR workload and write it with write_trace.
+
+    Arrival times follow ``experiment.arrival_rate`` and lifetimes
+    ``vnr.duration_range``; the VNRs themselves come from the ``vnr``
+    section of the config.
+    """
+    rng = np.random.default_rng(seed)
+    arrival_rate = config["experiment"].get("arrival_rate", 1.0)
+    duration_range = config["vnr"].get("duration_range", [5, 10])
+
+    arrival = np.cumsum(rng.exponential(1.0 / arrival_rate, size=num_vnrs))
+    duration = rng.integers(*duration_range, size=num_vnrs, dtype=np.int32)
+
+    parts = [
+        generate_virtual_network_requests(
+            config["vnr"],
+            min(chunk_size, num_vnrs - start),
+            rng,
+            as_arrays=True,
+        )
+        for start in range(0, num_vnrs, chunk_size)
+    ]
+
+    write_trace(
+        path,
+        arrival,
+        duration,
+        VNRArrays.concat(parts),
+        meta={"seed": seed, "config": config},
+    )
+
+
+class VNRTrace:
+    """
+    Memory-mapped reader for traces written by :func:`write_trace`.
+
+    Arrays are opened with ``mmap_mode="r"`` so only the slices of the
+    VNRs actually replayed are paged in.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        arrays = {
+            name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")
+            for name in _ARRAY_FIELDS
+        }
+        self.arrival = arrays["arrival"]
+        self.duration = arrays["duration"]
+        self.vnrs = VNRArrays(**{k: arrays[k] for k in VNRArrays._fields})
+
+        with open(os.path.join(path, "meta.json")) as f:
+            self.meta = json.load(f)
+
+    def __len__(self) -> int:
+        return len(self.arrival)
+
+    def arrival_time(self, i: int) -> float:
+        return float(self.arrival[i])
+
+    def lifetime(self, i: int) -> int:
+        return int(self.duration[i])
+
+    def vnr(self, i: int) -> nx.Graph:
+        return self.vnrs.graph(i)